@@ -3,6 +3,12 @@ import json
 import os
 from pathlib import Path
 
+try:
+    from sn import api, daemon
+except ImportError:
+    # Package not installed; only the binary is available
+    api = daemon = None
+
 # Path to the compiled binary
 BINARY_PATH = Path(__file__).parent / "dist" / "sn-review"
 
@@ -64,6 +70,45 @@ SN_TOOLS = [
 # 3. Execution Logic
 # Call this when the LLM returns a tool_call
 def execute_sn_tool(tool_name: str, args: dict) -> str:
+    """
+    Runs the tool on a warm `sn-review daemon` if one is listening, else
+    in-process through `sn.api`, else through the sn-review binary.
+    """
+    if tool_name not in ("request_review", "retrieve_review"):
+        return f"Error: Unknown tool '{tool_name}'"
+    if api is None:
+        return _execute_binary(tool_name, args)
+
+    output = []
+    def echo(message="", err=False):
+        if not err:
+            output.append(message)
+
+    params = {"file_path": args["file_path"]} if tool_name == "request_review" \
+        else {"file_pattern": args.get("file_pattern") or None}
+    try:
+        result = _call(tool_name, params, echo)
+    except Exception as e:
+        return f"Tool execution failed: {e}"
+
+    if tool_name == "retrieve_review":
+        # Same text the binary prints: progress, then the review reports
+        output.extend(r["report"] for r in result)
+    return "\n".join(output).strip()
+
+
+def _call(tool_name, params, echo):
+    if daemon.SOCKET_PATH.exists():
+        try:
+            return daemon.DaemonClient().call(tool_name, echo=echo, **params)
+        except (ConnectionRefusedError, FileNotFoundError):
+            pass  # stale socket
+    if tool_name == "request_review":
+        return api.request_review(params["file_path"], echo=echo).to_dict()
+    return [r.to_dict() for r in api.retrieve_review(params["file_pattern"], echo=echo)]
+
+
+def _execute_binary(tool_name: str, args: dict) -> str:
     """
     Executes the sn-review binary based on the tool selection.
     """
@@ -76,9 +121,6 @@ def execute_sn_tool(tool_name: str, args: dict) -> str:
         cmd.append("done")
         if "file_pattern" in args and args["file_pattern"]:
             cmd.append(args["file_pattern"])
-            
-    else:
-        return f"Error: Unknown tool '{tool_name}'"
 
     try:
         # Run the binary and capture stdout/stderr
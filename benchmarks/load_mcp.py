@@ -0,0 +1,201 @@
+"""Load test for sn.mcp_server with simulated concurrent agents.
+
+Starts one server process over stdio (benchmarks/local_server.py, the real
+sn.mcp_server with a local directory standing in for the tablet) and
+drives `--clients` simulated agents over its single session. The server
+handles the requests of one session concurrently, so the agents contend
+for its event loop, its worker threads, the per-device scheduler and the
+state file. Each agent keeps one call in flight for `--duration` seconds;
+it owns a markdown file it sends with sn_review and retrieves with
+sn_done, and sn_list needs no file. A probe lists the tools every
+`--probe-interval` seconds, to show how responsive the server stays while
+PDFs render and push.
+
+Reports throughput, p50/p95/p99 latency per tool (list_tools for the
+probe) and the server's event-loop stall time, and exits non-zero when
+--max-p95 or --max-stall is exceeded.
+
+    uv run python benchmarks/load_mcp.py --clients 8 --duration 30 --mix review=1,done=1,list=4
+
+Needs WeasyPrint and pandoc, since sn_review renders real PDFs.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from mcp import ClientSession
+from mcp.client.stdio import StdioServerParameters, stdio_client
+
+LOCAL_SERVER = Path(__file__).with_name("local_server.py")
+TOOLS = {"review": "sn_review", "done": "sn_done", "list": "sn_list"}
+DOCUMENT = "# Agent {client} draft {revision}\n\n" + "Some paragraph to review. " * 40 + "\n"
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in TOOLS:
+            raise argparse.ArgumentTypeError(f"unknown call '{name}', expected one of {', '.join(TOOLS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of `values` (0 < q <= 100)."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+async def _calls(session, client, workspace, mix, deadline, results, rng):
+    document = workspace / f"agent{client}.md"
+    names, weights = list(mix), list(mix.values())
+    revision = 0
+    while time.monotonic() < deadline:
+        call = rng.choices(names, weights)[0]
+        if call == "review":
+            revision += 1
+            document.write_text(DOCUMENT.format(client=client, revision=revision))
+            arguments = {"file_path": str(document)}
+        elif call == "done":
+            arguments = {"file_pattern": document.name}
+        else:
+            arguments = {}
+        started = time.perf_counter()
+        try:
+            result = await session.call_tool(TOOLS[call], arguments)
+            text = result.content[0].text if result.content else ""
+            ok = not result.isError and not text.startswith("Error")
+        except Exception as e:
+            ok, text = False, str(e)
+        results.append((call, time.perf_counter() - started, ok, text))
+
+
+async def run(args):
+    with tempfile.TemporaryDirectory(prefix="sn-load-") as tmp:
+        workspace = Path(tmp) / "work"
+        device_root = Path(tmp) / "device"
+        workspace.mkdir()
+        device_root.mkdir()
+        stats_path = Path(tmp) / "loop.json"
+        server = StdioServerParameters(
+            command=sys.executable,
+            args=[str(LOCAL_SERVER), str(device_root), "--latency", str(args.latency), "--stats", str(stats_path)],
+            env=dict(os.environ), cwd=str(workspace),
+        )
+        results = []
+        rng = random.Random(args.seed)
+        async with stdio_client(server) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                # One untimed call so start-up and warm-up do not count
+                await session.call_tool("sn_list", {})
+                started = time.monotonic()
+                deadline = started + args.duration
+                await asyncio.gather(
+                    *(_calls(session, i, workspace, args.mix, deadline, results, random.Random(rng.random()))
+                      for i in range(args.clients)),
+                    _probe(session, args.probe_interval, deadline, results),
+                )
+                elapsed = time.monotonic() - started
+        # The server writes its loop statistics as it exits
+        for _ in range(50):
+            if stats_path.exists():
+                break
+            await asyncio.sleep(0.1)
+        loop_stats = json.loads(stats_path.read_text()) if stats_path.exists() else None
+    return summarise(results, elapsed, loop_stats, args.clients)
+
+
+async def _probe(session, interval, deadline, results):
+    """Lists the tools every `interval` seconds while the agents run."""
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            await session.list_tools()
+            ok, text = True, ""
+        except Exception as e:
+            ok, text = False, str(e)
+        results.append(("list_tools", time.perf_counter() - started, ok, text))
+        await asyncio.sleep(interval)
+
+
+def summarise(results, elapsed, loop_stats, clients):
+    calls = [r for r in results if r[0] != "list_tools"]
+    report = {"clients": clients, "calls": len(calls), "seconds": round(elapsed, 2),
+              "throughput": round(len(calls) / elapsed, 2) if elapsed else 0.0,
+              "errors": sum(1 for r in calls if not r[2]), "tools": {}, "loop": loop_stats}
+    for call in [*TOOLS, "list_tools"]:
+        latencies = [r[1] for r in results if r[0] == call]
+        if not latencies:
+            continue
+        report["tools"][call] = {
+            "calls": len(latencies),
+            "errors": sum(1 for r in results if r[0] == call and not r[2]),
+            **{f"p{q}": round(percentile(latencies, q), 4) for q in (50, 95, 99)},
+            "max": round(max(latencies), 4),
+        }
+    report["sample_errors"] = sorted({r[3].splitlines()[0] for r in results if not r[2] and r[3]})[:5]
+    return report
+
+
+def print_report(report):
+    print(f"{report['clients']} agents on one session, {report['calls']} calls in {report['seconds']}s: "
+          f"{report['throughput']} calls/s, {report['errors']} errors")
+    print(f"{'tool':<11}{'calls':>7}{'errors':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for call, t in report["tools"].items():
+        print(f"{call:<11}{t['calls']:>7}{t['errors']:>8}{t['p50']:>9.3f}{t['p95']:>9.3f}{t['p99']:>9.3f}"
+              f"{t['max']:>9.3f}")
+    loop = report["loop"]
+    if loop:
+        print(f"event loop: {loop['stall_seconds']:.3f}s stalled in {loop['stalls']} stalls, "
+              f"longest {loop['max_stall_seconds']:.3f}s")
+    else:
+        print("event loop: no statistics (the server did not exit cleanly)")
+    for error in report["sample_errors"]:
+        print(f"  error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load after warm-up.")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("review=1,done=1,list=4"),
+                        help="Relative weights of review, done and list calls.")
+    parser.add_argument("--latency", type=float, default=0.02,
+                        help="Seconds each stand-in device operation takes, like an ADB round trip.")
+    parser.add_argument("--probe-interval", type=float, default=0.25,
+                        help="Seconds between list_tools probes.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    parser.add_argument("--max-p95", type=float, help="Fail if any tool's p95 latency exceeds this many seconds.")
+    parser.add_argument("--max-stall", type=float, help="Fail if the event loop stalls longer than this in total.")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    failed = []
+    if args.max_p95 is not None:
+        failed += [f"{call} p95 {t['p95']:.3f}s > {args.max_p95}s"
+                   for call, t in report["tools"].items() if t["p95"] > args.max_p95]
+    if args.max_stall is not None and report["loop"] and report["loop"]["stall_seconds"] > args.max_stall:
+        failed.append(f"event loop stalled {report['loop']['stall_seconds']:.3f}s > {args.max_stall}s")
+    for reason in failed:
+        print(f"FAIL: {reason}", file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
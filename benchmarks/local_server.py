@@ -0,0 +1,127 @@
+"""sn.mcp_server wired to a local directory instead of a tablet, for load tests.
+
+    python benchmarks/local_server.py DEVICE_DIR [--latency S] [--stats PATH]
+
+Runs the real server over stdio with its device session swapped for a
+LocalDevice. Every pushed PDF is "exported" at once so sn_done finds an
+export. With --stats, event-loop stall statistics (sn.trace.LoopMonitor)
+are written to PATH when the session ends. Nothing here is used outside
+benchmarks/.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from sn import mcp_server, outbox
+from sn.device import DeviceSession
+from sn.scheduler import ScheduledDevice
+from sn.trace import LoopMonitor, span, traced
+
+EXPORT_DIR = "/storage/emulated/0/EXPORT"
+_CHUNK = 64 * 1024
+
+
+class LocalDevice:
+    """
+    Stand-in for SupernoteDevice backed by a directory: remote paths live
+    under `root`, and every operation sleeps `latency` seconds in place of
+    the ADB round trip.
+    """
+
+    def __init__(self, root, latency=0.0, model="A5X2"):
+        self.root = Path(root)
+        self.latency = latency
+        self.device = SimpleNamespace(serial=f"local:{self.root}")
+        self._model = model
+
+    def _path(self, remote_path):
+        return self.root / remote_path.lstrip("/")
+
+    def _round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def model(self):
+        self._round_trip()
+        return self._model
+
+    def ensure_dir(self, remote_dir):
+        self._round_trip()
+        self._path(remote_dir).mkdir(parents=True, exist_ok=True)
+
+    def push(self, local_path, remote_path, on_chunk=None):
+        self.ensure_dir(os.path.dirname(remote_path))
+        data = local_path if isinstance(local_path, bytes) else Path(local_path).read_bytes()
+        target = self._path(remote_path)
+        with span("push", path=remote_path, bytes=len(data)):
+            self._round_trip()
+            with open(target, "wb") as f:
+                for start in range(0, len(data), _CHUNK):
+                    f.write(data[start:start + _CHUNK])
+                    if on_chunk:
+                        on_chunk(min(start + _CHUNK, len(data)), len(data))
+        # The user exports straight away
+        export = self._path(f"{EXPORT_DIR}/{Path(remote_path).name}")
+        export.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(target, export)
+
+    @traced("pull")
+    def pull(self, remote_path, local_path, on_chunk=None):
+        self._round_trip()
+        data = self._path(remote_path).read_bytes()
+        Path(local_path).write_bytes(data)
+        if on_chunk:
+            on_chunk(len(data), len(data))
+
+    def exists(self, remote_path):
+        self._round_trip()
+        return self._path(remote_path).exists()
+
+    def open_pdf(self, remote_path):
+        self._round_trip()
+
+    def remove(self, remote_paths):
+        self._round_trip()
+        for path in remote_paths:
+            self._path(path).unlink(missing_ok=True)
+
+    def list_dir(self, remote_dir):
+        self._round_trip()
+        path = self._path(remote_dir)
+        return sorted(os.listdir(path)) if path.is_dir() else []
+
+    def is_alive(self):
+        return True
+
+
+async def serve(device_dir, latency, stats_path):
+    device = LocalDevice(device_dir, latency)
+    mcp_server._session = DeviceSession(factory=lambda: ScheduledDevice(device))
+    # There is no adb server to track; the stand-in never goes offline
+    outbox.OutboxFlusher.start = lambda self: self
+    monitor = LoopMonitor().start() if stats_path else None
+    try:
+        await mcp_server.main()
+    finally:
+        if monitor is not None:
+            monitor.stop()
+            Path(stats_path).write_text(json.dumps(monitor.stats()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("device_dir")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--stats")
+    args = parser.parse_args()
+    asyncio.run(serve(args.device_dir, args.latency, args.stats))
+
+
+if __name__ == "__main__":
+    main()
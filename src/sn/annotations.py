@@ -0,0 +1,186 @@
+"""Locate handwritten annotations by diffing the original PDF against the export.
+
+Both documents are rasterised at a low DPI, page by page, in a process pool.
+Pixels that differ are grouped into bounding boxes so the review report can
+point agents at the few pages that actually carry handwriting.
+
+Requires the optional `annotations` extra (numpy, pymupdf).
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+try:
+    try:
+        import pymupdf as fitz
+    except ImportError:  # PyMuPDF before 1.24.3
+        import fitz
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without the extra
+    fitz = None
+    np = None
+
+DEFAULT_DPI = 40
+# Grey-level difference that counts as ink rather than anti-aliasing noise
+DEFAULT_THRESHOLD = 48
+# Pixel gap (at render DPI) below which neighbouring marks merge into one box
+MERGE_GAP = 6
+# Boxes with fewer changed pixels than this are discarded as noise
+MIN_PIXELS = 4
+
+
+@dataclass
+class PageAnnotations:
+    page: int  # 1-based
+    bboxes: list = field(default_factory=list)  # (x0, y0, x1, y1) in PDF points
+    changed_pixels: int = 0
+    # Per-bbox (source, start_line, end_line) from the source map, if known
+    source_lines: list = field(default_factory=list)
+    # Per-bbox recognised handwriting (sn.ocr), None where nothing was read
+    text: list = field(default_factory=list)
+
+    def to_dict(self):
+        d = {
+            "page": self.page,
+            "bboxes": [list(b) for b in self.bboxes],
+            "changed_pixels": self.changed_pixels,
+        }
+        if self.source_lines:
+            d["source_lines"] = [list(s) if s else None for s in self.source_lines]
+        if self.text:
+            d["text"] = list(self.text)
+        return d
+
+
+def mp_context():
+    # Callers (e.g. the MCP server) may be multi-threaded, where fork() is unsafe
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else None)
+
+
+def is_available():
+    return fitz is not None and np is not None
+
+
+def _rasterise(page, dpi):
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+
+
+def _runs(active, gap):
+    """Start/end indices of True runs in a 1D mask, merging runs closer than `gap`."""
+    padded = np.concatenate(([False], active, [False]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    starts, ends = edges[0::2], edges[1::2]
+    if len(starts) == 0:
+        return []
+    keep = np.concatenate(([True], starts[1:] - ends[:-1] > gap))
+    merged_starts = starts[keep]
+    merged_ends = np.append(ends[np.flatnonzero(keep)[1:] - 1], ends[-1])
+    return list(zip(merged_starts.tolist(), merged_ends.tolist()))
+
+
+def diff_regions(original, annotated, threshold=DEFAULT_THRESHOLD, gap=MERGE_GAP, min_pixels=MIN_PIXELS):
+    """
+    Returns (boxes, changed_pixels) for two grayscale rasters.
+    Boxes are (x0, y0, x1, y1) in raster pixels.
+    """
+    if annotated.shape != original.shape:
+        # Nearest-neighbour resample so both grids line up
+        rows = np.linspace(0, annotated.shape[0] - 1, original.shape[0]).astype(np.intp)
+        cols = np.linspace(0, annotated.shape[1] - 1, original.shape[1]).astype(np.intp)
+        annotated = annotated[rows[:, None], cols]
+
+    mask = np.abs(original.astype(np.int16) - annotated.astype(np.int16)) > threshold
+    changed = int(mask.sum())
+    if changed < min_pixels:
+        return [], changed
+
+    boxes = []
+    for y0, y1 in _runs(mask.any(axis=1), gap):
+        band = mask[y0:y1]
+        for x0, x1 in _runs(band.any(axis=0), gap):
+            region = band[:, x0:x1]
+            if region.sum() < min_pixels:
+                continue
+            # Tighten vertically to the rows this column run actually touches
+            rows = np.flatnonzero(region.any(axis=1))
+            boxes.append((x0, y0 + int(rows[0]), x1, y0 + int(rows[-1]) + 1))
+    return boxes, changed
+
+
+def _diff_pages(original_pdf, annotated_pdf, page_indexes, dpi, threshold):
+    results = []
+    with fitz.open(original_pdf) as orig, fitz.open(annotated_pdf) as ann:
+        for i in page_indexes:
+            a = _rasterise(orig[i], dpi)
+            b = _rasterise(ann[i], dpi)
+            boxes, changed = diff_regions(a, b, threshold)
+            if not boxes:
+                continue
+            # Convert raster pixels back to PDF points of the original page
+            scale = 72.0 / dpi
+            results.append(PageAnnotations(
+                page=i + 1,
+                bboxes=[tuple(round(v * scale, 1) for v in box) for box in boxes],
+                changed_pixels=changed,
+            ))
+    return results
+
+
+def detect_annotations(original_pdf, annotated_pdf, dpi=DEFAULT_DPI, threshold=DEFAULT_THRESHOLD, max_workers=None):
+    """
+    Lists pages of `annotated_pdf` that differ from `original_pdf`.
+    Pages are split across a process pool; small documents run in-process.
+    """
+    if not is_available():
+        raise RuntimeError("Annotation detection requires the 'annotations' extra (numpy, pymupdf).")
+
+    with fitz.open(original_pdf) as orig, fitz.open(annotated_pdf) as ann:
+        page_count = min(orig.page_count, ann.page_count)
+
+    workers = max_workers or os.cpu_count() or 1
+    workers = max(1, min(workers, page_count // 4))
+    if workers == 1:
+        return _diff_pages(str(original_pdf), str(annotated_pdf), range(page_count), dpi, threshold)
+
+    chunks = [range(i, page_count, workers) for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context()) as pool:
+        futures = [
+            pool.submit(_diff_pages, str(original_pdf), str(annotated_pdf), chunk, dpi, threshold)
+            for chunk in chunks
+        ]
+        results = [r for f in futures for r in f.result()]
+    return sorted(results, key=lambda r: r.page)
+
+
+def format_report(pages, snippets=None, base_dir=None):
+    """
+    Markdown section listing annotated pages for the review report.
+    `snippets` (from sn.snippets) are embedded under their page, linked
+    relative to `base_dir`.
+    """
+    by_page = {}
+    for s in snippets or []:
+        by_page.setdefault(s.page, []).append(s)
+
+    lines = ["## Annotated Pages"]
+    if not pages:
+        lines.append("No handwritten annotations detected.")
+    for p in pages:
+        boxes = ", ".join(f"({x0:.0f}, {y0:.0f})-({x1:.0f}, {y1:.0f})" for x0, y0, x1, y1 in p.bboxes)
+        lines.append(f"- Page {p.page}: {len(p.bboxes)} region(s) at {boxes} pt")
+        for i, src in enumerate(p.source_lines, start=1):
+            if src:
+                source, start, end = src
+                span = f"line {start}" if start == end else f"lines {start}\u2013{end}"
+                lines.append(f"  - Region {i} on page {p.page} covers {span} of {source}")
+        for i, text in enumerate(p.text, start=1):
+            if text:
+                lines.append(f"  - Region {i} on page {p.page} reads: \"{text}\"")
+        for s in by_page.get(p.page, []):
+            link = os.path.relpath(s.path, base_dir) if base_dir else str(s.path)
+            lines.append(f"  - ![Page {s.page}, region {s.index}]({link})")
+    return "\n".join(lines) + "\n"
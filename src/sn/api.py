@@ -0,0 +1,97 @@
+"""Importable Python API for the review round trip.
+
+Long-lived callers (agent loops, the daemon) import these functions instead
+of spawning `sn-review`, keep one warm device connection across calls and
+get structured results back. Failures raise.
+"""
+
+from dataclasses import asdict, dataclass, field
+
+from . import workflow
+from .device import DeviceSession, SupernoteDevice
+from .scheduler import ScheduledDevice
+
+
+@dataclass
+class ReviewRequest:
+    file: str
+    local_pdf: str | None  # None when no local copy was kept
+    remote_path: str
+    size: int
+    device: str | None  # None when queued
+    queued: bool = False  # device unreachable; waiting in the outbox
+    bundle: list | None = None  # file and page range per bundled document
+    profile: str | None = None  # device profile the PDF was laid out for
+    timings: dict = field(default_factory=dict)  # seconds per phase
+
+    def to_dict(self):
+        return asdict(self)
+
+
+@dataclass
+class ReviewResult:
+    file: str
+    match: str  # exact, fuzzy, mark or original
+    device_path: str
+    pulled_from: str
+    reviewed_path: str | None  # None for a mark-sourced review pushed without a local copy
+    review_md: str
+    report: str
+    annotated_pages: list | None = None  # PageAnnotations.to_dict() per page
+    snippets: list = field(default_factory=list)
+    files: list | None = None  # per-file reports of a bundle
+    timings: dict = field(default_factory=dict)  # seconds per phase
+
+    def to_dict(self):
+        return asdict(self)
+
+
+@dataclass
+class PendingReview:
+    file: str
+    name: str
+    device_path: str
+    timestamp: str
+
+    def to_dict(self):
+        return asdict(self)
+
+
+# One connection per process, health-checked and re-made on demand
+_session = DeviceSession(factory=lambda: ScheduledDevice(SupernoteDevice()))
+
+
+def _on_session(func, *args, **kwargs):
+    try:
+        return func(*args, connect=_session.get, **kwargs)
+    except Exception:
+        # The connection may be the culprit; start fresh next time
+        _session.invalidate()
+        raise
+
+
+def request_review(file_path, echo=workflow._noop, progress=None, keep_local=True, since_last=False, profile=None,
+                   source_map=False):
+    """Convert, push and open a markdown file on the device."""
+    result = _on_session(workflow.request_review, file_path, echo=echo, progress=progress, keep_local=keep_local,
+                         since_last=since_last, profile=profile, source_map=source_map)
+    return ReviewRequest(**result)
+
+
+def request_bundle(file_paths, name=None, echo=workflow._noop, progress=None, keep_local=True,
+                   profile=None, source_map=False):
+    """Convert several markdown files into one PDF, push and open it."""
+    result = _on_session(workflow.request_bundle, file_paths, name=name, echo=echo, progress=progress,
+                         keep_local=keep_local, profile=profile, source_map=source_map)
+    return ReviewRequest(**result)
+
+
+def retrieve_review(file_pattern=None, echo=workflow._noop, progress=None, ocr=False, marks=False):
+    """Pull back every pending review matching `file_pattern` (all if None)."""
+    results = _on_session(workflow.retrieve_reviews, file_pattern or None, echo=echo, progress=progress, ocr=ocr,
+                          marks=marks)
+    return [ReviewResult(**r) for r in results]
+
+
+def list_pending():
+    return [PendingReview(**p) for p in workflow.list_pending()]
@@ -0,0 +1,162 @@
+"""Content-addressed store for rendered and pulled PDFs.
+
+Instead of timestamped copies beside the markdown, every PDF `review`
+renders and every export `done` pulls back lives once under
+`.sn_cache/artifacts/<xx>/<sha256>.pdf`, and state refers to it by path.
+Identical renders and pulls share one file. The store is capped in size.
+The least recently used files go first, except those still in use: the
+originals and exports of pending reviews, the local copies of queued
+outbox entries, and the exports completed review reports link to.
+"""
+
+import hashlib
+import os
+import time
+import uuid
+from pathlib import Path
+
+from . import outbox, state
+
+STORE_DIR = Path(".sn_cache") / "artifacts"
+MAX_BYTES = 1024 * 1024 * 1024
+_INCOMING = "incoming"
+# A pull still in incoming/ after this long was interrupted
+STALE_INCOMING_SECONDS = 24 * 60 * 60
+
+
+def path_for(digest, suffix=".pdf", directory=None):
+    return Path(directory or STORE_DIR) / digest[:2] / f"{digest}{suffix}"
+
+
+def touch(path):
+    """Marks an artifact as just used, for LRU eviction."""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+
+
+def put_bytes(data, suffix=".pdf", directory=None):
+    """Stores `data` once and returns its path in the store."""
+    path = path_for(hashlib.sha256(data).hexdigest(), suffix, directory)
+    if path.exists():
+        touch(path)
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return path
+
+
+def incoming_path(name, directory=None):
+    """A scratch path inside the store to pull a file to before adopt()."""
+    incoming = Path(directory or STORE_DIR) / _INCOMING
+    incoming.mkdir(parents=True, exist_ok=True)
+    return incoming / name
+
+
+def adopt(path, directory=None):
+    """Moves a file into the store, dropping it if the content is already there."""
+    path = Path(path)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    target = path_for(digest.hexdigest(), path.suffix, directory)
+    if target.exists():
+        path.unlink()
+        touch(target)
+        return target
+    target.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(path, target)
+    return target
+
+
+def _in_use():
+    """Artifacts and source maps that state or the outbox still refer to."""
+    keep = set()
+    for info in state.load_state()["reviews"].values():
+        # A completed review's -review.md links to its export
+        keys = ("local_pdf", "reviewed_path", "source_map") if info["status"] == "pending" else ("reviewed_path",)
+        for key in keys:
+            if info.get(key):
+                keep.add(os.path.abspath(info[key]))
+    # Queued reviews diff against their local copy once flushed
+    keep.update(os.path.abspath(p) for p in outbox.local_pdfs())
+    return keep
+
+
+def _files(directory):
+    """(mtime, size, path) of each finished file directly in `directory`."""
+    files = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and not entry.name.endswith(".tmp"):
+            st = entry.stat()
+            files.append((st.st_mtime, st.st_size, entry.path))
+    return files
+
+
+def _remove_lru(files, max_bytes, keep=()):
+    total = sum(size for _, size, _ in files)
+    if total <= max_bytes:
+        return []
+    keep = _in_use() | {os.path.abspath(p) for p in keep}
+    removed = []
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        if os.path.abspath(path) in keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        total -= size
+        removed.append(Path(path))
+    return removed
+
+
+def _clean_incoming(directory):
+    """Deletes pulls left in incoming/ by a `done` that never finished."""
+    incoming = directory / _INCOMING
+    if not incoming.exists():
+        return []
+    removed = []
+    cutoff = time.time() - STALE_INCOMING_SECONDS
+    for entry in os.scandir(incoming):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed.append(Path(entry.path))
+        except FileNotFoundError:
+            continue
+    return removed
+
+
+def evict(max_bytes=MAX_BYTES, directory=None):
+    """
+    Deletes least recently used artifacts until the store fits in
+    `max_bytes`, and stale partial pulls. Returns the removed paths.
+    """
+    directory = Path(directory or STORE_DIR)
+    if not directory.exists():
+        return []
+    stale = _clean_incoming(directory)
+    files = []
+    for shard in os.scandir(directory):
+        if shard.is_dir() and shard.name != _INCOMING:
+            files += _files(shard.path)
+    return stale + _remove_lru(files, max_bytes)
+
+
+def trim(directory, max_bytes, keep=()):
+    """
+    evict() for the flat caches beside the store (snippets, OCR text,
+    source maps, snapshots): least recently used files go first, except
+    those still in use and the paths in `keep`.
+    """
+    directory = Path(directory)
+    if not directory.exists():
+        return []
+    return _remove_lru(_files(directory), max_bytes, keep)
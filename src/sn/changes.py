@@ -0,0 +1,220 @@
+"""Changes-only documents for re-reviewing a revised markdown file.
+
+Every push snapshots the markdown by content hash; the snapshots are
+capped at MAX_SNAPSHOT_BYTES, least recently used first, but a snapshot
+state still needs as a baseline is kept. `review --since-last`
+diffs the file, block by block, against the snapshot taken for its last
+completed review and renders only what changed: added blocks, removed
+blocks struck through, a block of context either side and the heading
+each change sits under. Unchanged runs collapse to a one-line marker, so
+rendering and transfer scale with the edit rather than the document.
+"""
+
+import difflib
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+from . import artifacts, outbox, state
+
+SNAPSHOT_DIR = Path(".sn_cache") / "snapshots"
+MAX_SNAPSHOT_BYTES = 64 * 1024 * 1024
+# Unchanged blocks shown before and after each change
+DEFAULT_CONTEXT = 1
+
+_FENCE_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+_HEADING_RE = re.compile(r"^ {0,3}#{1,6}(\s|$)")
+
+
+def save_snapshot(data, digest, directory=None):
+    """Stores pushed markdown bytes under their hash, once."""
+    directory = Path(directory or SNAPSHOT_DIR)
+    path = directory / f"{digest}.md"
+    if path.exists():
+        artifacts.touch(path)
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    artifacts.trim(directory, MAX_SNAPSHOT_BYTES, keep=[directory / f"{h}.md" for h in _referenced()])
+    return path
+
+
+def _referenced():
+    """Hashes that are, or will become once completed, the baseline of a review."""
+    hashes = set()
+    for entry in state.load_state()["reviews"].values():
+        hashes.add(entry.get("content_hash"))
+        if entry["status"] == "pending":
+            hashes.add(entry.get("baseline_hash"))
+    hashes.update(outbox.queued_hashes())
+    hashes.discard(None)
+    return hashes
+
+
+def load_snapshot(digest, directory=None):
+    path = Path(directory or SNAPSHOT_DIR) / f"{digest}.md"
+    if not (digest and path.exists()):
+        return None
+    artifacts.touch(path)
+    return path.read_text()
+
+
+def baseline(local_path):
+    """
+    (content hash, completion time) of the version of `local_path` last
+    reviewed to completion, or (None, None).
+    """
+    entry = state.load_state()["reviews"].get(str(local_path))
+    if entry is None:
+        return None, None
+    if entry["status"] == "completed":
+        return entry.get("content_hash"), entry.get("completed_at")
+    # A newer push is pending; it carried the baseline forward
+    return entry.get("baseline_hash"), entry.get("baseline_at")
+
+
+@dataclass
+class Block:
+    start: int  # 1-based line of the block in its document
+    lines: list
+
+    @property
+    def text(self):
+        return "\n".join(self.lines)
+
+    @property
+    def is_heading(self):
+        return bool(_HEADING_RE.match(self.lines[0]))
+
+
+def split_blocks(text):
+    """Blank-line separated blocks; fenced code stays in one block."""
+    blocks = []
+    current = None
+    fence = None
+    for number, line in enumerate(text.splitlines(), start=1):
+        if fence is None and not line.strip():
+            current = None
+            continue
+        if current is None:
+            current = Block(number, [])
+            blocks.append(current)
+        current.lines.append(line)
+        m = _FENCE_RE.match(line)
+        if fence is None and m:
+            fence = m.group(1)
+        elif fence is not None and line.strip().startswith(fence) and not line.strip().strip(fence[0]):
+            fence = None
+    return blocks
+
+
+@dataclass
+class Changes:
+    markdown: str
+    line_map: list  # original line (or None) per line of `markdown`
+    added: int
+    removed: int
+    collapsed: int
+
+    @property
+    def changed(self):
+        return bool(self.added or self.removed)
+
+
+class _Writer:
+    def __init__(self):
+        self.lines = []
+        self.line_map = []
+
+    def line(self, text, source=None):
+        self.lines.append(text)
+        self.line_map.append(source)
+
+    def block(self, block, mapped=True):
+        for offset, text in enumerate(block.lines):
+            self.line(text, block.start + offset if mapped else None)
+        self.line("")
+
+    def div(self, cls, blocks, mapped):
+        self.line(f"::: {{.{cls}}}")
+        for b in blocks:
+            self.block(b, mapped)
+        self.line(":::")
+        self.line("")
+
+    def collapsed(self, count):
+        if count:
+            self.div_text("sn-collapsed", f"⋯ {count} unchanged block{'s' if count != 1 else ''} ⋯")
+
+    def div_text(self, cls, text):
+        self.line(f"::: {{.{cls}}}")
+        self.line(text)
+        self.line(":::")
+        self.line("")
+
+
+def build(old_text, new_text, title, context=DEFAULT_CONTEXT, since=None):
+    """The changes document turning `old_text` into `new_text`."""
+    old = split_blocks(old_text)
+    new = split_blocks(new_text)
+    matcher = difflib.SequenceMatcher(None, [b.text for b in old], [b.text for b in new], autojunk=False)
+    opcodes = matcher.get_opcodes()
+
+    shown = set()
+    headings = [j for j, b in enumerate(new) if b.is_heading]
+    for tag, _, _, j1, j2 in opcodes:
+        if tag == "equal":
+            continue
+        shown.update(range(max(0, j1 - context), j1))
+        shown.update(range(j2, min(len(new), j2 + context)))
+        # The section a change sits in, even when it is far above
+        above = [j for j in headings if j < j1]
+        if above:
+            shown.add(above[-1])
+
+    added = removed = collapsed = 0
+    body = _Writer()
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "equal":
+            run = 0
+            for j in range(j1, j2):
+                if j in shown:
+                    body.collapsed(run)
+                    collapsed += run
+                    run = 0
+                    body.block(new[j])
+                else:
+                    run += 1
+            body.collapsed(run)
+            collapsed += run
+            continue
+        if i2 > i1:
+            body.div("sn-removed", old[i1:i2], mapped=False)
+            removed += i2 - i1
+        if j2 > j1:
+            body.div("sn-added", new[j1:j2], mapped=True)
+            added += j2 - j1
+
+    out = _Writer()
+    out.line(f"# Changes in {title}")
+    out.line("")
+    summary = f"{added} block(s) added or changed, {removed} removed, {collapsed} unchanged collapsed."
+    out.line(f"*Since the review of {since}: {summary}*" if since else f"*{summary}*")
+    out.line("")
+    out.lines += body.lines
+    out.line_map += body.line_map
+    return Changes("\n".join(out.lines) + "\n", out.line_map, added, removed, collapsed)
+
+
+def remap(entries, line_map, source):
+    """Points source map entries of a changes PDF back at the original file."""
+    remapped = []
+    for e in entries or []:
+        lines = [line_map[n - 1] for n in range(e["start"], e["end"] + 1)
+                 if 0 < n <= len(line_map) and line_map[n - 1] is not None]
+        if lines:
+            remapped.append(dict(e, source=source, start=min(lines), end=max(lines)))
+    return remapped
@@ -1,59 +1,266 @@
+import functools
+import html
 import pypandoc
+from concurrent.futures import ThreadPoolExecutor
 from weasyprint import HTML, CSS
 from pathlib import Path
+from . import sourcemap
+from .trace import span
 
-def convert_to_pdf(input_path, output_path):
+# E-ink optimized CSS
+EINK_CSS = """
+@page {
+    size: A5;
+    margin: 15mm;
+}
+body {
+    font-family: "Georgia", serif;
+    font-size: 11pt;
+    line-height: 1.5;
+    color: black;
+    background-color: white;
+}
+h1, h2, h3, h4 {
+    font-family: "Georgia", serif;
+    font-weight: bold;
+    margin-top: 1.2em;
+}
+h1 { font-size: 18pt; }
+h2 { font-size: 15pt; }
+h3 { font-size: 13pt; }
+
+code, pre {
+    font-family: "Courier New", monospace;
+    font-size: 9pt;
+    background-color: #f0f0f0;
+}
+blockquote {
+    border-left: 2px solid black;
+    padding-left: 1em;
+    margin-left: 0;
+    font-style: italic;
+    font-size: 10pt;
+}
+img {
+    max-width: 100%;
+    height: auto;
+}
+"""
+
+# Extra rules for `review --bundle`: a contents page, each file on a fresh
+# page, and one top-level PDF bookmark per file with its headings nested
+BUNDLE_CSS = """
+nav.sn-toc { break-after: page; }
+nav.sn-toc h1 { bookmark-level: none; }
+nav.sn-toc ol { list-style: none; padding-left: 0; }
+nav.sn-toc a { color: black; text-decoration: none; }
+nav.sn-toc a::after { content: leader('.') target-counter(attr(href), page); }
+section.sn-doc { break-before: page; }
+section.sn-doc h1.sn-doc-title { bookmark-level: 1; }
+section.sn-doc h1:not(.sn-doc-title) { bookmark-level: 2; }
+section.sn-doc h2 { bookmark-level: 3; }
+section.sn-doc h3 { bookmark-level: 4; }
+section.sn-doc h4 { bookmark-level: 5; }
+"""
+
+# Extra rules for `review --since-last`: added blocks carry a heavy rule,
+# removed ones are struck through, collapsed runs are a small grey marker
+CHANGES_CSS = """
+div.sn-added { border-left: 3pt solid black; padding-left: 6pt; }
+div.sn-removed { border-left: 1pt dashed #777; padding-left: 6pt; color: #555; text-decoration: line-through; }
+div.sn-collapsed { color: #777; font-size: 9pt; text-align: center; margin: 0.6em 0; }
+"""
+
+@functools.lru_cache(maxsize=None)
+def get_stylesheet():
+    """The parsed E-ink stylesheet, built once per process."""
+    return CSS(string=EINK_CSS)
+
+@functools.lru_cache(maxsize=None)
+def get_bundle_stylesheet():
+    return CSS(string=BUNDLE_CSS)
+
+@functools.lru_cache(maxsize=None)
+def get_changes_stylesheet():
+    return CSS(string=CHANGES_CSS)
+
+@functools.lru_cache(maxsize=None)
+def get_profile_stylesheet(profile):
+    """Page size and font scale of a device profile (sn.profiles)."""
+    return CSS(string=profile.css())
+
+def _stylesheets(profile, extra=()):
+    sheets = [get_stylesheet(), *extra]
+    if profile is not None:
+        sheets.append(get_profile_stylesheet(profile))
+    return sheets
+
+def warm_up():
     """
-    Converts markdown to PDF optimized for E-ink using WeasyPrint.
+    Parse the stylesheet and run a tiny layout so fonts and WeasyPrint
+    internals are loaded before the first real conversion.
+    """
+    HTML(string="<p>warm-up</p>").render(stylesheets=[get_stylesheet()])
+
+def render_pdf(input_path, source_map=False, on_phase=None, profile=None):
     """
+    Converts markdown to an E-ink optimized PDF in memory using WeasyPrint.
+    Returns (pdf_bytes, entries); entries map page regions back to markdown
+    line ranges (see sn.sourcemap) when source_map=True, else None.
+    `on_phase(message)` is called as each conversion phase starts.
+    `profile` (sn.profiles) sizes the page for a device; None keeps A5.
+    """
+    on_phase = on_phase or (lambda message: None)
+
     # 1. Convert Markdown to HTML using Pandoc
-    html_content = pypandoc.convert_file(str(input_path), 'html')
-    
-    # 2. Define E-ink optimized CSS
-    css_content = """
-    @page {
-        size: A5;
-        margin: 15mm;
-    }
-    body {
-        font-family: "Georgia", serif;
-        font-size: 11pt;
-        line-height: 1.5;
-        color: black;
-        background-color: white;
-    }
-    h1, h2, h3, h4 {
-        font-family: "Georgia", serif;
-        font-weight: bold;
-        margin-top: 1.2em;
-    }
-    h1 { font-size: 18pt; }
-    h2 { font-size: 15pt; }
-    h3 { font-size: 13pt; }
-    
-    code, pre {
-        font-family: "Courier New", monospace;
-        font-size: 9pt;
-        background-color: #f0f0f0;
-    }
-    blockquote {
-        border-left: 2px solid black;
-        padding-left: 1em;
-        margin-left: 0;
-        font-style: italic;
-        font-size: 10pt;
-    }
-    img {
-        max-width: 100%;
-        height: auto;
-    }
-    """
-    
-    # 3. Generate PDF
-    HTML(string=html_content).write_pdf(
-        str(output_path),
-        stylesheets=[CSS(string=css_content)]
+    on_phase("Converting Markdown to HTML")
+    html_content = _pandoc(input_path, source_map)
+
+    # 2. Lay out with the shared E-ink stylesheet and generate PDF
+    return _layout(html_content, source_map, on_phase, profile=profile)
+
+def render_profiles(input_path, profiles, source_map=False, on_phase=None):
+    """
+    Renders one markdown file for several device profiles. Pandoc and HTML
+    parsing run once; the profiles are then laid out one after another.
+    Returns {profile name: (pdf_bytes, entries)}.
+    """
+    on_phase = on_phase or (lambda message: None)
+    on_phase("Converting Markdown to HTML")
+    html_content = _pandoc(input_path, source_map)
+    with span("html_parse"):
+        tree = HTML(string=html_content)
+
+    def render(profile):
+        with span("layout", profile=profile.name):
+            document = tree.render(stylesheets=_stylesheets(profile))
+        with span("pdf_write", profile=profile.name, pages=len(document.pages)):
+            pdf = document.write_pdf()
+        if not source_map:
+            return pdf, None
+        with span("sourcemap", profile=profile.name):
+            return pdf, sourcemap.build(document)
+
+    results = {}
+    for profile in profiles:
+        on_phase(f"Laying out pages for {profile.name}")
+        results[profile.name] = render(profile)
+    return results
+
+def _reader(source_map):
+    """
+    Pandoc's markdown reader, or CommonMark with sourcepos when a source map
+    is wanted: sourcepos is only available for the CommonMark readers.
+    """
+    return 'commonmark_x+sourcepos' if source_map else 'markdown'
+
+def _pandoc(input_path, source_map):
+    with span("pandoc"):
+        return _to_html(input_path, format=_reader(source_map))
+
+def _to_html(input_path=None, text=None, format=None, extra_args=()):
+    """Pandoc markdown, from a file or from `text`, to HTML."""
+    if text is None:
+        return pypandoc.convert_file(str(input_path), 'html', format=format, extra_args=list(extra_args))
+    return pypandoc.convert_text(text, 'html', format=format, extra_args=list(extra_args))
+
+def render_changes(markdown, source_map=False, on_phase=None, profile=None):
+    """
+    Like render_pdf, for the markdown text of a changes document (see
+    sn.changes). Source map lines refer to `markdown`.
+    """
+    on_phase = on_phase or (lambda message: None)
+    on_phase("Converting changes to HTML")
+    with span("pandoc"):
+        html_content = _to_html(text=markdown, format=_reader(source_map))
+    return _layout(html_content, source_map, on_phase, extra=[get_changes_stylesheet()], profile=profile)
+
+def _layout(html_content, source_map, on_phase, extra=(), profile=None):
+    on_phase("Laying out pages")
+    with span("css"):
+        stylesheets = _stylesheets(profile, extra)
+    with span("layout"):
+        document = HTML(string=html_content).render(stylesheets=stylesheets)
+    on_phase(f"Writing PDF ({len(document.pages)} pages)")
+    with span("pdf_write", pages=len(document.pages)):
+        pdf = document.write_pdf()
+
+    if not source_map:
+        return pdf, None
+    with span("sourcemap"):
+        return pdf, sourcemap.build(document)
+
+def render_bundle(input_paths, on_phase=None, profile=None, source_map=False):
+    """
+    Renders several markdown files into one PDF: a contents page, then each
+    file from a new page under its own bookmark. Returns (pdf_bytes,
+    source_map_entries, sections), where sections records the file, title
+    and first/last page of each file for splitting annotations back out.
+    Entries are None unless source_map=True.
+    """
+    on_phase = on_phase or (lambda message: None)
+    input_paths = [Path(p) for p in input_paths]
+
+    on_phase(f"Converting {len(input_paths)} Markdown files to HTML")
+    with span("pandoc", files=len(input_paths)):
+        # Pandoc runs as a subprocess per file, so they convert in parallel
+        with ThreadPoolExecutor(max_workers=min(8, len(input_paths))) as pool:
+            bodies = list(pool.map(
+                lambda item: _to_html(
+                    item[1], format=_reader(source_map),
+                    # Keep heading ids unique across files
+                    extra_args=[f'--id-prefix=d{item[0]}-'],
+                ),
+                enumerate(input_paths, start=1),
+            ))
+
+    titles = [p.name for p in input_paths]
+    toc = "".join(
+        f'<li><a href="#sn-doc-{i}">{html.escape(t)}</a></li>' for i, t in enumerate(titles, start=1)
     )
+    sections = "".join(
+        f'<section class="sn-doc" id="sn-doc-{i}"><h1 class="sn-doc-title">{html.escape(t)}</h1>{body}</section>'
+        for i, (t, body) in enumerate(zip(titles, bodies), start=1)
+    )
+    html_content = f'<nav class="sn-toc"><h1>Contents</h1><ol>{toc}</ol></nav>{sections}'
+
+    on_phase("Laying out pages")
+    with span("css"):
+        stylesheets = _stylesheets(profile, [get_bundle_stylesheet()])
+    with span("layout"):
+        document = HTML(string=html_content).render(stylesheets=stylesheets)
+    on_phase(f"Writing PDF ({len(document.pages)} pages)")
+    with span("pdf_write", pages=len(document.pages)):
+        pdf = document.write_pdf()
+    entries = None
+    if source_map:
+        with span("sourcemap"):
+            entries = sourcemap.build(document)
+
+    starts = section_pages(document, [f"sn-doc-{i}" for i in range(1, len(input_paths) + 1)])
+    ranges = []
+    for i, (path, title, first) in enumerate(zip(input_paths, titles, starts)):
+        following = [s for s in starts[i + 1:] if s is not None]
+        last = (following[0] - 1) if following else len(document.pages)
+        ranges.append({"file": str(path), "title": title, "first_page": first, "last_page": last})
+    return pdf, entries, ranges
+
+def section_pages(document, anchor_ids):
+    """1-based page on which each anchor id starts, or None if absent."""
+    found = {}
+    for page_no, page in enumerate(document.pages, start=1):
+        for anchor in page.anchors:
+            found.setdefault(anchor, page_no)
+    return [found.get(a) for a in anchor_ids]
+
+def convert_to_pdf(input_path, output_path, source_map=False, on_phase=None, profile=None):
+    """
+    Converts markdown to PDF optimized for E-ink and writes it to output_path.
+    With source_map=True, returns the source map entries (see render_pdf).
+    """
+    pdf, entries = render_pdf(input_path, source_map=source_map, on_phase=on_phase, profile=profile)
+    Path(output_path).write_bytes(pdf)
+    return entries
 
 def get_pdf_name(input_path):
     p = Path(input_path)
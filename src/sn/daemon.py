@@ -0,0 +1,169 @@
+"""A warm `sn-review` process serving JSON-RPC over a Unix socket.
+
+`sn-review daemon` keeps Python, the converter and the device connection
+loaded; the CLI and agent_integration forward calls to it when its socket
+exists and fall back to doing the work themselves when it does not.
+
+Each connection carries newline-delimited JSON-RPC 2.0 requests. Results
+hold the API's structured data plus the progress lines the work echoed, so
+clients can replay them.
+"""
+
+import inspect
+import json
+import os
+import socket
+import socketserver
+from pathlib import Path
+
+from . import api, outbox, workflow
+
+# Next to .sn_state.json: one daemon per project directory
+SOCKET_PATH = Path(".sn_daemon.sock")
+
+PARSE_ERROR = -32700
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+
+class DaemonError(Exception):
+    """The daemon ran the call and it failed."""
+
+    def __init__(self, message, code=SERVER_ERROR):
+        super().__init__(message)
+        self.code = code
+
+
+def _request_review(echo, file_path, keep_local=True, since_last=False, profile=None, source_map=False):
+    return api.request_review(file_path, echo=echo, keep_local=keep_local, since_last=since_last,
+                              profile=profile, source_map=source_map).to_dict()
+
+
+def _request_bundle(echo, file_paths, name=None, keep_local=True, profile=None, source_map=False):
+    return api.request_bundle(file_paths, name=name, echo=echo, keep_local=keep_local, profile=profile,
+                              source_map=source_map).to_dict()
+
+
+def _retrieve_review(echo, file_pattern=None, ocr=False, marks=False):
+    return [r.to_dict() for r in api.retrieve_review(file_pattern, echo=echo, ocr=ocr, marks=marks)]
+
+
+def _list_pending(echo):
+    return [p.to_dict() for p in api.list_pending()]
+
+
+METHODS = {
+    "request_review": _request_review,
+    "request_bundle": _request_bundle,
+    "retrieve_review": _retrieve_review,
+    "list_pending": _list_pending,
+    "ping": lambda echo: "pong",
+}
+
+
+def handle(request):
+    """Runs one JSON-RPC request dict and returns the response dict."""
+    req_id = request.get("id")
+    method = METHODS.get(request.get("method"))
+    if method is None:
+        return _error(req_id, METHOD_NOT_FOUND, f"Unknown method: {request.get('method')}")
+    params = request.get("params", {})
+    try:
+        inspect.signature(method).bind(None, **params)
+    except TypeError as e:
+        return _error(req_id, INVALID_PARAMS, str(e))
+    log = []
+    try:
+        result = method(lambda message="", err=False: log.append([message, err]), **params)
+    except Exception as e:
+        return _error(req_id, SERVER_ERROR, str(e), log)
+    return {"jsonrpc": "2.0", "id": req_id, "result": {"value": result, "log": log}}
+
+
+def _error(req_id, code, message, log=None):
+    return {"jsonrpc": "2.0", "id": req_id, "error": {"code": code, "message": message, "data": {"log": log or []}}}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = handle(json.loads(line))
+            except json.JSONDecodeError as e:
+                response = _error(None, PARSE_ERROR, str(e))
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class DaemonServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path=SOCKET_PATH):
+        self.path = Path(path)
+        if self.path.exists():
+            if is_running(self.path):
+                raise RuntimeError(f"A daemon is already listening on {self.path}")
+            # Left behind by a daemon that did not shut down cleanly
+            self.path.unlink()
+        super().__init__(str(self.path), _Handler)
+
+    def server_close(self):
+        super().server_close()
+        if self.path.exists():
+            os.unlink(self.path)
+
+
+def serve(path=SOCKET_PATH):
+    # Reviews queued while the tablet was away go out as soon as it returns
+    outbox.OutboxFlusher(api._session.get).start()
+    with DaemonServer(path) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+class DaemonClient:
+    def __init__(self, path=None, timeout=None):
+        self.path = Path(path or SOCKET_PATH)
+        self.timeout = timeout
+        self._next_id = 0
+
+    def call(self, method, echo=None, **params):
+        """
+        Calls `method` on the daemon and returns its result, replaying the
+        daemon's progress output through `echo`. Raises DaemonError when the
+        call fails and OSError when no daemon is listening.
+        """
+        self._next_id += 1
+        request = {"jsonrpc": "2.0", "id": self._next_id, "method": method, "params": params}
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(str(self.path))
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            with sock.makefile("rb") as f:
+                response = json.loads(f.readline())
+
+        if "error" in response:
+            error = response["error"]
+            _replay(error.get("data", {}).get("log", []), echo)
+            raise DaemonError(error["message"], error["code"])
+        _replay(response["result"]["log"], echo)
+        return response["result"]["value"]
+
+
+def _replay(log, echo):
+    if echo:
+        for message, err in log:
+            echo(message, err=err)
+
+
+def is_running(path=SOCKET_PATH):
+    """True when a daemon answers on `path`."""
+    if not Path(path).exists():
+        return False
+    try:
+        return DaemonClient(path, timeout=2).call("ping") == "pong"
+    except (OSError, ValueError, DaemonError):
+        return False
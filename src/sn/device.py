@@ -1,11 +1,39 @@
 import adbutils
+import io
 import os
+import shlex
+import threading
+import time
 from pathlib import Path
 
+from .trace import span, traced
+
+# adb shell command lines travel as one argument; stay well under ARG_MAX
+MAX_COMMAND_BYTES = 64 * 1024
+
+
+def rm_commands(remote_paths, max_bytes=MAX_COMMAND_BYTES):
+    """Batched `rm -f` command lines for the paths, normally just one."""
+    commands, current = [], "rm -f"
+    for path in remote_paths:
+        arg = " " + shlex.quote(path)
+        if len(current) + len(arg) > max_bytes and current != "rm -f":
+            commands.append(current)
+            current = "rm -f"
+        current += arg
+    if current != "rm -f":
+        commands.append(current)
+    return commands
+
+
 class SupernoteDevice:
     def __init__(self):
-        self.adb = adbutils.AdbClient(host="127.0.0.1", port=5037)
-        self.device = self._get_device()
+        with span("adb_discover"):
+            self.adb = adbutils.AdbClient(host="127.0.0.1", port=5037)
+            self.device = self._get_device()
+        # Remote directories already created on this connection
+        self._dirs = set()
+        self._model = None
 
     def _get_device(self):
         devices = self.adb.device_list()
@@ -23,23 +51,71 @@ class SupernoteDevice:
         # Fallback to the first one
         return devices[0]
 
+    def model(self):
+        """The tablet's ro.product.model, read once per connection."""
+        if self._model is None:
+            with span("getprop"):
+                self._model = self.device.getprop("ro.product.model").strip()
+        return self._model
+
     def ensure_dir(self, remote_dir):
+        if remote_dir in self._dirs:
+            return
         # adbutils doesn't have a direct mkdir -p, we'll use shell
-        self.device.shell(f"mkdir -p {remote_dir}")
+        with span("mkdir", path=remote_dir):
+            self.device.shell(f"mkdir -p {remote_dir}")
+        self._dirs.add(remote_dir)
 
-    def push(self, local_path, remote_path):
+    def push(self, local_path, remote_path, on_chunk=None):
+        """
+        Pushes a file, or PDF bytes held in memory. `on_chunk(done, total)` is
+        called as bytes are sent; if it raises, the transfer is aborted and
+        the partial file removed.
+        """
         remote_dir = os.path.dirname(remote_path)
         self.ensure_dir(remote_dir)
-        self.device.sync.push(local_path, remote_path)
+        if on_chunk is None:
+            with span("push", path=remote_path):
+                self.device.sync.push(local_path, remote_path)
+            return
+        if isinstance(local_path, bytes):
+            f, total = io.BytesIO(local_path), len(local_path)
+        else:
+            f, total = open(local_path, "rb"), os.path.getsize(local_path)
+        with f, span("push", path=remote_path, bytes=total):
+            try:
+                self.device.sync.push(_ReportingReader(f, total, on_chunk), remote_path)
+            except BaseException:
+                for command in rm_commands([remote_path]):
+                    self.device.shell(command)
+                raise
 
-    def pull(self, remote_path, local_path):
-        self.device.sync.pull(remote_path, local_path)
+    @traced("pull")
+    def pull(self, remote_path, local_path, on_chunk=None):
+        """Pulls a file, streaming chunks so `on_chunk(done, total)` can report or abort."""
+        if on_chunk is None:
+            self.device.sync.pull(remote_path, local_path)
+            return
+        total = self.device.sync.stat(remote_path).size
+        done = 0
+        try:
+            with open(local_path, "wb") as f:
+                for chunk in self.device.sync.iter_content(remote_path):
+                    f.write(chunk)
+                    done += len(chunk)
+                    on_chunk(done, total)
+        except BaseException:
+            if os.path.exists(local_path):
+                os.remove(local_path)
+            raise
 
+    @traced("exists")
     def exists(self, remote_path):
         # Check if file exists on device
         res = self.device.shell(f"ls {remote_path}")
         return "No such file" not in res
 
+    @traced("intent_launch")
     def open_pdf(self, remote_path):
         """
         Opens the specified PDF in the native Supernote viewer.
@@ -54,9 +130,70 @@ class SupernoteDevice:
         )
         return self.device.shell(cmd)
 
+    def remove(self, remote_paths):
+        """Deletes files with as few shell round trips as possible."""
+        for command in rm_commands(remote_paths):
+            with span("remove", files=command.count(" ") - 1):
+                self.device.shell(command)
+
+    @traced("list_dir")
     def list_dir(self, remote_dir):
         """Returns a list of filenames in the directory."""
         res = self.device.shell(f"ls {remote_dir}")
         if "No such file" in res:
             return []
         return [f.strip() for f in res.splitlines() if f.strip()]
+
+    @traced("health_check")
+    def is_alive(self):
+        """Cheap round trip to confirm the connection still works."""
+        try:
+            return self.device.shell("echo ok").strip() == "ok"
+        except Exception:
+            return False
+
+
+class _ReportingReader:
+    """File wrapper that reports each read so pushes can show progress or abort."""
+
+    def __init__(self, f, total, on_chunk):
+        self.f = f
+        self.total = total
+        self.on_chunk = on_chunk
+        self.done = 0
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.done += len(data)
+        self.on_chunk(self.done, self.total)
+        return data
+
+
+class DeviceSession:
+    """
+    Keeps one SupernoteDevice connected across calls for long-running hosts
+    such as the MCP server. The connection is health-checked at most every
+    `check_interval` seconds and re-established when the check fails.
+    """
+
+    def __init__(self, check_interval=15.0, factory=None):
+        self.check_interval = check_interval
+        self._factory = factory or SupernoteDevice
+        self._device = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._device is not None and now - self._checked_at < self.check_interval:
+                return self._device
+            if self._device is None or not self._device.is_alive():
+                self._device = self._factory()
+            self._checked_at = now
+            return self._device
+
+    def invalidate(self):
+        """Drop the cached connection so the next get() reconnects."""
+        with self._lock:
+            self._device = None
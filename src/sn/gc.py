@@ -0,0 +1,208 @@
+"""Retention policies for review files left on the device.
+
+Every review leaves a timestamped PDF (and maybe a `.mark` sidecar) in
+ForReview, and every export adds a PDF to EXPORT. `sn-review gc` plans the
+deletions from one listing of each folder plus local state, removes them
+with a single batched `rm`, and records the removal on the state entries so
+the two stay consistent.
+
+Only files of completed reviews go by default, including earlier pushes
+of a document that `done` retrieved before it was sent again (state keeps
+them in each entry's history). Files of pending reviews, and exports that
+may still answer one, are never touched. Pushes replaced before they were
+retrieved, and files older than any push state knows of (superseded), may
+hold handwriting that was never retrieved, so they go only with
+`include_unretrieved`. Files `review` did not create are left alone unless
+`include_untracked` is set.
+"""
+
+import posixpath
+from dataclasses import asdict, dataclass
+from datetime import datetime
+
+from . import retrieval, state
+
+
+@dataclass
+class RemoteFile:
+    path: str
+    folder: str  # "for_review" or "export"
+    stem: str
+    timestamp: datetime | None
+    status: str  # "pending", "completed", "superseded" or "untracked"
+    review: str | None = None  # local path of the owning review
+    push: str | None = None  # device path of the owning push
+    reason: str | None = None  # why it is deleted, when it is
+
+    def to_dict(self):
+        d = asdict(self)
+        d["timestamp"] = self.timestamp.isoformat() if self.timestamp else None
+        return d
+
+
+def _base_name(name):
+    return name[:-len(retrieval.MARK_SUFFIX)] if name.endswith(retrieval.MARK_SUFFIX) else name
+
+
+def classify(for_review_dir, for_review_listing, export_dir, export_listing, reviews):
+    """RemoteFiles for both listings, each tied to its review where known."""
+    by_device_name = {}
+    by_pulled = {}
+    by_stem = {}
+    for local_path, info in _pushes(reviews):
+        name = posixpath.basename(info["device_path"])
+        by_device_name[name] = (local_path, info)
+        if info.get("pulled_from"):
+            by_pulled[posixpath.basename(info["pulled_from"])] = (local_path, info)
+        by_stem.setdefault(retrieval.parse_export_name(name)[0], []).append((local_path, info))
+
+    files = []
+    for name in for_review_listing:
+        base = _base_name(name)
+        if not base.endswith(".pdf"):
+            continue
+        stem, ts = retrieval.parse_export_name(base)
+        owner = by_device_name.get(base)
+        if owner is None and _superseded(by_stem.get(stem, []), ts):
+            owner = SUPERSEDED
+        files.append(_remote(posixpath.join(for_review_dir, name), "for_review", stem, ts, owner))
+
+    for name in export_listing:
+        if not name.endswith(".pdf"):
+            continue
+        stem, ts = retrieval.parse_export_name(name)
+        owner = by_pulled.get(name)
+        if owner is None:
+            owner = _export_owner(by_stem.get(stem, []), ts)
+        files.append(_remote(posixpath.join(export_dir, name), "export", stem, ts, owner))
+    return files
+
+
+# Older than every push in state: from before state kept a history, or lost
+SUPERSEDED = object()
+
+
+def _pushes(reviews):
+    """(local path, push) for every entry and every earlier push in its history."""
+    for local_path, info in reviews.items():
+        yield local_path, info
+        for earlier in info.get("history", []):
+            if earlier["status"] != "completed":
+                # Replaced before `done` pulled it back
+                earlier = dict(earlier, status="superseded")
+            yield local_path, earlier
+
+
+def _pushed_at(info):
+    return retrieval.parse_export_name(posixpath.basename(info["device_path"]))[1]
+
+
+def _superseded(candidates, ts):
+    """True when a newer push of the same document is in state."""
+    return ts is not None and any(
+        _pushed_at(info) is not None and ts < _pushed_at(info) for _, info in candidates
+    )
+
+
+def _export_owner(candidates, ts):
+    """The review an un-pulled export most likely belongs to."""
+    # An export made after a pending review was pushed may be its answer
+    for local_path, info in candidates:
+        pushed_at = _pushed_at(info)
+        if info["status"] == "pending" and (ts is None or pushed_at is None or ts >= pushed_at):
+            return local_path, info
+    # Otherwise it answers the last push made before it
+    earlier = [c for c in candidates
+               if ts is not None and _pushed_at(c[1]) is not None and _pushed_at(c[1]) <= ts]
+    if earlier:
+        return max(earlier, key=lambda c: _pushed_at(c[1]))
+    if _superseded(candidates, ts):
+        return SUPERSEDED
+    completed = [c for c in candidates if c[1]["status"] == "completed"]
+    return completed[-1] if completed else None
+
+
+def _remote(path, folder, stem, ts, owner):
+    if owner is None:
+        return RemoteFile(path, folder, stem, ts, "untracked")
+    if owner is SUPERSEDED:
+        return RemoteFile(path, folder, stem, ts, "superseded")
+    local_path, info = owner
+    return RemoteFile(path, folder, stem, ts, info["status"], local_path, info["device_path"])
+
+
+def plan(files, older_than=None, keep_last=None, include_untracked=False, include_unretrieved=False, now=None):
+    """
+    Picks the files to delete. A file goes when its review is completed
+    (or it is superseded and include_unretrieved, or untracked and
+    include_untracked), is older than `older_than` (a
+    timedelta; files without a timestamp never count as old) and is not
+    among the newest `keep_last` of its stem in its folder.
+    """
+    now = now or datetime.now()
+    protected_rank = {}
+    if keep_last:
+        groups = {}
+        for f in files:
+            groups.setdefault((f.folder, f.stem), []).append(f)
+        for group in groups.values():
+            # .mark sidecars share their PDF's rank
+            pdfs = sorted({_base_name(f.path) for f in group},
+                          key=lambda p: retrieval.parse_export_name(posixpath.basename(p))[1] or datetime.min,
+                          reverse=True)
+            for rank, p in enumerate(pdfs):
+                protected_rank[p] = rank
+
+    doomed = []
+    for f in files:
+        if f.status == "pending" or (f.status == "untracked" and not include_untracked):
+            continue
+        if f.status == "superseded" and not include_unretrieved:
+            continue
+        if older_than is not None and (f.timestamp is None or now - f.timestamp < older_than):
+            continue
+        if keep_last and protected_rank.get(_base_name(f.path), 0) < keep_last:
+            continue
+        reasons = [f.status]
+        if older_than is not None:
+            reasons.append(f"older than {older_than.days}d")
+        if keep_last:
+            reasons.append(f"beyond newest {keep_last}")
+        f.reason = ", ".join(reasons)
+        doomed.append(f)
+    return doomed
+
+
+def record_removed(files):
+    """Marks the state entries (or earlier pushes in their history) whose device files were deleted."""
+    removed_at = datetime.now().isoformat()
+    with state.transaction() as s:
+        for f in files:
+            entry = s["reviews"].get(f.review) if f.review else None
+            if entry is None:
+                continue
+            push = next((p for p in [entry, *entry.get("history", [])] if p["device_path"] == f.push), None)
+            if push is not None:
+                push["export_removed_at" if f.folder == "export" else "device_removed_at"] = removed_at
+        # Earlier pushes with nothing left on the device need no record
+        for entry in s["reviews"].values():
+            if "history" in entry:
+                entry["history"] = [p for p in entry["history"] if not (
+                    "device_removed_at" in p and ("export_removed_at" in p or not p.get("pulled_from")))]
+
+
+def collect(device, for_review_dir, export_dir=retrieval.EXPORT_DIR, older_than=None, keep_last=None,
+            include_untracked=False, include_unretrieved=False, dry_run=False, now=None):
+    """
+    Lists both folders once, plans deletions and, unless dry_run, removes
+    them in one batched shell call and updates state. Returns the
+    planned files.
+    """
+    reviews = state.load_state()["reviews"]
+    files = classify(for_review_dir, device.list_dir(for_review_dir),
+                     export_dir, device.list_dir(export_dir), reviews)
+    doomed = plan(files, older_than, keep_last, include_untracked, include_unretrieved, now)
+    if doomed and not dry_run:
+        device.remove([f.path for f in doomed])
+        record_removed(doomed)
+    return doomed
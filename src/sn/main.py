@@ -1,162 +1,279 @@
-import click
+import cProfile
+import json
 import os
+from datetime import timedelta
 from pathlib import Path
-from datetime import datetime
-from .device import SupernoteDevice
-from .converter import convert_to_pdf
-from . import state
+import click
+from . import daemon, gc, outbox, profiles, retrieval, trace, watch, workflow
+from .converter import render_profiles
+
+
+def _via_daemon(method, local, echo=click.echo, **params):
+    """
+    Runs `method` on a warm `sn-review daemon` when one is listening here,
+    otherwise calls `local(echo=...)` in this process.
+    """
+    ctx = click.get_current_context(silent=True)
+    # Traced or profiled commands run here, where the instrumentation is
+    in_process = ctx is not None and (ctx.find_root().obj or {}).get("in_process")
+    if daemon.SOCKET_PATH.exists() and not in_process:
+        try:
+            return daemon.DaemonClient().call(method, echo=echo, **params)
+        except (ConnectionRefusedError, FileNotFoundError):
+            # Stale socket; do the work ourselves
+            pass
+    return local(echo=echo)
+
+
+def _to_stderr(message="", err=False):
+    # With --json, stdout carries only the JSON document
+    click.echo(message, err=True)
+
+
+def _emit_json(data):
+    click.echo(json.dumps(data, indent=2))
+
+
+_json_option = click.option('--json', 'as_json', is_flag=True,
+                            help="Print a machine-readable JSON result on stdout.")
 
 @click.group()
-def cli():
+@click.option('--trace', 'trace_path', type=click.Path(dir_okay=False),
+              help="Write a Chrome trace-event JSON of the command's spans to this file.")
+@click.option('--profile', 'profile_path', type=click.Path(dir_okay=False),
+              help="Write cProfile stats for the command to this file.")
+@click.pass_context
+def cli(ctx, trace_path, profile_path):
     """Supernote Review CLI - Supernote round-trip workflow."""
-    pass
+    ctx.obj = {"in_process": bool(trace_path or profile_path)}
+    if trace_path:
+        recorder = trace.start()
+        started = recorder.now_us()
 
-@cli.command()
-@click.argument('file_path', type=click.Path(exists=True))
-def review(file_path):
-    """Push a markdown file to Supernote for review."""
-    file_path = Path(file_path)
-    
-    # Generate unique filename with timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    pdf_name = f"{file_path.stem}_{timestamp}.pdf"
-    
-    local_pdf = file_path.parent / pdf_name
-    remote_path = f"/storage/emulated/0/Document/PDFs/ForReview/{pdf_name}"
+        def write_trace():
+            # One span covering the whole command
+            recorder.add(f"sn-review {ctx.invoked_subcommand}", started, recorder.now_us())
+            trace.stop()
+            recorder.write(trace_path)
+            click.echo(f"Trace written to {trace_path}", err=True)
+        ctx.call_on_close(write_trace)
+    if profile_path:
+        profiler = cProfile.Profile()
+        profiler.enable()
 
-    click.echo(f"  -> Input: {file_path}")
-    click.echo(f"  -> Output: {local_pdf}")
-    click.echo(f"  -> Remote: {remote_path}")
-    
-    click.echo(f"\n[1/3] Converting Markdown to PDF...")
-    convert_to_pdf(file_path, local_pdf)
-    file_size_kb = local_pdf.stat().st_size / 1024
-    click.echo(f"  -> PDF generated ({file_size_kb:.1f} KB)")
+        def write_profile():
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+            click.echo(f"Profile written to {profile_path}", err=True)
+        ctx.call_on_close(write_profile)
 
-    click.echo(f"[2/3] Connecting to Supernote...")
+@cli.command()
+@click.argument('file_paths', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('--no-local-copy', is_flag=True,
+              help="Push the PDF from memory without keeping a local copy in the artifact store.")
+@click.option('--bundle', is_flag=True,
+              help="Render all files into one PDF with a contents page and one bookmark per file.")
+@click.option('--name', default=None,
+              help="Review name of a --bundle PDF [default: first file's name plus a hash of the file list].")
+@click.option('--since-last', is_flag=True,
+              help="Send only what changed since the last completed review of the file.")
+@click.option('--device-profile', 'profile', type=click.Choice(list(profiles.PROFILES)), default=None,
+              help="Lay pages out for this device instead of the connected one.")
+@click.option('--source-map', is_flag=True,
+              help="Record the markdown lines behind each page region (reads the file as CommonMark).")
+@_json_option
+def review(file_paths, no_local_copy, bundle, name, since_last, profile, source_map, as_json):
+    """Push a markdown file (or, with --bundle, several) to Supernote for review."""
+    if len(file_paths) > 1 and not bundle:
+        raise click.UsageError("Pass --bundle to review several files as one PDF.")
+    if bundle and since_last:
+        raise click.UsageError("--since-last works on a single file, not a --bundle.")
+    keep_local = not no_local_copy
+    echo = _to_stderr if as_json else click.echo
     try:
-        device = SupernoteDevice()
-        click.echo(f"  -> Connected to {device.device.serial}")
-        
-        click.echo(f"[3/3] Pushing file...")
-        device.push(str(local_pdf), remote_path)
-        state.add_review(file_path, remote_path)
-        click.echo(f"  -> Upload complete")
-        
-        click.echo("Launching viewer on device...")
-        device.open_pdf(remote_path)
-        
-        click.echo("\nSuccess! Document is open for review.")
+        if bundle:
+            result = _via_daemon("request_bundle",
+                                 lambda echo: workflow.request_bundle(file_paths, name=name, echo=echo,
+                                                                      keep_local=keep_local, profile=profile,
+                                                                      source_map=source_map),
+                                 echo=echo, file_paths=list(file_paths), name=name, keep_local=keep_local,
+                                 profile=profile, source_map=source_map)
+        else:
+            file_path = file_paths[0]
+            result = _via_daemon("request_review",
+                                 lambda echo: workflow.request_review(file_path, echo=echo, keep_local=keep_local,
+                                                                      since_last=since_last, profile=profile,
+                                                                      source_map=source_map),
+                                 echo=echo, file_path=file_path, keep_local=keep_local, since_last=since_last,
+                                 profile=profile, source_map=source_map)
     except Exception as e:
         click.echo(f"Error: {e}", err=True)
+        if as_json:
+            _emit_json({"error": str(e)})
+            raise SystemExit(1)
+        return
+    if as_json:
+        _emit_json(result)
+
+@cli.command()
+@click.argument('file_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--device-profile', 'profile_names', multiple=True, type=click.Choice(list(profiles.PROFILES)),
+              help="Device to render for; repeat for several. Defaults to all of them.")
+def render(file_path, profile_names):
+    """Render a markdown file to a PDF per device profile, without a device."""
+    targets = [profiles.get(n) for n in profile_names] or list(profiles.PROFILES.values())
+    source = Path(file_path)
+    # One pandoc run and one parsed tree, laid out per profile
+    results = render_profiles(source, targets)
+    for name, (pdf, _) in results.items():
+        out = source.with_name(f"{source.stem}.{name}.pdf")
+        out.write_bytes(pdf)
+        click.echo(f"{out} ({len(pdf) / 1024:.1f} KB)")
 
 @cli.command()
 @click.argument('file_pattern', required=False)
-def done(file_pattern):
+@click.option('--ocr', is_flag=True,
+              help="Read the handwriting in each annotated region with a local tesseract.")
+@click.option('--marks', is_flag=True,
+              help="Without an export, read the handwriting from the device's .mark sidecar (experimental).")
+@_json_option
+def done(file_pattern, ocr, marks, as_json):
     """Retrieve annotated PDF and generate review summary."""
-    pending = state.get_pending_reviews()
-    
-    if not pending:
-        click.echo("No pending reviews found.")
+    try:
+        results = _via_daemon("retrieve_review",
+                              lambda echo: workflow.retrieve_reviews(file_pattern, echo=echo, ocr=ocr, marks=marks),
+                              echo=_to_stderr if as_json else click.echo, file_pattern=file_pattern, ocr=ocr,
+                              marks=marks)
+    except Exception as e:
+        click.echo(f"Error: {e}", err=True)
+        if as_json:
+            _emit_json({"error": str(e)})
+            raise SystemExit(1)
         return
 
-    # If pattern is provided, filter; otherwise list and ask
-    targets = []
-    if file_pattern:
-        targets = [k for k in pending if file_pattern in k]
-    else:
-        # Just pick the most recent or list them
-        targets = list(pending.keys())
-
-    if not targets:
-        click.echo(f"No pending review matching '{file_pattern}'")
+    if as_json:
+        # Built from the in-memory results; the report text is included as-is
+        _emit_json({"reviews": results})
         return
 
-    for local_path_str in targets:
-        info = pending[local_path_str]
-        local_path = Path(local_path_str)
-        remote_path = info['device_path']
-        
-        # The file on device is named like: file_TIMESTAMP.pdf
-        # If the user exports it, it ends up in /storage/emulated/0/EXPORT/file_TIMESTAMP.pdf
-        
-        export_name = Path(remote_path).name
-        remote_export_path = f"/storage/emulated/0/EXPORT/{export_name}"
-        
-        click.echo(f"\nProcessing review for: {local_path.name}")
-        click.echo(f"  -> Looking for exact export: {export_name}")
-        
-        device = SupernoteDevice()
-        pull_path = None
-        
-        # 1. Try Exact Match
-        if device.exists(remote_export_path):
-            pull_path = remote_export_path
-            click.echo(f"  -> Exact match found!")
-            
-        # 2. Try Fuzzy Match (Same stem, different timestamp)
-        else:
-            click.echo(f"  -> Exact match not found. Searching for other versions...")
-            # Pattern: stem_*.pdf
-            search_prefix = f"{local_path.stem}_"
-            candidates = []
-            
-            try:
-                files = device.list_dir("/storage/emulated/0/EXPORT/")
-                for f in files:
-                    if f.startswith(search_prefix) and f.endswith(".pdf"):
-                        candidates.append(f)
-            except Exception as e:
-                click.echo(f"  -> [WARN] Error listing exports: {e}", err=True)
-
-            if candidates:
-                # Pick the most recent (assuming standard naming sort works or just last one)
-                candidates.sort() 
-                best_match = candidates[-1]
-                pull_path = f"/storage/emulated/0/EXPORT/{best_match}"
-                click.echo(f"  -> Found alternative: {best_match}")
-            else:
-                # 3. Fallback to original remote path (un-annotated)
-                click.echo(f"  -> [WARN] No exported annotations found. Pulling original file.", err=True)
-                pull_path = remote_path
-
-        # We pull it back to a distinct name to avoid overwriting previous reviews if any
-        reviewed_pdf_name = f"{local_path.stem}_reviewed_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        reviewed_pdf = local_path.parent / reviewed_pdf_name
-        
-        click.echo(f"Downloading artifact to: {reviewed_pdf.name}...")
-        device.pull(pull_path, str(reviewed_pdf))
-        click.echo("  -> Download complete.")
-        
-        # Generate review markdown (No prompt, LLM-ready)
-        review_md = local_path.parent / f"{local_path.stem}-review.md"
-        
-        with open(review_md, "w") as f:
-            f.write(f"# Review: {local_path.name}\n\n")
-            f.write(f"**Date:** {datetime.now().strftime('%Y-%m-%d %H:%M')}\n")
-            f.write(f"**Annotated PDF:** [{reviewed_pdf.name}]({reviewed_pdf.name})\n\n")
-            f.write("## Status\n")
-            f.write("Review completed on device. See annotated PDF for details.")
-            f.write("\n")
-
-        state.mark_completed(local_path_str)
-        click.echo(f"Created review report: {review_md.name}", err=True)
-        
-        # Output the content to stdout for piping/agent consumption
-        with open(review_md, "r") as f:
-            print(f.read())
+    # Output the reports to stdout for piping/agent consumption
+    for result in results:
+        print(result["report"])
 
-@cli.command()
-def list():
+@cli.command(name="list")
+@_json_option
+def list_reviews(as_json):
     """List all pending reviews."""
-    pending = state.get_pending_reviews()
-    if not pending:
+    pending = _via_daemon("list_pending", lambda echo: workflow.list_pending())
+    queued = outbox.pending()
+    if as_json:
+        _emit_json({"pending": pending, "queued": queued})
+        return
+    if not pending and not queued:
         click.echo("No pending reviews.")
         return
     
-    click.echo("Pending Reviews:")
-    for path, info in pending.items():
-        click.echo(f"- {Path(path).name} (Out since: {info['timestamp']})")
+    if pending:
+        click.echo("Pending Reviews:")
+    for info in pending:
+        click.echo(f"- {info['name']} (Out since: {info['timestamp']})")
+    _echo_queued(queued)
+
+def _echo_queued(queued):
+    if queued:
+        click.echo("Queued until the tablet reconnects:")
+    for meta in queued:
+        click.echo(f"- {os.path.basename(meta['file'])} (Queued since: {meta['queued_at']})")
+
+@cli.command(name="outbox")
+@click.option('--flush', is_flag=True, help="Push queued reviews now.")
+@click.option('--wait', 'wait_seconds', type=float,
+              help="Wait up to this many seconds for the tablet, then push queued reviews.")
+def outbox_command(flush, wait_seconds):
+    """Show or push reviews queued while the tablet was unreachable."""
+    queued = outbox.pending()
+    if not queued:
+        click.echo("Outbox is empty.")
+        return
+    _echo_queued(queued)
+    try:
+        if wait_seconds is not None:
+            click.echo(f"Waiting up to {wait_seconds:g}s for the Supernote...")
+            done = outbox.wait_and_flush(workflow.connect_device, click.echo, timeout=wait_seconds)
+            if not done:
+                click.echo("Supernote did not connect; reviews remain queued.", err=True)
+        elif flush:
+            outbox.flush(workflow.connect_device(), click.echo)
+    except Exception as e:
+        click.echo(f"Error: {e}", err=True)
+
+@cli.command(name="gc")
+@click.option('--older-than', 'older_than', type=float, metavar="DAYS",
+              help="Only delete files whose timestamp is older than this many days.")
+@click.option('--keep-last', type=int, default=1, show_default=True,
+              help="Always keep the newest N files of each document in each folder (0 keeps none).")
+@click.option('--include-untracked', is_flag=True,
+              help="Also delete PDFs in ForReview/EXPORT that no recorded review created.")
+@click.option('--include-unretrieved', is_flag=True,
+              help="Also delete pushes replaced before `done` retrieved them, whose handwriting was never pulled back.")
+@click.option('--dry-run', is_flag=True, help="Show what would be deleted without deleting.")
+@_json_option
+def gc_command(older_than, keep_last, include_untracked, include_unretrieved, dry_run, as_json):
+    """Delete completed review files from the device."""
+    try:
+        device = workflow.connect_device()
+        doomed = gc.collect(
+            device, workflow.FOR_REVIEW_DIR, retrieval.EXPORT_DIR,
+            older_than=timedelta(days=older_than) if older_than is not None else None,
+            keep_last=keep_last or None, include_untracked=include_untracked,
+            include_unretrieved=include_unretrieved, dry_run=dry_run,
+        )
+    except Exception as e:
+        click.echo(f"Error: {e}", err=True)
+        if as_json:
+            _emit_json({"error": str(e)})
+            raise SystemExit(1)
+        return
+    if as_json:
+        _emit_json({"dry_run": dry_run, "deleted": [f.to_dict() for f in doomed]})
+        return
+    if not doomed:
+        click.echo("Nothing to delete.")
+        return
+    for f in doomed:
+        click.echo(f"- {f.path} ({f.reason})")
+    click.echo(f"{'Would delete' if dry_run else 'Deleted'} {len(doomed)} file(s).")
+
+@cli.command(name="watch-local")
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('--debounce', type=float, default=watch.DEFAULT_DEBOUNCE, show_default=True,
+              help="Seconds of quiet after the last write before a batch is sent.")
+@click.option('--poll', is_flag=True, help="Poll for changes instead of using inotify.")
+def watch_local(directory, debounce, poll):
+    """Send markdown files in DIRECTORY for review whenever they change."""
+    watcher = watch.open_watcher(directory, poll=poll)
+    mode = "polling" if isinstance(watcher, watch.PollingWatcher) else "inotify"
+    click.echo(f"Watching {directory} for markdown changes ({mode}, Ctrl-C to stop)")
+    try:
+        for batch in watch.batches(watcher, debounce):
+            click.echo(f"\n{len(batch)} changed file(s): {', '.join(p.name for p in batch)}")
+            results, skipped = watch.review_batch(batch, echo=click.echo)
+            click.echo(f"Pushed {len(results)}, skipped {len(skipped)} unchanged.")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+@cli.command(name="daemon")
+@click.option('--socket', 'socket_path', type=click.Path(), default=str(daemon.SOCKET_PATH),
+              help="Unix socket to listen on.")
+def run_daemon(socket_path):
+    """Serve review commands from a warm process over a Unix socket."""
+    click.echo(f"Listening on {socket_path} (Ctrl-C to stop)", err=True)
+    try:
+        daemon.serve(socket_path)
+    except RuntimeError as e:
+        click.echo(f"Error: {e}", err=True)
 
 @cli.command()
 def usage():
@@ -0,0 +1,275 @@
+"""Parser for Supernote `.mark` annotation sidecars.
+
+When a PDF is annotated on the device, the handwriting is stored next to it
+as `<name>.pdf.mark`. Pulling that sidecar (a few KB) is much cheaper than
+exporting and pulling a flattened PDF, and it needs no Export step.
+
+File layout (integers are little-endian uint32):
+
+    "mark" + "SN_FILE_VER_<n>"   signature
+    blocks...                    each block is <length><payload>
+    <footer address>             last 4 bytes of the file
+
+Metadata blocks are ASCII `<KEY:VALUE>` sequences. The footer holds
+`FILE_FEATURE` (header block) and `PAGE<n>` (page metadata) addresses. A page
+lists its layers (`MAINLAYER`, `LAYER1`..) and a `TOTALPATH` block of vector
+strokes. Layer bitmaps use the RATTA_RLE encoding.
+
+Only the leading fields of each TOTALPATH stroke record are decoded (pen,
+colour, weight, point array); anything after them is skipped using the
+record size, so newer firmware that appends fields still parses. This
+record layout has not yet been checked against a file from a device, so
+`done` only reads sidecars with `--marks`, and never completes a review on
+a sidecar it reads no ink from. Drop device samples into
+tests/fixtures/marks to check it.
+"""
+
+import re
+import struct
+from dataclasses import dataclass, field
+from pathlib import Path
+
+SIGNATURE_RE = re.compile(rb"^(mark|note)SN_FILE_VER_\d{8}")
+_META_RE = re.compile(r"<([^:<>]+):([^<>]*)>")
+
+# Screen size in pixels per APPLY_EQUIPMENT; Manta (N5) has the larger panel
+SCREEN_SIZES = {"N5": (1920, 2560)}
+DEFAULT_SCREEN = (1404, 1872)
+# Page size used by convert_to_pdf, for when the local PDF is unavailable
+A5_POINTS = (419.53, 595.28)
+
+# RATTA_RLE colour codes that are not ink
+_BACKGROUND = 0x62
+_WHITE = 0x65
+_SPECIAL_LENGTH = 0x4000
+
+# Pixel gap between ink rows below which they form one region
+MERGE_GAP = 24
+
+
+class MarkFormatError(ValueError):
+    pass
+
+
+@dataclass
+class Stroke:
+    pen: int
+    color: int
+    weight: int
+    points: list  # [(x, y), ...] in device pixels
+
+    @property
+    def bbox(self):
+        xs = [p[0] for p in self.points]
+        ys = [p[1] for p in self.points]
+        return (min(xs), min(ys), max(xs) + 1, max(ys) + 1)
+
+
+@dataclass
+class MarkPage:
+    page: int  # 1-based
+    strokes: list = field(default_factory=list)
+    bboxes: list = field(default_factory=list)  # device pixels
+
+
+@dataclass
+class MarkFile:
+    version: str
+    equipment: str
+    screen: tuple
+    pages: list
+
+    def annotated_pages(self):
+        return [p for p in self.pages if p.bboxes]
+
+
+def _read_block(data, address):
+    if address <= 0 or address + 4 > len(data):
+        raise MarkFormatError(f"Block address {address} out of range")
+    (length,) = struct.unpack_from("<I", data, address)
+    start = address + 4
+    if start + length > len(data):
+        raise MarkFormatError(f"Block at {address} overruns file")
+    return data[start:start + length]
+
+
+def _read_metadata(data, address):
+    text = _read_block(data, address).decode("ascii", errors="replace")
+    meta = {}
+    for key, value in _META_RE.findall(text):
+        # Repeated keys (e.g. several layers) keep every value
+        meta.setdefault(key, []).append(value)
+    return meta
+
+
+def _first(meta, key, default=None):
+    values = meta.get(key)
+    return values[0] if values else default
+
+
+def decode_rle_runs(data):
+    """
+    Decodes a RATTA_RLE bitmap into (colour, length) runs.
+    A length byte with the high bit set carries the upper bits of a long run
+    and is combined with the following pair when the colour repeats.
+    """
+    runs = []
+    holder = None
+    for i in range(0, len(data) - 1, 2):
+        color, length = data[i], data[i + 1]
+        if holder is not None:
+            prev_color, prev_length = holder
+            holder = None
+            if color == prev_color:
+                runs.append((color, 1 + length + (((prev_length & 0x7F) + 1) << 7)))
+                continue
+            runs.append((prev_color, ((prev_length & 0x7F) + 1) << 7))
+        if length == 0xFF:
+            runs.append((color, _SPECIAL_LENGTH))
+        elif length & 0x80:
+            holder = (color, length)
+        else:
+            runs.append((color, length + 1))
+    if holder is not None:
+        prev_color, prev_length = holder
+        runs.append((prev_color, ((prev_length & 0x7F) + 1) << 7))
+    return runs
+
+
+def bitmap_bboxes(runs, width, gap=MERGE_GAP):
+    """
+    Bounding boxes of ink in a run-length bitmap, without materialising pixels.
+    Ink rows closer than `gap` are merged into one region.
+    """
+    rows = {}
+    pos = 0
+    for color, length in runs:
+        if color not in (_BACKGROUND, _WHITE):
+            end = pos + length - 1
+            for y in range(pos // width, end // width + 1):
+                x0 = pos - y * width if y == pos // width else 0
+                x1 = end - y * width if y == end // width else width - 1
+                lo, hi = rows.get(y, (x0, x1))
+                rows[y] = (min(lo, x0), max(hi, x1))
+        pos += length
+
+    boxes = []
+    current = None
+    for y in sorted(rows):
+        x0, x1 = rows[y]
+        if current and y - current[3] <= gap:
+            current = [min(current[0], x0), current[1], max(current[2], x1 + 1), y + 1]
+        else:
+            if current:
+                boxes.append(tuple(current))
+            current = [x0, y, x1 + 1, y + 1]
+    if current:
+        boxes.append(tuple(current))
+    return boxes
+
+
+def parse_totalpath(block):
+    """Decodes a TOTALPATH block into Strokes."""
+    if len(block) < 4:
+        return []
+    (count,) = struct.unpack_from("<I", block, 0)
+    strokes = []
+    offset = 4
+    for _ in range(count):
+        if offset + 4 > len(block):
+            raise MarkFormatError("Truncated stroke table")
+        (size,) = struct.unpack_from("<I", block, offset)
+        record = block[offset + 4:offset + 4 + size]
+        offset += 4 + size
+        if len(record) < 16:
+            raise MarkFormatError("Stroke record too short")
+        pen, color, weight, n = struct.unpack_from("<4I", record, 0)
+        if 16 + n * 8 > len(record):
+            raise MarkFormatError("Stroke point array overruns record")
+        coords = struct.unpack_from(f"<{n * 2}I", record, 16)
+        strokes.append(Stroke(pen, color, weight, list(zip(coords[0::2], coords[1::2]))))
+    return strokes
+
+
+def _merge_boxes(boxes, gap=MERGE_GAP):
+    """Merges boxes whose vertical extents are within `gap` of each other."""
+    merged = []
+    for box in sorted(boxes, key=lambda b: b[1]):
+        if merged and box[1] - merged[-1][3] <= gap:
+            x0, y0, x1, y1 = merged[-1]
+            merged[-1] = (min(x0, box[0]), y0, max(x1, box[2]), max(y1, box[3]))
+        else:
+            merged.append(tuple(box))
+    return merged
+
+
+def _parse_page(data, address, page_no, width):
+    meta = _read_metadata(data, address)
+    page = MarkPage(page=page_no)
+
+    path_addr = int(_first(meta, "TOTALPATH", "0") or 0)
+    if path_addr:
+        page.strokes = parse_totalpath(_read_block(data, path_addr))
+    if page.strokes:
+        page.bboxes = _merge_boxes([s.bbox for s in page.strokes if s.points])
+        return page
+
+    # No vector data: fall back to the layer bitmaps
+    boxes = []
+    for key in ("MAINLAYER", "LAYER1", "LAYER2", "LAYER3"):
+        layer_addr = int(_first(meta, key, "0") or 0)
+        if not layer_addr:
+            continue
+        layer = _read_metadata(data, layer_addr)
+        if _first(layer, "LAYERPROTOCOL") != "RATTA_RLE":
+            continue
+        bitmap_addr = int(_first(layer, "LAYERBITMAP", "0") or 0)
+        if bitmap_addr:
+            boxes.extend(bitmap_bboxes(decode_rle_runs(_read_block(data, bitmap_addr)), width))
+    page.bboxes = _merge_boxes(boxes)
+    return page
+
+
+def parse(data):
+    """Parses the bytes of a `.mark` (or `.note`) file."""
+    m = SIGNATURE_RE.match(data)
+    if not m:
+        raise MarkFormatError("Not a Supernote mark file")
+    if len(data) < 8:
+        raise MarkFormatError("File too short")
+
+    (footer_addr,) = struct.unpack_from("<I", data, len(data) - 4)
+    footer = _read_metadata(data, footer_addr)
+    header_addr = int(_first(footer, "FILE_FEATURE", "0") or 0)
+    header = _read_metadata(data, header_addr) if header_addr else {}
+
+    equipment = _first(header, "APPLY_EQUIPMENT", "")
+    screen = SCREEN_SIZES.get(equipment, DEFAULT_SCREEN)
+
+    page_keys = sorted((k for k in footer if re.fullmatch(r"PAGE\d+", k)), key=lambda k: int(k[4:]))
+    pages = [_parse_page(data, int(_first(footer, k)), int(k[4:]), screen[0]) for k in page_keys]
+    return MarkFile(version=m.group(0)[4:].decode(), equipment=equipment, screen=screen, pages=pages)
+
+
+def parse_file(path):
+    return parse(Path(path).read_bytes())
+
+
+def to_pdf_points(bbox, screen, page_size):
+    """
+    Maps a device-pixel bbox onto a PDF page of `page_size` points.
+    The viewer fits the whole page on the screen and centres it, so a page
+    whose aspect ratio differs from the panel's is letterboxed; ink in the
+    margins is clamped to the page edge.
+    """
+    width, height = page_size
+    scale = min(screen[0] / width, screen[1] / height)
+    dx = (screen[0] - width * scale) / 2
+    dy = (screen[1] - height * scale) / 2
+    x0, y0, x1, y1 = bbox
+    return (
+        round(min(max((x0 - dx) / scale, 0), width), 1),
+        round(min(max((y0 - dy) / scale, 0), height), 1),
+        round(min(max((x1 - dx) / scale, 0), width), 1),
+        round(min(max((y1 - dy) / scale, 0), height), 1),
+    )
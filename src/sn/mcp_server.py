@@ -5,12 +5,21 @@ AI assistants to manage human-in-the-loop reviews on a Supernote device.
 """
 
 import asyncio
-import subprocess
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import Any
 
 from mcp.server import Server
+from mcp.server.lowlevel.helper_types import ReadResourceContents
 from mcp.server.stdio import stdio_server
-from mcp.types import TextContent, Tool
+from mcp.types import Resource, ResourceTemplate, TextContent, Tool
+
+from . import converter, outbox, pages, retrieval, state, workflow
+from .device import DeviceSession, SupernoteDevice
+from .poller import ExportPoller
+from .scheduler import ScheduledDevice, all_stats
+from .progress import Cancelled, Progress
 
 
 # Initialize the MCP server
@@ -35,7 +44,15 @@ async def list_tools() -> list[Tool]:
                     "file_path": {
                         "type": "string",
                         "description": "Path to the markdown file to review",
-                    }
+                    },
+                    "source_map": {
+                        "type": "boolean",
+                        "description": (
+                            "Record which markdown lines each page region comes from, so the review "
+                            "report names the lines each annotation covers. Reads the file as CommonMark "
+                            "(default false)."
+                        ),
+                    },
                 },
                 "required": ["file_path"],
             },
@@ -59,6 +76,32 @@ async def list_tools() -> list[Tool]:
                 },
             },
         ),
+        Tool(
+            name="sn_wait_for_review",
+            description=(
+                "Wait until the user has exported a pending review on the Supernote, then retrieve it. "
+                "Use this instead of calling sn_done repeatedly: it blocks until the export appears "
+                "or the timeout passes, without pulling un-annotated originals."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "file_pattern": {
+                        "type": "string",
+                        "description": "Pattern selecting the pending review(s) to wait for",
+                    },
+                    "timeout_seconds": {
+                        "type": "number",
+                        "description": "How long to wait before giving up (default 300)",
+                    },
+                    "retrieve": {
+                        "type": "boolean",
+                        "description": "Retrieve the review once exported (default true)",
+                    },
+                },
+                "required": ["file_pattern"],
+            },
+        ),
         Tool(
             name="sn_list",
             description=(
@@ -79,145 +122,299 @@ async def call_tool(name: str, arguments: Any) -> list[TextContent]:
     """Handle tool calls."""
 
     if name == "sn_review":
-        return await sn_review(arguments["file_path"])
+        return await sn_review(arguments["file_path"], arguments.get("source_map", False))
     elif name == "sn_done":
         file_pattern = arguments.get("file_pattern", "")
         return await sn_done(file_pattern)
+    elif name == "sn_wait_for_review":
+        return await sn_wait_for_review(
+            arguments["file_pattern"],
+            arguments.get("timeout_seconds", DEFAULT_WAIT_TIMEOUT),
+            arguments.get("retrieve", True),
+        )
     elif name == "sn_list":
         return await sn_list()
     else:
         raise ValueError(f"Unknown tool: {name}")
 
 
-async def sn_review(file_path: str) -> list[TextContent]:
-    """Push a markdown file to Supernote for review."""
+class _Output:
+    """Collects workflow progress like a subprocess's stdout/stderr would."""
+
+    def __init__(self):
+        self.out: list[str] = []
+        self.err: list[str] = []
+
+    def echo(self, message: str = "", err: bool = False) -> None:
+        (self.err if err else self.out).append(message)
+
+    def text(self, default: str, extra: list[str] | None = None) -> str:
+        output = "\n".join(self.out + (extra or [])).strip() or default
+        if self.err:
+            output += "\n\nAdditional info:\n" + "\n".join(self.err)
+        return output
+
+
+# Device and conversion work blocks; keep it off the event loop
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="sn-tool")
+
+
+# Warm across tool calls: one ADB connection, health-checked and re-made on demand
+_session = DeviceSession(factory=lambda: ScheduledDevice(SupernoteDevice()))
+
+
+async def _run_blocking(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+def _request_progress(total_steps: int) -> Progress:
+    """
+    Progress for the current tool call, forwarding updates as MCP progress
+    notifications when the client supplied a progress token.
+    """
+    progress = Progress(total_steps)
     try:
-        result = subprocess.run(
-            ["sn-review", "review", file_path],
-            capture_output=True,
-            text=True,
-            timeout=60,
+        ctx = app.request_context
+    except LookupError:
+        return progress
+    token = ctx.meta.progressToken if ctx.meta else None
+    if token is None:
+        return progress
+
+    loop = asyncio.get_running_loop()
+
+    def notify(value: float, total: float | None, message: str) -> None:
+        # Called from worker threads; hand the send back to the event loop
+        asyncio.run_coroutine_threadsafe(
+            ctx.session.send_progress_notification(
+                token, value, total=total, message=message, related_request_id=ctx.request_id
+            ),
+            loop,
         )
 
-        if result.returncode == 0:
-            output = result.stdout if result.stdout else "Review successfully sent to device."
-            if result.stderr:
-                output += f"\n\nAdditional info:\n{result.stderr}"
-            return [TextContent(type="text", text=output)]
-        else:
-            error_msg = f"Error sending review (exit code {result.returncode}):\n{result.stderr or result.stdout}"
-            return [TextContent(type="text", text=error_msg)]
+    progress.callback = notify
+    return progress
 
-    except subprocess.TimeoutExpired:
-        return [TextContent(
-            type="text",
-            text="Error: Command timed out after 60 seconds. Check device connection."
-        )]
-    except FileNotFoundError:
-        return [TextContent(
-            type="text",
-            text="Error: sn-review command not found. Make sure SupernoteReview is installed."
-        )]
-    except subprocess.CalledProcessError as e:
+
+async def _run_device_op(func, *args, progress: Progress, **kwargs):
+    """Run a workflow step on the shared device session."""
+    try:
+        return await _run_blocking(func, *args, connect=_session.get, progress=progress, **kwargs)
+    except asyncio.CancelledError:
+        # The client cancelled: make the worker abort at its next chunk/phase
+        progress.cancel()
+        raise
+    except Cancelled:
+        raise
+    except Exception:
+        # The connection may be the culprit; start fresh next time
+        _session.invalidate()
+        raise
+
+
+async def sn_review(file_path: str, source_map: bool = False) -> list[TextContent]:
+    """Push a markdown file to Supernote for review."""
+    output = _Output()
+    if not Path(file_path).exists():
+        return [TextContent(type="text", text=f"Error sending review: file not found: {file_path}")]
+    progress = _request_progress(workflow.REVIEW_STEPS)
+    try:
+        await _run_device_op(workflow.request_review, file_path, output.echo, progress=progress,
+                             source_map=source_map)
+    except Cancelled:
+        return [TextContent(type="text", text="Review cancelled; partial upload removed.")]
+    except Exception as e:
         return [TextContent(
             type="text",
-            text=f"Error running sn-review: {e.stderr or e.stdout}"
+            text=f"Error sending review: {e}\n\n{output.text('')}".rstrip()
         )]
+    return [TextContent(type="text", text=output.text("Review successfully sent to device."))]
+
+
+async def sn_done(file_pattern: str = "", paths: list[str] | None = None) -> list[TextContent]:
+    """Retrieve annotated PDF and generate review summary; `paths` limits it to those reviews."""
+    output = _Output()
+    progress = _request_progress(workflow.DONE_STEPS)
+    try:
+        results = await _run_device_op(workflow.retrieve_reviews, file_pattern or None, output.echo, progress=progress,
+                                       paths=paths)
+    except Cancelled:
+        return [TextContent(type="text", text="Retrieval cancelled; no reviews were marked complete.")]
     except Exception as e:
         return [TextContent(
             type="text",
-            text=f"Unexpected error: {str(e)}"
+            text=f"Error retrieving review: {e}\n\n{output.text('')}".rstrip()
         )]
+    reports = [r["report"] for r in results]
+    return [TextContent(type="text", text=output.text("Review retrieved successfully.", reports + _page_links(results)))]
 
 
-async def sn_done(file_pattern: str = "") -> list[TextContent]:
-    """Retrieve annotated PDF and generate review summary."""
-    try:
-        cmd = ["sn-review", "done"]
-        if file_pattern:
-            cmd.append(file_pattern)
-
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=60,
-        )
+def _page_links(results: list[dict]) -> list[str]:
+    """Resource URIs for the annotated pages of each retrieved review."""
+    lines = []
+    for r in results:
+        annotated = [p["page"] for p in r.get("annotated_pages") or []]
+        if not annotated or pages.is_mark_sourced(r):
+            continue
+        rid = pages.review_id(r)
+        lines.append(f"Annotated page images for {Path(r['file']).name}:")
+        lines.extend(f"- {pages.page_uri(rid, n)}" for n in annotated)
+    return lines
 
-        if result.returncode == 0:
-            output = result.stdout if result.stdout else "Review retrieved successfully."
-            if result.stderr:
-                output += f"\n\nAdditional info:\n{result.stderr}"
-            return [TextContent(type="text", text=output)]
-        else:
-            error_msg = f"Error retrieving review (exit code {result.returncode}):\n{result.stderr or result.stdout}"
-            return [TextContent(type="text", text=error_msg)]
 
-    except subprocess.TimeoutExpired:
-        return [TextContent(
-            type="text",
-            text="Error: Command timed out after 60 seconds. Check device connection."
-        )]
-    except FileNotFoundError:
-        return [TextContent(
-            type="text",
-            text="Error: sn-review command not found. Make sure SupernoteReview is installed."
-        )]
-    except subprocess.CalledProcessError as e:
-        return [TextContent(
-            type="text",
-            text=f"Error running sn-review: {e.stderr or e.stdout}"
-        )]
-    except Exception as e:
+async def _list_exports() -> list[str]:
+    return await _run_blocking(lambda: _session.get().list_dir(retrieval.EXPORT_DIR))
+
+
+# One poller for every waiting client: a single EXPORT listing per interval
+_poller = ExportPoller(_list_exports)
+DEFAULT_WAIT_TIMEOUT = 300
+
+
+async def sn_wait_for_review(
+    file_pattern: str, timeout_seconds: float = DEFAULT_WAIT_TIMEOUT, retrieve: bool = True
+) -> list[TextContent]:
+    """Block until the matching reviews have been exported on the device."""
+    pending = await _run_blocking(state.get_pending_reviews)
+    targets = {k: v for k, v in pending.items() if file_pattern in k}
+    if not targets:
+        return [TextContent(type="text", text=f"No pending review matching '{file_pattern}'")]
+
+    # One deadline for all of them; whatever ends the wait cancels every waiter
+    waiters = [
+        asyncio.ensure_future(_poller.wait_for(local_path, info["device_path"], None))
+        for local_path, info in targets.items()
+    ]
+    try:
+        exports = await asyncio.wait_for(asyncio.gather(*waiters), timeout_seconds)
+    except asyncio.TimeoutError:
+        names = ", ".join(Path(k).name for k in targets)
         return [TextContent(
             type="text",
-            text=f"Unexpected error: {str(e)}"
+            text=f"Timed out after {timeout_seconds:g} seconds waiting for the export of {names}. "
+                 "The user has not exported it yet."
         )]
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
+
+    found = "Export found: " + ", ".join(exports)
+    if not retrieve:
+        return [TextContent(type="text", text=found)]
+    # Only the reviews waited for, not others the pattern now matches
+    result = await sn_done(file_pattern, paths=list(targets))
+    return [TextContent(type="text", text=f"{found}\n\n{result[0].text}")]
 
 
 async def sn_list() -> list[TextContent]:
     """List all pending reviews."""
     try:
-        result = subprocess.run(
-            ["sn-review", "list"],
-            capture_output=True,
-            text=True,
-            timeout=30,
+        pending = await _run_blocking(workflow.list_pending)
+    except Exception as e:
+        return [TextContent(type="text", text=f"Error listing reviews: {e}")]
+    queued = await _run_blocking(outbox.pending)
+    lines = ["Pending Reviews:"] + [f"- {p['name']} (Out since: {p['timestamp']})" for p in pending]
+    if not pending:
+        lines = ["No pending reviews."]
+    if queued:
+        lines.append("Queued until the tablet reconnects:")
+        lines.extend(f"- {Path(q['file']).name} (Queued since: {q['queued_at']})" for q in queued)
+    for stats in all_stats():
+        lines.append(_format_queue(stats))
+    return [TextContent(type="text", text="\n".join(lines))]
+
+
+def _format_queue(stats: dict) -> str:
+    queued = sum(stats["queued"].values())
+    waits = ", ".join(
+        f"{name} avg {w['avg']:.2f}s max {w['max']:.2f}s"
+        for name, w in stats["wait_seconds"].items() if w["count"]
+    )
+    return (
+        f"\nDevice {stats['serial']}: {queued} queued, {stats['in_flight']} in flight, "
+        f"{stats['completed']} done, {stats['coalesced']} coalesced"
+        + (f" ({waits})" if waits else "")
+    )
+
+
+# Rendered review pages, shared by every client of this server
+_page_cache = pages.PageCache()
+
+
+def _page_resources() -> list[Resource]:
+    resources = []
+    for rid, info in pages.completed_reviews().items():
+        annotated = {p["page"] for p in info.get("annotated_pages") or []}
+        name = Path(info["local_path"]).name
+        count = info.get("page_count")
+        if count is None:
+            # Retrieved before the count was recorded in state
+            try:
+                count = pages.page_count(info["reviewed_path"])
+            except Exception:
+                continue
+        for n in range(1, count + 1):
+            resources.append(Resource(
+                uri=pages.page_uri(rid, n),
+                name=f"{name} page {n}",
+                description=f"Reviewed page {n} of {name}" + (" (annotated)" if n in annotated else ""),
+                mimeType="image/png",
+            ))
+    return resources
+
+
+@app.list_resources()
+async def list_resources() -> list[Resource]:
+    """Every page of every completed review; nothing is opened or rendered here."""
+    return await _run_blocking(_page_resources)
+
+
+@app.list_resource_templates()
+async def list_resource_templates() -> list[ResourceTemplate]:
+    return [
+        ResourceTemplate(
+            uriTemplate=f"{pages.URI_SCHEME}://review/{{review_id}}/page/{{page}}",
+            name="Reviewed page",
+            description="One page of a completed review as a PNG image, 1-based.",
+            mimeType="image/png",
         )
+    ]
 
-        if result.returncode == 0:
-            output = result.stdout if result.stdout else "No pending reviews."
-            if result.stderr:
-                output += f"\n\nAdditional info:\n{result.stderr}"
-            return [TextContent(type="text", text=output)]
-        else:
-            error_msg = f"Error listing reviews (exit code {result.returncode}):\n{result.stderr or result.stdout}"
-            return [TextContent(type="text", text=error_msg)]
 
-    except subprocess.TimeoutExpired:
-        return [TextContent(
-            type="text",
-            text="Error: Command timed out after 30 seconds."
-        )]
-    except FileNotFoundError:
-        return [TextContent(
-            type="text",
-            text="Error: sn-review command not found. Make sure SupernoteReview is installed."
-        )]
-    except subprocess.CalledProcessError as e:
-        return [TextContent(
-            type="text",
-            text=f"Error running sn-review: {e.stderr or e.stdout}"
-        )]
-    except Exception as e:
-        return [TextContent(
-            type="text",
-            text=f"Unexpected error: {str(e)}"
-        )]
+def _read_page(uri: str) -> bytes:
+    rid, page = pages.parse_uri(uri)
+    info = pages.completed_reviews().get(rid)
+    if info is None:
+        raise ValueError(f"No completed review with id '{rid}'")
+    return _page_cache.get(info["reviewed_path"], page)
+
+
+@app.read_resource()
+async def read_resource(uri) -> list[ReadResourceContents]:
+    """Render the page on first read; later reads come from the cache."""
+    data = await _run_blocking(_read_page, str(uri))
+    return [ReadResourceContents(content=data, mime_type="image/png")]
+
+
+def _warm_up() -> None:
+    """Load the converter and stylesheet, and try connecting to the device."""
+    try:
+        converter.warm_up()
+    except Exception:
+        pass
+    try:
+        _session.get()
+    except Exception:
+        # No device yet; the first tool call will connect
+        pass
 
 
 async def main():
     """Run the MCP server."""
+    # Warm up in the background so the first tool call skips the setup
+    asyncio.get_running_loop().run_in_executor(_executor, _warm_up)
+    outbox.OutboxFlusher(_session.get).start()
     async with stdio_server() as (read_stream, write_stream):
         await app.run(
             read_stream,
@@ -0,0 +1,141 @@
+"""Recognise handwriting in annotated regions with a local Tesseract.
+
+`done --ocr` reads each detected region so the review report carries text
+instead of only coordinates. Only the ink is read: each region is cropped
+from the export at OCR resolution, and pixels that match the original PDF
+are whitened so the printed text underneath is not read as well. Crops are
+hashed, cached results are reused (up to MAX_CACHE_BYTES, least recently
+used first), and only the misses go to a thread pool of `tesseract`
+subprocesses.
+
+Requires the optional `ocr` extra (pytesseract, Pillow) plus the
+`tesseract` binary, and the `annotations` extra for rasterising.
+"""
+
+import hashlib
+import io
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from . import artifacts
+from .annotations import DEFAULT_THRESHOLD, fitz, np
+
+try:
+    import pytesseract
+    from PIL import Image
+except ImportError:  # pragma: no cover - exercised only without the extra
+    pytesseract = None
+    Image = None
+
+CACHE_DIR = Path(".sn_cache") / "ocr"
+MAX_CACHE_BYTES = 16 * 1024 * 1024
+DEFAULT_DPI = 200
+DEFAULT_LANG = "eng"
+# Points of padding so strokes on the box edge are not clipped
+PADDING = 4
+# A block of handwriting: let Tesseract find the lines itself
+TESSERACT_CONFIG = "--psm 6"
+# Each tesseract gets one core; the pool spreads regions across them
+TESSERACT_ENV = {"OMP_THREAD_LIMIT": "1"}
+
+
+def is_available():
+    return (pytesseract is not None and fitz is not None and np is not None
+            and shutil.which(getattr(pytesseract.pytesseract, "tesseract_cmd", "tesseract")) is not None)
+
+
+def _gray(page, clip, dpi):
+    pix = page.get_pixmap(dpi=dpi, clip=clip, colorspace=fitz.csGRAY, alpha=False)
+    return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+
+
+def ink_crops(original_pdf, annotated_pdf, pages, dpi=DEFAULT_DPI, threshold=DEFAULT_THRESHOLD):
+    """
+    Grayscale arrays of the ink in each region of `pages` (PageAnnotations),
+    keyed by (page, region index). Without an original, the crop is kept whole.
+    """
+    crops = {}
+    orig = fitz.open(original_pdf) if original_pdf else None
+    try:
+        with fitz.open(annotated_pdf) as ann:
+            for p in pages:
+                page = ann[p.page - 1]
+                for i, (x0, y0, x1, y1) in enumerate(p.bboxes, start=1):
+                    clip = fitz.Rect(x0 - PADDING, y0 - PADDING, x1 + PADDING, y1 + PADDING) & page.rect
+                    ink = _gray(page, clip, dpi).copy()
+                    if orig is not None and p.page <= orig.page_count:
+                        under = _gray(orig[p.page - 1], clip, dpi)
+                        if under.shape == ink.shape:
+                            ink[np.abs(ink.astype(np.int16) - under.astype(np.int16)) <= threshold] = 255
+                    crops[(p.page, i)] = ink
+    finally:
+        if orig is not None:
+            orig.close()
+    return crops
+
+
+def _key(crop, lang):
+    h = hashlib.sha256(f"{crop.shape}:{lang}:{TESSERACT_CONFIG}".encode())
+    h.update(crop.tobytes())
+    return h.hexdigest()
+
+
+def _recognise(crop, lang):
+    # Run directly rather than through image_to_string so the thread limit
+    # reaches tesseract without changing this process's environment
+    png = io.BytesIO()
+    Image.fromarray(crop).save(png, format="PNG")
+    proc = subprocess.run(
+        [pytesseract.pytesseract.tesseract_cmd, "stdin", "stdout", "-l", lang, *TESSERACT_CONFIG.split()],
+        input=png.getvalue(), capture_output=True, env={**os.environ, **TESSERACT_ENV},
+    )
+    if proc.returncode:
+        raise pytesseract.TesseractError(proc.returncode, proc.stderr.decode(errors="replace").strip())
+    return " ".join(proc.stdout.decode(errors="replace").split())
+
+
+def recognise(crops, lang=DEFAULT_LANG, cache_dir=None, max_workers=None, recognise_one=None):
+    """
+    Text for each crop (same keys as `crops`), served from the cache where
+    the same ink was read before. Returns (texts, cache hits).
+    """
+    recognise_one = recognise_one or _recognise
+    cache_dir = Path(cache_dir or CACHE_DIR)
+    texts, misses = {}, {}
+    for region, crop in crops.items():
+        key = _key(crop, lang)
+        cached = cache_dir / f"{key}.txt"
+        if cached.exists():
+            texts[region] = cached.read_text()
+            artifacts.touch(cached)
+        else:
+            misses[region] = (key, crop)
+    hits = len(texts)
+    if misses:
+        workers = max(1, min(max_workers or os.cpu_count() or 1, len(misses)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sn-ocr") as pool:
+            results = pool.map(lambda item: recognise_one(item[1], lang), misses.values())
+            for (region, (key, _)), text in zip(misses.items(), results):
+                texts[region] = text
+                cache_dir.mkdir(parents=True, exist_ok=True)
+                tmp = cache_dir / f"{key}.{os.getpid()}.tmp"
+                tmp.write_text(text)
+                os.replace(tmp, cache_dir / f"{key}.txt")
+        artifacts.trim(cache_dir, MAX_CACHE_BYTES)
+    return texts, hits
+
+
+def read_regions(original_pdf, annotated_pdf, pages, lang=DEFAULT_LANG, dpi=DEFAULT_DPI, cache_dir=None,
+                 max_workers=None):
+    """Sets `text` on each of `pages` (one entry per bbox) and returns the cache hits."""
+    if not is_available():
+        raise RuntimeError("OCR requires the 'ocr' extra (pytesseract, Pillow) and the tesseract binary.")
+    pages = [p for p in pages if p.bboxes]
+    crops = ink_crops(original_pdf, annotated_pdf, pages, dpi)
+    texts, hits = recognise(crops, lang, cache_dir, max_workers)
+    for p in pages:
+        p.text = [texts.get((p.page, i)) or None for i in range(1, len(p.bboxes) + 1)]
+    return hits
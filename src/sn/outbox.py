@@ -0,0 +1,224 @@
+"""Durable queue of converted reviews waiting for the tablet.
+
+When the Supernote is asleep or off Wi-Fi, `review` still converts the
+document and leaves the PDF here (`.sn_outbox/`) instead of failing. Each
+entry is the PDF plus a JSON sidecar written last, so a half-written entry
+is never picked up. An OutboxFlusher follows `adb track-devices` and, as
+soon as a device comes online, pushes every queued PDF over one connection
+and records the reviews in state. A flusher marks its claimed sidecar
+before pushing, so an entry reclaimed from a flusher that died (or took
+too long) after the push is recorded without being pushed twice.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from . import state
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_DIR = Path(".sn_outbox")
+_CLAIMED = ".claimed"
+# Set in a claimed sidecar just before its PDF is pushed
+_PUSHED = "pushed_at"
+# A claim this old belongs to a flusher that died mid-push
+STALE_CLAIM_SECONDS = 600
+
+
+def _noop(message="", err=False):
+    pass
+
+
+def enqueue(pdf, local_path, remote_path, local_pdf=None, outbox_dir=None, **details):
+    """Stores converted PDF bytes until the device is reachable."""
+    outbox_dir = Path(outbox_dir or OUTBOX_DIR)
+    outbox_dir.mkdir(parents=True, exist_ok=True)
+    name = Path(remote_path).name
+    meta = {
+        "file": str(local_path),
+        "remote_path": remote_path,
+        "local_pdf": str(Path(local_pdf).absolute()) if local_pdf else None,
+        # watch-local compares saves against this, as it does with state
+        "content_hash": details.get("content_hash"),
+        "queued_at": datetime.now().isoformat(),
+        "details": {k: v for k, v in details.items() if v is not None},
+    }
+    _write(outbox_dir / name, pdf)
+    _write(outbox_dir / f"{name}.json", json.dumps(meta).encode())
+    return outbox_dir / name
+
+
+def _write(target, data):
+    tmp = target.with_name(target.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, target)
+
+
+def pending(outbox_dir=None):
+    """Queued entries (metadata dicts with a `pdf` path), oldest first."""
+    outbox_dir = Path(outbox_dir or OUTBOX_DIR)
+    if not outbox_dir.exists():
+        return []
+    for claimed in outbox_dir.glob(f"*.pdf.json{_CLAIMED}"):
+        try:
+            if time.time() - claimed.stat().st_mtime > STALE_CLAIM_SECONDS:
+                os.rename(claimed, claimed.with_name(claimed.name[:-len(_CLAIMED)]))
+        except FileNotFoundError:
+            pass
+    entries = []
+    for meta_path in outbox_dir.glob("*.pdf.json"):
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            continue
+        meta["pdf"] = str(meta_path.with_suffix(""))
+        entries.append(meta)
+    return sorted(entries, key=lambda m: m["queued_at"])
+
+
+def _sidecars(outbox_dir=None):
+    """Metadata of every queued entry, claimed ones included; reclaims nothing."""
+    outbox_dir = Path(outbox_dir or OUTBOX_DIR)
+    if not outbox_dir.exists():
+        return []
+    metas = []
+    for meta_path in outbox_dir.glob("*.pdf.json*"):
+        if meta_path.name.endswith(".tmp"):
+            continue
+        try:
+            metas.append(json.loads(meta_path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return metas
+
+
+def local_pdfs(outbox_dir=None):
+    """Local PDF copies named by queued entries, claimed ones included."""
+    return {meta["local_pdf"] for meta in _sidecars(outbox_dir) if meta.get("local_pdf")}
+
+
+def queued_hashes(local_path=None, outbox_dir=None):
+    """content_hash of each queued version of `local_path`, or of every queued file."""
+    return {meta.get("content_hash") for meta in _sidecars(outbox_dir)
+            if (local_path is None or meta["file"] == str(local_path)) and meta.get("content_hash")}
+
+
+def flush(device, echo=_noop, outbox_dir=None, open_last=True):
+    """
+    Pushes every queued PDF to `device` and records each in state.
+    Entries are claimed by renaming their sidecar, so two processes
+    flushing at once never push the same PDF twice. A claimed sidecar is
+    marked before its push; an entry reclaimed with that mark is recorded
+    without pushing again. Returns the local paths pushed; failed entries
+    stay queued.
+    """
+    pushed = []
+    last_remote = None
+    for meta in pending(outbox_dir):
+        pdf = Path(meta["pdf"])
+        sidecar = pdf.with_name(pdf.name + ".json")
+        claimed = sidecar.with_name(sidecar.name + _CLAIMED)
+        try:
+            os.rename(sidecar, claimed)
+        except FileNotFoundError:
+            continue  # another flusher took it
+        stored = {k: v for k, v in meta.items() if k != "pdf"}
+        if meta.get(_PUSHED):
+            # A flusher that died after (or during) this push left its mark
+            echo(f"  -> {Path(meta['file']).name} was already pushed by an interrupted flush")
+        else:
+            _write(claimed, json.dumps(dict(stored, **{_PUSHED: datetime.now().isoformat()})).encode())
+            try:
+                device.push(pdf.read_bytes(), meta["remote_path"])
+            except Exception as e:
+                _write(claimed, json.dumps(stored).encode())
+                os.rename(claimed, sidecar)
+                echo(f"  -> [ERROR] {Path(meta['file']).name}: push failed, still queued: {e}", err=True)
+                continue
+        state.add_review(meta["file"], meta["remote_path"], meta.get("local_pdf"), **meta.get("details", {}))
+        # A slow flusher and the one that reclaimed from it both get here
+        claimed.unlink(missing_ok=True)
+        pdf.unlink(missing_ok=True)
+        pushed.append(meta["file"])
+        last_remote = meta["remote_path"]
+        echo(f"  -> Pushed queued {Path(meta['file']).name}")
+    if open_last and last_remote:
+        device.open_pdf(last_remote)
+    return pushed
+
+
+class OutboxFlusher:
+    """
+    Background thread that flushes the outbox whenever a device comes online,
+    driven by `adb track-devices` events rather than polling.
+    `connect()` returns the device to push to (e.g. DeviceSession.get).
+    """
+
+    def __init__(self, connect, client_factory=None, outbox_dir=None, retry_delay=5.0, echo=_noop):
+        self.connect = connect
+        self.client_factory = client_factory or _adb_client
+        self.outbox_dir = outbox_dir
+        self.retry_delay = retry_delay
+        self.echo = echo
+        self.flushed = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="sn-outbox", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        # The track-devices read blocks; the daemon thread ends with the process
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                for event in self.client_factory().track_devices():
+                    if self._stop.is_set():
+                        return
+                    if event.present and event.status == "device":
+                        self.flush_now()
+            except Exception as e:
+                # The adb server went away; try again shortly
+                logger.warning("Tracking devices failed: %s", e)
+            self._stop.wait(self.retry_delay)
+
+    def flush_now(self):
+        if not pending(self.outbox_dir):
+            return []
+        try:
+            pushed = flush(self.connect(), self.echo, self.outbox_dir)
+        except Exception as e:
+            logger.warning("Flushing the outbox failed: %s", e)
+            return []
+        self.flushed += len(pushed)
+        return pushed
+
+
+def _adb_client():
+    import adbutils
+    return adbutils.AdbClient(host="127.0.0.1", port=5037)
+
+
+def wait_and_flush(connect, echo=_noop, outbox_dir=None, timeout=None, client_factory=None):
+    """Blocks until the outbox is empty or `timeout` seconds pass."""
+    flusher = OutboxFlusher(connect, client_factory, outbox_dir, echo=echo).start()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        # Claimed entries count until their push is recorded
+        while pending(outbox_dir) or _sidecars(outbox_dir):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(0.2)
+    finally:
+        flusher.stop()
+    return not _sidecars(outbox_dir)
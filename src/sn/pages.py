@@ -0,0 +1,126 @@
+"""Completed reviews as individually addressable page images.
+
+The MCP server publishes each page of a reviewed PDF as
+`supernote://review/<id>/page/<n>`. Pages are rendered on first read and
+kept in a size-bounded LRU cache, so agents fetch only the pages they need
+and repeat reads cost nothing.
+
+Requires the optional `annotations` extra (pymupdf).
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+try:
+    try:
+        import pymupdf as fitz
+    except ImportError:  # PyMuPDF before 1.24.3
+        import fitz
+except ImportError:  # pragma: no cover - exercised only without the extra
+    fitz = None
+
+from . import state
+from .retrieval import MARK_SUFFIX
+
+URI_SCHEME = "supernote"
+DEFAULT_DPI = 110
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+_PAGE_URI_RE = re.compile(r"^supernote://review/(?P<id>[^/]+)/page/(?P<page>\d+)$")
+
+
+def review_id(info):
+    """Stable id of a review: the stem of the timestamped PDF on the device."""
+    return Path(info["device_path"]).stem
+
+
+def page_uri(rid, page):
+    return f"{URI_SCHEME}://review/{rid}/page/{page}"
+
+
+def parse_uri(uri):
+    """(review id, page number) for a page URI; raises ValueError otherwise."""
+    m = _PAGE_URI_RE.match(str(uri))
+    if not m:
+        raise ValueError(f"Not a review page URI: {uri}")
+    return m.group("id"), int(m.group("page"))
+
+
+def is_mark_sourced(info):
+    """Read from a .mark sidecar: the reviewed PDF is the clean original."""
+    return (info.get("pulled_from") or "").endswith(MARK_SUFFIX)
+
+
+def completed_reviews():
+    """
+    Completed reviews whose reviewed PDF is still on disk, keyed by id.
+    Reviews read from a .mark sidecar are left out, since their pages show
+    none of the handwriting.
+    """
+    reviews = {}
+    for local_path, info in state.get_completed_reviews().items():
+        reviewed = info.get("reviewed_path")
+        if reviewed and Path(reviewed).exists() and not is_mark_sourced(info):
+            reviews[review_id(info)] = dict(info, local_path=local_path)
+    return reviews
+
+
+def page_count(pdf_path):
+    if fitz is None:
+        raise RuntimeError("Page resources require the 'annotations' extra (pymupdf).")
+    with fitz.open(pdf_path) as doc:
+        return doc.page_count
+
+
+def render_page(pdf_path, page_no, dpi=DEFAULT_DPI):
+    """One 1-based page of a PDF as grayscale PNG bytes."""
+    if fitz is None:
+        raise RuntimeError("Page resources require the 'annotations' extra (pymupdf).")
+    with fitz.open(pdf_path) as doc:
+        if not 1 <= page_no <= doc.page_count:
+            raise ValueError(f"Page {page_no} out of range (1-{doc.page_count})")
+        pix = doc[page_no - 1].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+        return pix.tobytes("png")
+
+
+class PageCache:
+    """
+    Rendered pages keyed by (path, mtime, page, dpi), evicting the least
+    recently read once the total size passes `max_bytes`.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES, render=render_page):
+        self.max_bytes = max_bytes
+        self.render = render
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, pdf_path, page_no, dpi=DEFAULT_DPI):
+        # The mtime in the key drops stale renders if the PDF is re-pulled
+        key = (str(pdf_path), Path(pdf_path).stat().st_mtime_ns, page_no, dpi)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+
+        # Render outside the lock; two racing readers at worst render twice
+        data = self.render(pdf_path, page_no, dpi)
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = data
+                self.size += len(data)
+            while self.size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+        return data
@@ -0,0 +1,74 @@
+"""Shared EXPORT poller for clients waiting on reviews.
+
+Any number of waiters can block on their review's export appearing; a
+single background task lists the EXPORT folder once per interval and wakes
+every waiter whose export is in that listing. The task only runs while
+someone is waiting.
+"""
+
+import asyncio
+import logging
+
+from . import retrieval
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 5.0
+
+
+class ExportPoller:
+    def __init__(self, list_exports, interval=DEFAULT_INTERVAL):
+        # list_exports: async callable returning the EXPORT folder listing
+        self.list_exports = list_exports
+        self.interval = interval
+        self.polls = 0
+        self._waiters = {}  # id -> (local_path, device_path, future)
+        self._next_id = 0
+        self._task = None
+
+    @property
+    def waiting(self):
+        return len(self._waiters)
+
+    async def wait_for(self, local_path, device_path, timeout):
+        """
+        Waits until an export for this review appears in EXPORT.
+        Returns the export filename, or raises asyncio.TimeoutError.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter_id = self._next_id
+        self._next_id += 1
+        self._waiters[waiter_id] = (local_path, device_path, future)
+        self._ensure_running()
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._waiters.pop(waiter_id, None)
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while self._waiters:
+            try:
+                listing = set(await self.list_exports())
+                self.polls += 1
+            except Exception as e:
+                logger.warning("Listing exports failed: %s", e)
+                listing = None
+            if listing is not None:
+                self._resolve(listing)
+            if not self._waiters:
+                break
+            # New waiters join the next poll; listings stay one per interval
+            await asyncio.sleep(self.interval)
+
+    def _resolve(self, listing):
+        for local_path, device_path, future in list(self._waiters.values()):
+            if future.done():
+                continue
+            name, _ = retrieval.find_export(local_path, device_path, listing, newer_only=True)
+            if name:
+                future.set_result(name)
@@ -0,0 +1,95 @@
+"""Per-device page geometry for the rendered PDFs.
+
+A PDF whose page matches the panel opens and turns pages without the
+viewer rescaling it. Each profile sets the page size to the panel's
+physical size, plus margins and a font scale for reading distance. The
+profile is picked from the tablet's `ro.product.model`. The last one seen
+is remembered so the next conversion can start before the device answers.
+"""
+
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+PROFILE_CACHE = Path(".sn_cache") / "device_profile"
+
+MM_PER_INCH = 25.4
+
+
+@dataclass(frozen=True)
+class Profile:
+    name: str
+    models: tuple  # normalised ro.product.model values
+    resolution: tuple  # panel pixels (width, height)
+    ppi: int
+    margin_mm: float
+    font_scale: float
+
+    @property
+    def page_mm(self):
+        return tuple(round(px / self.ppi * MM_PER_INCH, 1) for px in self.resolution)
+
+    def css(self):
+        width, height = self.page_mm
+        s = self.font_scale
+        return f"""
+@page {{ size: {width}mm {height}mm; margin: {self.margin_mm}mm; }}
+body {{ font-size: {11 * s:.1f}pt; }}
+h1 {{ font-size: {18 * s:.1f}pt; }}
+h2 {{ font-size: {15 * s:.1f}pt; }}
+h3 {{ font-size: {13 * s:.1f}pt; }}
+code, pre {{ font-size: {9 * s:.1f}pt; }}
+blockquote {{ font-size: {10 * s:.1f}pt; }}
+"""
+
+
+PROFILES = {
+    p.name: p for p in (
+        Profile("a5x", ("A5X",), (1404, 1872), 226, 15, 1.0),
+        Profile("a6x", ("A6X",), (1404, 1872), 300, 9, 0.9),
+        Profile("nomad", ("A6X2", "NOMAD"), (1404, 1872), 300, 9, 0.9),
+        Profile("manta", ("A5X2", "MANTA"), (1920, 2560), 300, 15, 1.0),
+    )
+}
+
+
+def get(name):
+    try:
+        return PROFILES[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown device profile '{name}'. Choose from: {', '.join(PROFILES)}.") from None
+
+
+def for_model(model):
+    """The profile for a `ro.product.model` value, or None when unknown."""
+    normalised = re.sub(r"[^A-Z0-9]", "", str(model or "").upper())
+    # Longest alias first so "A5X2" is not taken for an A5X
+    aliases = sorted(((alias, p) for p in PROFILES.values() for alias in p.models), key=lambda a: -len(a[0]))
+    for alias, profile in aliases:
+        if normalised.endswith(alias):
+            return profile
+    return None
+
+
+def for_device(device):
+    """The connected tablet's profile, or None when its model is unknown."""
+    try:
+        return for_model(device.model())
+    except Exception:
+        return None
+
+
+def remembered(path=None):
+    """The profile of the last tablet seen, if any."""
+    try:
+        return PROFILES.get(Path(path or PROFILE_CACHE).read_text().strip())
+    except OSError:
+        return None
+
+
+def remember(profile, path=None):
+    path = Path(path or PROFILE_CACHE)
+    if profile is None or remembered(path) == profile:
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(profile.name)
@@ -0,0 +1,75 @@
+"""Progress reporting and cooperative cancellation for long operations.
+
+A Progress object is handed to blocking work (conversion, device transfers).
+The work calls `phase()` at each step and `transfer()` per chunk of bytes;
+both raise Cancelled once `cancel()` has been called from another thread,
+which is how an MCP client's cancellation reaches an in-flight ADB stream.
+
+Reported progress is a single increasing number: the index of the current
+phase plus the fraction of any transfer within it, out of `total_steps`.
+"""
+
+import threading
+
+
+class Cancelled(Exception):
+    """Raised inside blocking work after the caller cancelled it."""
+
+
+class Progress:
+    def __init__(self, total_steps=None, callback=None):
+        # callback(progress, total, message) -- called from worker threads
+        self.total_steps = total_steps
+        self.callback = callback
+        self.step = -1
+        self._last = None
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise Cancelled("Operation cancelled")
+
+    def _emit(self, value, message):
+        with self._lock:
+            # Notifications must strictly increase
+            if self._last is not None and value <= self._last:
+                return
+            self._last = value
+        if self.callback:
+            self.callback(value, self.total_steps, message)
+
+    def phase(self, message):
+        """Start the next step."""
+        self.check()
+        with self._lock:
+            self.step += 1
+            value = float(self.step)
+        self._emit(value, message)
+
+    def transfer(self, label):
+        """Returns an on_chunk(done, total) callback for a byte transfer."""
+        reported = [-1.0]
+
+        def on_chunk(done, total):
+            self.check()
+            fraction = min(done / total, 1.0) if total else 0.0
+            # Chunks are small; only notify about every 1% of the transfer
+            if fraction - reported[0] < 0.01 and fraction < 1.0:
+                return
+            reported[0] = fraction
+            # Stay below the next phase index so progress keeps increasing
+            value = max(self.step, 0) + fraction * 0.99
+            self._emit(value, f"{label}: {_mb(done)} / {_mb(total)} MB" if total else f"{label}: {_mb(done)} MB")
+        return on_chunk
+
+
+def _mb(n):
+    return f"{n / (1024 * 1024):.1f}"
@@ -0,0 +1,145 @@
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+EXPORT_DIR = "/storage/emulated/0/EXPORT/"
+MARK_SUFFIX = ".mark"
+MARK_CACHE_DIR = Path(".sn_cache") / "marks"
+
+# Files pushed by `review` are named <stem>_YYYYmmdd_HHMMSS.pdf
+_TIMESTAMPED_RE = re.compile(r"^(?P<stem>.+)_(?P<ts>\d{8}_\d{6})\.pdf$")
+
+
+def parse_export_name(name):
+    """
+    Splits an exported filename into (stem, timestamp).
+    Timestamp is None when the name has no `_YYYYmmdd_HHMMSS` suffix.
+    """
+    m = _TIMESTAMPED_RE.match(name)
+    if m:
+        try:
+            return m.group("stem"), datetime.strptime(m.group("ts"), "%Y%m%d_%H%M%S")
+        except ValueError:
+            pass
+    return Path(name).stem, None
+
+
+@dataclass
+class PlannedPull:
+    local_path: str
+    device_path: str
+    pull_path: str
+    match: str  # "exact", "fuzzy", "mark" or "original"
+
+
+def find_export(local_path, device_path, listing, newer_only=False):
+    """
+    Picks the best export for one review from an EXPORT directory listing.
+    Returns (filename, match_kind) or (None, None) when nothing matches.
+    With newer_only, fuzzy matches must carry a timestamp no older than the
+    pushed file's, so exports from earlier reviews are ignored.
+    """
+    export_name = Path(device_path).name
+    if export_name in listing:
+        return export_name, "exact"
+
+    # Exports keep the pushed file's stem, which for a bundle is its whole name
+    stem, pushed_at = parse_export_name(export_name)
+    if pushed_at is None:
+        stem = Path(local_path).stem
+    prefix = f"{stem}_"
+    candidates = []
+    for name in listing:
+        if not (name.startswith(prefix) and name.endswith(".pdf")):
+            continue
+        parsed_stem, ts = parse_export_name(name)
+        # Timestamped names must belong to this exact stem, so `draft` does
+        # not pick up `draft_v2_<ts>.pdf`.
+        if ts is not None and parsed_stem != stem:
+            continue
+        if newer_only and (ts is None or pushed_at is None or ts < pushed_at):
+            continue
+        candidates.append((ts or datetime.min, name))
+
+    if not candidates:
+        return None, None
+    return max(candidates)[1], "fuzzy"
+
+
+def mark_path(device_path):
+    """Remote path of the handwriting sidecar the device keeps beside a PDF."""
+    return f"{device_path}{MARK_SUFFIX}"
+
+
+def plan_retrieval(reviews, listing, export_dir=EXPORT_DIR, marks=()):
+    """
+    Matches every pending review against a single EXPORT listing in memory.
+    `reviews` maps local path -> state entry. `marks` is a set of remote
+    `.mark` paths used when a review has no export.
+    """
+    listing = set(listing)
+    marks = set(marks)
+    plan = []
+    for local_path, info in reviews.items():
+        device_path = info["device_path"]
+        name, kind = find_export(local_path, device_path, listing)
+        if name:
+            pull_path = f"{export_dir.rstrip('/')}/{name}"
+        elif mark_path(device_path) in marks:
+            pull_path, kind = mark_path(device_path), "mark"
+        else:
+            pull_path, kind = device_path, "original"
+        plan.append(PlannedPull(local_path, device_path, pull_path, kind))
+    return plan
+
+
+def find_marks(device, plan):
+    """
+    Lists the folders of reviews that have no export, once per folder, and
+    returns the remote `.mark` sidecar paths found there.
+    """
+    folders = {str(Path(item.device_path).parent) for item in plan if item.match == "original"}
+    marks = set()
+    for folder in folders:
+        for name in device.list_dir(folder):
+            if name.endswith(MARK_SUFFIX):
+                marks.add(f"{folder}/{name}")
+    return marks
+
+
+def pull_all(device, jobs, max_workers=2, on_chunk=None):
+    """
+    Pulls (remote_path, local_path) pairs concurrently over one device.
+    Returns a list of exceptions (or None) in the same order as `jobs`.
+    `on_chunk(done, total)` receives bytes summed across all pulls.
+    """
+    lock = threading.Lock()
+    sizes = {}
+
+    def _aggregate(index):
+        def report(done, total):
+            with lock:
+                sizes[index] = (done, total)
+                done_all = sum(d for d, _ in sizes.values())
+                total_all = sum(t for _, t in sizes.values())
+            on_chunk(done_all, total_all)
+        return report
+
+    def _pull(indexed_job):
+        index, (remote, local) = indexed_job
+        try:
+            if on_chunk:
+                device.pull(remote, str(local), on_chunk=_aggregate(index))
+            else:
+                device.pull(remote, str(local))
+        except Exception as e:
+            return e
+        return None
+
+    if not jobs:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(jobs))) as pool:
+        return list(pool.map(_pull, enumerate(jobs)))
@@ -0,0 +1,262 @@
+"""Per-device operation scheduler.
+
+Every device operation from this process goes through one queue per device
+serial, so concurrent agents do not fight over ADB sync streams and
+`am start` intents. Operations run by priority (interactive opens first,
+bulk pulls last). At most MAX_BULK pulls run at once, and only interactive
+work may take the last worker slot, so an open is never stuck behind long
+transfers. Identical read-only requests (e.g. two listings of EXPORT) that
+are queued or running together share one result.
+
+Across processes (the MCP server, the daemon and one-off CLI runs), pushes
+and pulls also take one of MAX_STREAMS lock files per device serial, so the
+whole machine opens at most that many sync streams to a tablet at a time.
+"""
+
+import contextlib
+import re
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from enum import IntEnum
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no flock; streams are per process there
+    fcntl = None
+
+# Two pulls, a listing or push, and one slot only interactive work may take
+MAX_CONCURRENT = 4
+MAX_BULK = 2
+# Sync streams to one device across every process on this machine
+MAX_STREAMS = 2
+# Shared by processes started from any directory
+LOCK_DIR = Path(tempfile.gettempdir()) / "sn-review-locks"
+_LOCK_POLL_SECONDS = 0.05
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # open a document for the user
+    NORMAL = 1       # listings, mkdir, pushes
+    BULK = 2         # pulls of exported PDFs
+
+
+class _Op:
+    __slots__ = ("fn", "priority", "key", "future", "enqueued_at")
+
+    def __init__(self, fn, priority, key):
+        self.fn = fn
+        self.priority = priority
+        self.key = key
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+@contextlib.contextmanager
+def stream_slot(serial, slots=MAX_STREAMS, lock_dir=None):
+    """Holds one of the device's `slots` cross-process sync stream locks."""
+    if fcntl is None:
+        yield
+        return
+    lock_dir = Path(lock_dir or LOCK_DIR)
+    lock_dir.mkdir(parents=True, exist_ok=True)
+    name = re.sub(r"[^\w.-]", "_", str(serial))
+    while True:
+        for i in range(slots):
+            f = open(lock_dir / f"{name}.{i}.lock", "a")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                f.close()
+                continue
+            # The lock goes with the file descriptor, even if the process dies
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+                f.close()
+            return
+        time.sleep(_LOCK_POLL_SECONDS)
+
+
+class DeviceScheduler:
+    def __init__(self, serial, max_concurrent=MAX_CONCURRENT, max_bulk=MAX_BULK):
+        self.serial = serial
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_bulk = max(1, max_bulk)
+        self._queues = {p: deque() for p in Priority}
+        self._by_key = {}
+        self._running = {p: 0 for p in Priority}
+        self._cond = threading.Condition()
+        self._workers = []
+        self._completed = 0
+        self._coalesced = 0
+        self._waits = {p: [0, 0.0, 0.0] for p in Priority}  # count, total, max
+
+    def submit(self, fn, priority=Priority.NORMAL, key=None):
+        """
+        Queues `fn()` and returns a Future. Requests with the same `key`
+        that are still queued or running share a single execution.
+        """
+        with self._cond:
+            if key is not None and key in self._by_key:
+                self._coalesced += 1
+                return self._by_key[key].future
+            op = _Op(fn, Priority(priority), key)
+            self._queues[op.priority].append(op)
+            if key is not None:
+                self._by_key[key] = op
+            self._start_workers()
+            self._cond.notify()
+            return op.future
+
+    def run(self, fn, priority=Priority.NORMAL, key=None):
+        return self.submit(fn, priority, key).result()
+
+    def stats(self):
+        """Queue depth, in-flight work and wait times per priority."""
+        with self._cond:
+            return {
+                "serial": self.serial,
+                "queued": {p.name.lower(): len(q) for p, q in self._queues.items()},
+                "in_flight": sum(self._running.values()),
+                "completed": self._completed,
+                "coalesced": self._coalesced,
+                "wait_seconds": {
+                    p.name.lower(): {
+                        "count": count,
+                        "avg": round(total / count, 4) if count else 0.0,
+                        "max": round(worst, 4),
+                    }
+                    for p, (count, total, worst) in self._waits.items()
+                },
+            }
+
+    def _start_workers(self):
+        while len(self._workers) < self.max_concurrent:
+            t = threading.Thread(target=self._work, name=f"sn-device-{self.serial}", daemon=True)
+            self._workers.append(t)
+            t.start()
+
+    def _next_op(self):
+        in_flight = sum(self._running.values())
+        for p in Priority:
+            if not self._queues[p]:
+                continue
+            # Keep one slot free for opening documents
+            if p != Priority.INTERACTIVE and self.max_concurrent > 1 and in_flight >= self.max_concurrent - 1:
+                continue
+            if p == Priority.BULK and self._running[p] >= self.max_bulk:
+                continue
+            return self._queues[p].popleft()
+        return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                op = self._next_op()
+                while op is None:
+                    self._cond.wait()
+                    op = self._next_op()
+                self._running[op.priority] += 1
+                waited = time.monotonic() - op.enqueued_at
+                w = self._waits[op.priority]
+                w[0] += 1
+                w[1] += waited
+                w[2] = max(w[2], waited)
+
+            if op.future.set_running_or_notify_cancel():
+                try:
+                    op.future.set_result(op.fn())
+                except BaseException as e:
+                    op.future.set_exception(e)
+
+            with self._cond:
+                self._running[op.priority] -= 1
+                self._completed += 1
+                if op.key is not None and self._by_key.get(op.key) is op:
+                    del self._by_key[op.key]
+                self._cond.notify_all()
+
+
+_schedulers = {}
+_registry_lock = threading.Lock()
+
+
+def scheduler_for(serial, max_concurrent=MAX_CONCURRENT):
+    """The process-wide scheduler for a device serial."""
+    with _registry_lock:
+        if serial not in _schedulers:
+            _schedulers[serial] = DeviceScheduler(serial, max_concurrent)
+        return _schedulers[serial]
+
+
+def all_stats():
+    with _registry_lock:
+        schedulers = list(_schedulers.values())
+    return [s.stats() for s in schedulers]
+
+
+class ScheduledDevice:
+    """
+    Drop-in wrapper for SupernoteDevice that routes every operation through
+    the device's scheduler with an appropriate priority. Pushes and pulls
+    also hold a cross-process stream slot while they transfer.
+    """
+
+    def __init__(self, device, scheduler=None):
+        self._device = device
+        self.scheduler = scheduler or scheduler_for(device.device.serial)
+
+    def __getattr__(self, name):
+        # Attributes such as `.device` pass straight through
+        return getattr(self._device, name)
+
+    def open_pdf(self, remote_path):
+        return self.scheduler.run(lambda: self._device.open_pdf(remote_path), Priority.INTERACTIVE)
+
+    def list_dir(self, remote_dir):
+        return self.scheduler.run(lambda: self._device.list_dir(remote_dir), Priority.NORMAL,
+                                  key=("list_dir", remote_dir))
+
+    def exists(self, remote_path):
+        return self.scheduler.run(lambda: self._device.exists(remote_path), Priority.NORMAL,
+                                  key=("exists", remote_path))
+
+    def ensure_dir(self, remote_dir):
+        return self.scheduler.run(lambda: self._device.ensure_dir(remote_dir), Priority.NORMAL,
+                                  key=("ensure_dir", remote_dir))
+
+    def remove(self, remote_paths):
+        return self.scheduler.run(lambda: self._device.remove(remote_paths), Priority.NORMAL)
+
+    def model(self):
+        return self.scheduler.run(self._device.model, Priority.NORMAL, key=("model",))
+
+    def is_alive(self):
+        return self.scheduler.run(self._device.is_alive, Priority.INTERACTIVE, key=("is_alive",))
+
+    def _streamed(self, fn):
+        def run():
+            with stream_slot(self.scheduler.serial):
+                return fn()
+        return run
+
+    def push(self, local_path, remote_path, on_chunk=None):
+        if on_chunk is None:
+            return self.scheduler.run(self._streamed(lambda: self._device.push(local_path, remote_path)),
+                                      Priority.NORMAL)
+        return self.scheduler.run(
+            self._streamed(lambda: self._device.push(local_path, remote_path, on_chunk=on_chunk)),
+            Priority.NORMAL)
+
+    def pull(self, remote_path, local_path, on_chunk=None):
+        if on_chunk is None:
+            return self.scheduler.run(self._streamed(lambda: self._device.pull(remote_path, local_path)),
+                                      Priority.BULK)
+        return self.scheduler.run(
+            self._streamed(lambda: self._device.pull(remote_path, local_path, on_chunk=on_chunk)),
+            Priority.BULK)
@@ -0,0 +1,115 @@
+"""Crop annotated regions out of the exported PDF into small grayscale images.
+
+Multimodal agents can read a handful of snippet images instead of the full
+annotated PDF. Rendering happens in a process pool, one task per page, and
+results are cached by a hash of the page content so re-running `done` on the
+same export is free. The cache is capped at MAX_CACHE_BYTES, least recently
+used first.
+
+Requires the optional `annotations` extra (pymupdf); WebP output also needs
+Pillow.
+"""
+
+import hashlib
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from . import artifacts
+from .annotations import mp_context
+
+try:
+    try:
+        import pymupdf as fitz
+    except ImportError:  # PyMuPDF before 1.24.3
+        import fitz
+except ImportError:  # pragma: no cover - exercised only without the extra
+    fitz = None
+
+CACHE_DIR = Path(".sn_cache") / "snippets"
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+DEFAULT_DPI = 110
+# Points of surrounding page kept around each region so the ink has context
+CONTEXT_MARGIN = 36
+
+
+@dataclass
+class Snippet:
+    page: int
+    index: int  # 1-based region number on the page
+    path: Path
+    bbox: tuple  # clip rectangle in PDF points, including context
+
+
+def page_hash(doc, page):
+    """Digest of a page's content streams and embedded images."""
+    h = hashlib.sha256(page.read_contents())
+    for img in page.get_images(full=True):
+        h.update(doc.xref_stream_raw(img[0]) or b"")
+    return h.hexdigest()
+
+
+def _encode(pix, fmt):
+    if fmt == "png":
+        return pix.tobytes("png")
+    from PIL import Image
+    import io
+    img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    buf = io.BytesIO()
+    img.save(buf, format="WEBP", quality=60)
+    return buf.getvalue()
+
+
+def _render_page(pdf_path, page_no, bboxes, out_dir, stem, dpi, fmt, cache_dir):
+    snippets = []
+    with fitz.open(pdf_path) as doc:
+        page = doc[page_no - 1]
+        digest = page_hash(doc, page)
+        bounds = page.rect
+        for i, (x0, y0, x1, y1) in enumerate(bboxes, start=1):
+            clip = fitz.Rect(x0 - CONTEXT_MARGIN, y0 - CONTEXT_MARGIN,
+                             x1 + CONTEXT_MARGIN, y1 + CONTEXT_MARGIN) & bounds
+            key = hashlib.sha256(f"{digest}:{tuple(clip)}:{dpi}:{fmt}".encode()).hexdigest()
+            cached = Path(cache_dir) / f"{key}.{fmt}"
+            if cached.exists():
+                artifacts.touch(cached)
+            else:
+                pix = page.get_pixmap(dpi=dpi, clip=clip, colorspace=fitz.csGRAY, alpha=False)
+                cached.parent.mkdir(parents=True, exist_ok=True)
+                tmp = cached.with_suffix(f".{os.getpid()}.tmp")
+                tmp.write_bytes(_encode(pix, fmt))
+                os.replace(tmp, cached)
+            target = Path(out_dir) / f"{stem}_p{page_no}_r{i}.{fmt}"
+            shutil.copyfile(cached, target)
+            snippets.append(Snippet(page_no, i, target, tuple(round(v, 1) for v in clip)))
+    return snippets
+
+
+def render_snippets(pdf_path, pages, out_dir, stem=None, dpi=DEFAULT_DPI, fmt="png",
+                    cache_dir=None, max_workers=None):
+    """
+    Renders one image per annotated region of `pages` (PageAnnotations) into
+    `out_dir`. Returns Snippets ordered by page then region.
+    """
+    if fitz is None:
+        raise RuntimeError("Snippet rendering requires the 'annotations' extra (pymupdf).")
+    if fmt not in ("png", "webp"):
+        raise ValueError(f"Unsupported snippet format: {fmt}")
+
+    pages = [p for p in pages if p.bboxes]
+    cache_dir = Path(cache_dir or CACHE_DIR)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stem = stem or Path(pdf_path).stem
+    args = [(str(pdf_path), p.page, p.bboxes, str(out_dir), stem, dpi, fmt, str(cache_dir)) for p in pages]
+
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(args)))
+    if workers == 1:
+        results = [_render_page(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context()) as pool:
+            results = list(pool.map(_render_page, *zip(*args)))
+    artifacts.trim(cache_dir, MAX_CACHE_BYTES)
+    return [s for page_snippets in results for s in page_snippets]
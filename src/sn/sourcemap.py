@@ -0,0 +1,130 @@
+"""Map rendered PDF locations back to markdown source lines.
+
+Pandoc's `sourcepos` extension tags each block with `data-pos="file@L:C-L:C"`.
+After WeasyPrint lays the document out, every tagged box tells us which page
+and vertical span a block of markdown ended up on. The resulting map is a
+flat list of entries:
+
+    {"page": 4, "y0": 120.5, "y1": 180.0, "source": "SPEC.md", "start": 120, "end": 134}
+
+with y in PDF points from the top of the page.
+"""
+
+import json
+import re
+from pathlib import Path
+
+from . import artifacts
+
+SOURCE_MAP_DIR = Path(".sn_cache") / "sourcemaps"
+MAX_BYTES = 64 * 1024 * 1024
+
+_POS_RE = re.compile(r"^(?:(?P<source>.*)@)?(?P<l1>\d+):(?P<c1>\d+)-(?P<l2>\d+):(?P<c2>\d+)$")
+
+# WeasyPrint lays out in CSS pixels; PDF coordinates are points
+PX_TO_PT = 0.75
+
+
+def parse_pos(value):
+    """
+    Parses a pandoc `data-pos` value into (source, start_line, end_line).
+    Returns None for values that do not look like a position.
+    """
+    m = _POS_RE.match(value or "")
+    if not m:
+        return None
+    start, end = int(m.group("l1")), int(m.group("l2"))
+    # Block ranges end at column 1 of the line after the block
+    if int(m.group("c2")) == 1 and end > start:
+        end -= 1
+    return m.group("source"), start, end
+
+
+def _boxes(page):
+    """
+    The laid-out boxes of a WeasyPrint page. WeasyPrint has no public API
+    for the box tree, so this reads `_page_box` and yields nothing (an
+    empty map, not a failed render) if a release drops it.
+    """
+    page_box = getattr(page, "_page_box", None)
+    descendants = getattr(page_box, "descendants", None)
+    return descendants() if callable(descendants) else ()
+
+
+def build(document):
+    """Builds a source map from a rendered WeasyPrint document."""
+    entries = []
+    for page_no, page in enumerate(document.pages, start=1):
+        spans = {}
+        for box in _boxes(page):
+            element = getattr(box, "element", None)
+            if element is None or element.get("data-wrapper") is not None:
+                continue
+            pos = parse_pos(element.get("data-pos"))
+            if pos is None:
+                continue
+            y0 = getattr(box, "position_y", None)
+            if y0 is None:
+                continue
+            y1 = y0 + box.margin_height()
+            # A block produces several boxes (block, line, inline); merge them
+            key = id(element)
+            if key in spans:
+                _, lo, hi = spans[key]
+                spans[key] = (pos, min(lo, y0), max(hi, y1))
+            else:
+                spans[key] = (pos, y0, y1)
+        for (source, start, end), y0, y1 in spans.values():
+            entries.append({
+                "page": page_no,
+                "y0": round(y0 * PX_TO_PT, 1),
+                "y1": round(y1 * PX_TO_PT, 1),
+                "source": Path(source).name if source else None,
+                "start": start,
+                "end": end,
+            })
+    entries.sort(key=lambda e: (e["page"], e["y0"], e["start"]))
+    return entries
+
+
+def lookup(entries, page, y0, y1):
+    """
+    Returns (source, start_line, end_line) covering the vertical span
+    [y0, y1] on `page`, or None when the page has no mapped content.
+    """
+    on_page = [e for e in entries if e["page"] == page]
+    if not on_page:
+        return None
+
+    hits = [e for e in on_page if e["y0"] <= y1 and e["y1"] >= y0]
+    if not hits:
+        # Margin notes below the last block belong to the nearest block above
+        above = [e for e in on_page if e["y1"] <= y0]
+        hits = [max(above, key=lambda e: e["y1"])] if above else [min(on_page, key=lambda e: e["y0"])]
+
+    # Prefer the innermost blocks: drop containers whose range encloses another hit
+    leaves = [
+        e for e in hits
+        if not any(o is not e and e["start"] <= o["start"] and o["end"] <= e["end"]
+                   and (o["start"], o["end"]) != (e["start"], e["end"]) for o in hits)
+    ]
+    return leaves[0]["source"], min(e["start"] for e in leaves), max(e["end"] for e in leaves)
+
+
+def save(entries, pdf_path, directory=None):
+    """
+    Writes the map as a sidecar JSON file and returns its path. Maps of
+    completed reviews go first once the directory exceeds MAX_BYTES.
+    """
+    directory = Path(directory or SOURCE_MAP_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{Path(pdf_path).stem}.map.json"
+    with open(path, "w") as f:
+        json.dump(entries, f)
+    artifacts.trim(directory, MAX_BYTES)
+    return path
+
+
+def load(path):
+    with open(path, "r") as f:
+        return json.load(f)
@@ -1,37 +1,107 @@
+import copy
 import json
 import os
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 
 STATE_FILE = Path(".sn_state.json")
 
+# Parsed state keyed by file path, validated against the file's mtime and size
+# so long-running processes skip re-parsing unless someone else wrote it.
+_cache = {}
+# Serialises read-modify-write cycles between threads of one process
+_lock = threading.RLock()
+
+def _signature(path):
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
 def load_state():
-    if not STATE_FILE.exists():
-        return {"reviews": {}}
-    with open(STATE_FILE, "r") as f:
-        return json.load(f)
+    with _lock:
+        sig = _signature(STATE_FILE)
+        if sig is None:
+            return {"reviews": {}}
+        cached = _cache.get(STATE_FILE)
+        if cached is None or cached[0] != sig:
+            with open(STATE_FILE, "r") as f:
+                cached = (sig, json.load(f))
+            _cache[STATE_FILE] = cached
+        # Callers mutate what they load; never hand out the cached object
+        return copy.deepcopy(cached[1])
 
 def save_state(state):
-    with open(STATE_FILE, "w") as f:
-        json.dump(state, f, indent=2)
+    # Write to a sibling temp file and rename so readers never see a partial file
+    with _lock:
+        tmp = STATE_FILE.with_name(STATE_FILE.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, STATE_FILE)
+        # Write-through: the next load is served from memory
+        _cache[STATE_FILE] = (_signature(STATE_FILE), copy.deepcopy(state))
 
-def add_review(local_path, device_path):
-    state = load_state()
-    state["reviews"][str(local_path)] = {
+@contextmanager
+def transaction():
+    """Load the state once, let the caller mutate it, then save it once."""
+    with _lock:
+        state = load_state()
+        yield state
+        save_state(state)
+
+# Fields of a replaced push kept in the entry's history (see add_review)
+_HISTORY_KEYS = ("device_path", "status", "timestamp", "completed_at", "pulled_from",
+                 "device_removed_at", "export_removed_at")
+
+def add_review(local_path, device_path, local_pdf=None, **details):
+    """
+    Records a pushed review. Extra keyword fields are stored on the entry.
+    A push replaces the document's entry; the earlier pushes are kept in
+    its "history" list so gc can tell retrieved ones from unretrieved ones.
+    """
+    entry = {
         "device_path": device_path,
         "status": "pending",
         "timestamp": datetime.now().isoformat(),
         "original_path": str(Path(local_path).absolute())
     }
-    save_state(state)
+    if local_pdf:
+        entry["local_pdf"] = str(Path(local_pdf).absolute())
+    entry.update({k: v for k, v in details.items() if v is not None})
+    with transaction() as state:
+        previous = state["reviews"].get(str(local_path))
+        if previous is not None:
+            entry["history"] = previous.get("history", []) + [
+                {k: previous[k] for k in _HISTORY_KEYS if k in previous}
+            ]
+        state["reviews"][str(local_path)] = entry
 
 def get_pending_reviews():
     state = load_state()
     return {k: v for k, v in state["reviews"].items() if v["status"] == "pending"}
 
-def mark_completed(local_path):
+def get_completed_reviews():
     state = load_state()
-    if str(local_path) in state["reviews"]:
-        state["reviews"][str(local_path)]["status"] = "completed"
-        state["reviews"][str(local_path)]["completed_at"] = datetime.now().isoformat()
-        save_state(state)
+    return {k: v for k, v in state["reviews"].items() if v["status"] == "completed"}
+
+def mark_completed(local_path):
+    mark_completed_many([local_path])
+
+def mark_completed_many(local_paths, details=None):
+    """
+    Marks several reviews completed in a single state write.
+    `details` optionally maps local path -> extra fields to record.
+    """
+    details = details or {}
+    with transaction() as state:
+        now = datetime.now().isoformat()
+        for local_path in local_paths:
+            entry = state["reviews"].get(str(local_path))
+            if entry is None:
+                continue
+            entry["status"] = "completed"
+            entry["completed_at"] = now
+            entry.update(details.get(str(local_path), {}))
@@ -0,0 +1,168 @@
+"""Lightweight span tracing exported as Chrome trace events.
+
+Code marks interesting work with `span("name")` or `@traced("name")`. While
+no recorder is active these cost one global lookup; `sn-review --trace
+out.json ...` activates one for the command and writes the spans in the
+Trace Event format, viewable in chrome://tracing or https://ui.perfetto.dev.
+Spans from worker threads (the pipelined connect, parallel pulls) land on
+their own tracks.
+"""
+
+import asyncio
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+_active = None
+_NULL = contextlib.nullcontext()
+
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+        self._threads = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+
+    def now_us(self):
+        return (time.perf_counter_ns() - self._origin) / 1000
+
+    def add(self, name, start_us, end_us, args=None, cat="sn"):
+        thread = threading.current_thread()
+        event = {
+            "name": name, "cat": cat, "ph": "X",
+            "ts": round(start_us, 1), "dur": round(end_us - start_us, 1),
+            "pid": os.getpid(), "tid": thread.ident,
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.events.append(event)
+            self._threads.setdefault(thread.ident, thread.name)
+
+    def to_json(self):
+        with self._lock:
+            names = [
+                {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+                for tid, name in self._threads.items()
+            ]
+            return {"traceEvents": names + sorted(self.events, key=lambda e: e["ts"]), "displayTimeUnit": "ms"}
+
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_json(), f)
+
+    def summary(self):
+        """Total seconds per span name, largest first."""
+        totals = {}
+        with self._lock:
+            for e in self.events:
+                totals[e["name"]] = totals.get(e["name"], 0.0) + e["dur"] / 1e6
+        return dict(sorted(totals.items(), key=lambda kv: -kv[1]))
+
+
+class _Span:
+    __slots__ = ("recorder", "name", "args", "start")
+
+    def __init__(self, recorder, name, args):
+        self.recorder = recorder
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = self.recorder.now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.recorder.add(self.name, self.start, self.recorder.now_us(), self.args)
+        return False
+
+
+def span(name, **args):
+    """Context manager timing a block; a no-op unless tracing is active."""
+    recorder = _active
+    if recorder is None:
+        return _NULL
+    return _Span(recorder, name, args)
+
+
+def traced(name):
+    """Decorator form of span()."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start():
+    """Activates a fresh process-wide recorder and returns it."""
+    global _active
+    _active = Recorder()
+    return _active
+
+
+def stop():
+    global _active
+    recorder, _active = _active, None
+    return recorder
+
+
+def active():
+    return _active is not None
+
+
+class LoopMonitor:
+    """
+    Measures how long an asyncio event loop is blocked. A task sleeps
+    `interval` seconds at a time; any extra delay above `threshold` means
+    something held the loop and is counted as a stall.
+    """
+
+    def __init__(self, interval=0.01, threshold=0.005):
+        self.interval = interval
+        self.threshold = threshold
+        self.samples = 0
+        self.stalls = 0
+        self.stalled = 0.0
+        self.max_stall = 0.0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            before = loop.time()
+            await asyncio.sleep(self.interval)
+            self.record(loop.time() - before - self.interval)
+
+    def record(self, lag):
+        self.samples += 1
+        if lag > self.threshold:
+            self.stalls += 1
+            self.stalled += lag
+            self.max_stall = max(self.max_stall, lag)
+
+    def stats(self):
+        return {
+            "samples": self.samples,
+            "stalls": self.stalls,
+            "stall_seconds": round(self.stalled, 4),
+            "max_stall_seconds": round(self.max_stall, 4),
+        }
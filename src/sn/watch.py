@@ -0,0 +1,187 @@
+"""Watch a local directory and send changed markdown files for review.
+
+`sn-review watch-local <dir>` waits for `.md` files to be written (inotify
+on Linux, mtime polling elsewhere). Bursts of saves are debounced into one
+batch, files whose content matches the last pushed version are skipped,
+and the rest go through the normal convert-and-push path on one device
+connection. Only the last document of a batch is opened on the device.
+"""
+
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import select
+import struct
+import time
+from pathlib import Path
+
+from . import outbox, state, workflow
+from .device import DeviceSession
+
+DEFAULT_DEBOUNCE = 1.0
+DEFAULT_POLL_INTERVAL = 1.0
+
+# From <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+_EVENT = struct.Struct("iIII")
+
+
+def is_candidate(path):
+    """Markdown sources only: no hidden/editor temp files or our own reports."""
+    name = Path(path).name
+    return (
+        name.endswith(".md")
+        and not name.startswith((".", "#"))
+        and not name.endswith("-review.md")
+    )
+
+
+def content_hash(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+class InotifyWatcher:
+    """Changed files in one directory via Linux inotify, through ctypes."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # Editors that save via rename show up as IN_MOVED_TO
+        wd = libc.inotify_add_watch(self.fd, str(self.directory).encode(), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {self.directory}")
+
+    def wait(self, timeout):
+        """Paths written since the last call, waiting up to `timeout` seconds."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        buf = os.read(self.fd, 64 * 1024)
+        changed = set()
+        offset = 0
+        while offset < len(buf):
+            _, _, _, length = _EVENT.unpack_from(buf, offset)
+            offset += _EVENT.size
+            name = buf[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+            offset += length
+            if name and is_candidate(name):
+                changed.add(self.directory / name)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback for platforms without inotify: compares mtimes and sizes."""
+
+    def __init__(self, directory, interval=DEFAULT_POLL_INTERVAL):
+        self.directory = Path(directory)
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for path in self.directory.glob("*.md"):
+            if not is_candidate(path):
+                continue
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def wait(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            changed = {p for p, sig in current.items() if self._snapshot.get(p) != sig}
+            self._snapshot = current
+            remaining = deadline - time.monotonic()
+            if changed or remaining <= 0:
+                return changed
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+
+def open_watcher(directory, poll=False, interval=DEFAULT_POLL_INTERVAL):
+    """inotify where available, otherwise polling."""
+    if not poll:
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError):
+            # No libc inotify (macOS, Windows) or out of watches
+            pass
+    return PollingWatcher(directory, interval)
+
+
+def batches(watcher, debounce=DEFAULT_DEBOUNCE, idle_timeout=None):
+    """
+    Yields sorted lists of changed paths once writes have been quiet for
+    `debounce` seconds. Stops after `idle_timeout` seconds with no change
+    (None waits forever).
+    """
+    while True:
+        pending = watcher.wait(idle_timeout if idle_timeout is not None else 3600)
+        if not pending:
+            if idle_timeout is not None:
+                return
+            continue
+        # Keep absorbing writes until a full debounce window passes quietly
+        while True:
+            more = watcher.wait(debounce)
+            if not more:
+                break
+            pending |= more
+        yield sorted(p for p in pending if p.exists())
+
+
+def unchanged_since_push(path, digest=None):
+    """True when `path` has the same content as the last version pushed or queued."""
+    digest = digest or content_hash(path)
+    entry = state.load_state()["reviews"].get(str(path))
+    if entry and entry.get("content_hash") == digest:
+        return True
+    return digest in outbox.queued_hashes(path)
+
+
+def review_batch(paths, echo=workflow._noop, connect=None):
+    """
+    Pushes every path whose content changed since its last push, sharing
+    one device connection; only the last one is opened on the device.
+    Returns (results, skipped paths).
+    """
+    to_push = []
+    skipped = []
+    for path in paths:
+        if unchanged_since_push(path):
+            skipped.append(path)
+            echo(f"  -> {path.name}: unchanged since last push, skipping")
+        else:
+            to_push.append(path)
+
+    session = None
+    if connect is None:
+        # Same scheduled connection as every other device caller
+        session = DeviceSession(factory=workflow.connect_device)
+        connect = session.get
+    results = []
+    for i, path in enumerate(to_push):
+        echo(f"\nReviewing {path.name}...")
+        try:
+            results.append(workflow.request_review(
+                path, echo=echo, connect=connect, open_viewer=(i == len(to_push) - 1)))
+        except Exception as e:
+            echo(f"  -> [ERROR] {path.name}: {e}", err=True)
+            if session:
+                session.invalidate()
+    return results, skipped
@@ -0,0 +1,664 @@
+"""The review round trip, independent of how it is invoked.
+
+Both the CLI and the MCP server drive these functions. Progress is reported
+through an `echo(message, err=False)` callback (click.echo-compatible) and
+results are returned as plain dicts; failures raise.
+"""
+
+import hashlib
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from .device import SupernoteDevice
+from .converter import render_bundle, render_changes, render_pdf
+from . import annotations, artifacts, changes, markfile, outbox, profiles, retrieval, snippets, sourcemap, state
+from . import ocr as ocr_mod
+from .progress import Cancelled, Progress
+from .scheduler import ScheduledDevice
+from .trace import span
+
+FOR_REVIEW_DIR = "/storage/emulated/0/Document/PDFs/ForReview"
+
+
+def _noop(message="", err=False):
+    pass
+
+
+def _connect(connect):
+    device = connect() if connect else SupernoteDevice()
+    # All device work in this process is queued per device
+    return device if isinstance(device, ScheduledDevice) else ScheduledDevice(device)
+
+
+def connect_device():
+    """A scheduled connection to the Supernote."""
+    return _connect(None)
+
+
+class _Timer:
+    """Wall-clock seconds per sequential phase, for structured results."""
+
+    def __init__(self):
+        self.timings = {}
+        self._current = None
+        self._started = None
+
+    def phase(self, name):
+        self._close()
+        self._current, self._started = name, time.perf_counter()
+
+    def stop(self):
+        self._close()
+        return self.timings
+
+    def _close(self):
+        if self._current is not None:
+            elapsed = time.perf_counter() - self._started
+            self.timings[self._current] = round(self.timings.get(self._current, 0.0) + elapsed, 4)
+            self._current = None
+
+
+# Phases reported by each operation, for progress totals
+REVIEW_STEPS = 6
+DONE_STEPS = 4
+
+
+def _prepare_device(connect):
+    """
+    Connect, create the review folder and look up the device profile; runs
+    while conversion is in progress.
+    """
+    started = time.perf_counter()
+    device = _connect(connect)
+    device.ensure_dir(FOR_REVIEW_DIR)
+    profile = profiles.for_device(device)
+    return device, round(time.perf_counter() - started, 4), profile
+
+
+def request_review(file_path, echo=_noop, connect=None, progress=None, keep_local=True, open_viewer=True,
+                   queue_offline=True, since_last=False, profile=None, source_map=False):
+    """
+    Convert a markdown file, push it to the device and open it.
+    `connect` optionally supplies the device (e.g. DeviceSession.get).
+    `progress` (sn.progress.Progress) receives phase and byte updates and
+    can cancel the operation between phases or mid-transfer.
+    The device is connected while the PDF renders, and the PDF is pushed
+    from memory; `keep_local=False` skips writing the local copy (which
+    annotation detection diffs against). `open_viewer=False` leaves the
+    device on its current document. When the device cannot be reached the
+    converted PDF goes to the outbox (sn.outbox) instead of being lost,
+    unless `queue_offline=False`. `since_last=True` sends only what changed
+    since the last completed review (see sn.changes). `profile` (a name
+    from sn.profiles) fixes the page geometry instead of following the
+    connected device. `source_map=True` records which markdown lines each
+    page region came from, so `done` can name the lines an annotation
+    covers; it reads the markdown as CommonMark, which pandoc needs for
+    source positions.
+    """
+    file_path = Path(file_path)
+    progress = progress or Progress(REVIEW_STEPS)
+
+    base_hash, base_at = changes.baseline(file_path)
+
+    def render(profile):
+        # Hashed before conversion so a save mid-render is not mistaken as pushed
+        source = file_path.read_bytes()
+        source_hash = hashlib.sha256(source).hexdigest()
+        changes.save_snapshot(source, source_hash)
+        # The last completed review stays the baseline until another completes
+        details = {"content_hash": source_hash, "baseline_hash": base_hash, "baseline_at": base_at}
+        if since_last:
+            diff = _changes_since(file_path, source, source_hash, base_hash, base_at, echo)
+            if diff is not None:
+                pdf, entries = render_changes(diff.markdown, source_map=source_map, on_phase=progress.phase,
+                                              profile=profile)
+                if entries is not None:
+                    entries = changes.remap(entries, diff.line_map, file_path.name)
+                return pdf, entries, dict(details, changes=True)
+        pdf, entries = render_pdf(file_path, source_map=source_map, on_phase=progress.phase, profile=profile)
+        return pdf, entries, details
+
+    echo(f"  -> Input: {file_path}")
+    return _send(file_path, render, echo, connect, progress, keep_local, open_viewer, queue_offline, profile)
+
+
+def _changes_since(file_path, source, source_hash, base_hash, base_at, echo):
+    """The changes document against the last completed review, or None to send everything."""
+    if source_hash == base_hash:
+        raise ValueError(f"{file_path.name} has not changed since its last completed review.")
+    old_text = changes.load_snapshot(base_hash)
+    if old_text is None:
+        echo(f"  -> [WARN] No completed review of {file_path.name} to compare with; sending the whole document.",
+             err=True)
+        return None
+    diff = changes.build(old_text, source.decode(), file_path.name,
+                         since=base_at[:16].replace("T", " ") if base_at else None)
+    echo(f"  -> Changes only: {diff.added} block(s) added or changed, {diff.removed} removed, "
+         f"{diff.collapsed} collapsed")
+    return diff
+
+
+def bundle_name(file_paths):
+    """Default review name of a bundle: the first file's stem and a hash of the file list."""
+    listing = "\n".join(sorted(str(Path(p).absolute()) for p in file_paths))
+    return f"{Path(file_paths[0]).stem}-bundle-{hashlib.sha256(listing.encode()).hexdigest()[:8]}"
+
+
+def _bundle_name(name):
+    """An explicit bundle name, kept as given apart from characters unsafe in file names."""
+    cleaned = re.sub(r"[^\w.-]+", "-", name).strip(".-")
+    if not cleaned:
+        raise ValueError(f"'{name}' is not a usable bundle name.")
+    return cleaned
+
+
+def _review_stem(local_path, info):
+    """Stem the review's files are named after; a bundle's key is its whole name."""
+    return Path(local_path).name if info.get("bundle") else Path(local_path).stem
+
+
+def request_bundle(file_paths, name=None, echo=_noop, connect=None, progress=None, keep_local=True,
+                   open_viewer=True, queue_offline=True, profile=None, source_map=False):
+    """
+    Like request_review, for several markdown files rendered into one PDF
+    with a table of contents and one bookmark per file. The bundle is a
+    single review named `name` (by default bundle_name()) beside the first
+    file; the page range of each file is recorded so `done` can report
+    annotations per file.
+    """
+    file_paths = [Path(p) for p in file_paths]
+    if not file_paths:
+        raise ValueError("A bundle needs at least one file.")
+    name = _bundle_name(name) if name else bundle_name(file_paths)
+    key = file_paths[0].parent / name
+    existing = state.get_pending_reviews().get(str(key))
+    if existing is not None:
+        # Re-sending the same files replaces the review; other files would orphan it
+        sent = {str(Path(s["file"]).absolute()) for s in existing.get("bundle") or []}
+        if sent != {str(p.absolute()) for p in file_paths}:
+            raise ValueError(f"A pending review is already named '{name}'. Run `done {name}` first "
+                             f"or pick another --name.")
+    progress = progress or Progress(REVIEW_STEPS)
+    sections = []
+
+    def render(profile):
+        pdf, source_map_entries, ranges = render_bundle(file_paths, on_phase=progress.phase, profile=profile,
+                                                        source_map=source_map)
+        sections[:] = ranges
+        return pdf, source_map_entries, {"bundle": ranges}
+
+    echo(f"  -> Input: {', '.join(str(p) for p in file_paths)}")
+    result = _send(key, render, echo, connect, progress, keep_local, open_viewer, queue_offline, profile,
+                   stem=name)
+    result["bundle"] = sections
+    return result
+
+
+def _send(file_path, render, echo, connect, progress, keep_local, open_viewer, queue_offline, profile=None,
+          stem=None):
+    """
+    Render, push and open one PDF, recorded in state under `file_path`.
+    `render(profile)` returns (pdf, source_map, details). Without a fixed
+    `profile`, it renders for the last device seen and renders again if
+    the connected device turns out to need a different page geometry.
+    """
+    timer = _Timer()
+    fixed = profiles.get(profile) if isinstance(profile, str) else profile
+    profile = fixed or profiles.remembered()
+
+    # Unique name on the device; the local copy is named by its content
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    pdf_name = f"{stem or file_path.stem}_{timestamp}.pdf"
+    remote_path = f"{FOR_REVIEW_DIR}/{pdf_name}"
+
+    echo(f"  -> Remote: {remote_path}")
+
+    device = None
+    connect_seconds = None
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="sn-review") as pool:
+        device_ready = pool.submit(_prepare_device, connect)
+
+        echo(f"\n[1/3] Converting Markdown to PDF...")
+        timer.phase("convert")
+        pdf, source_map, details = render(profile)
+        size = len(pdf)
+        echo(f"  -> PDF generated ({size / 1024:.1f} KB)")
+
+        echo(f"[2/3] Connecting to Supernote...")
+        progress.phase("Connecting to Supernote")
+        timer.phase("device_wait")
+        try:
+            device, connect_seconds, detected = device_ready.result()
+            echo(f"  -> Connected to {device.device.serial}")
+        except Cancelled:
+            raise
+        except Exception as e:
+            if not queue_offline:
+                raise
+            failure = e
+
+        if device is not None and fixed is None and detected is not None and detected != profile:
+            # Rare: a different tablet than last time
+            echo(f"  -> Re-rendering for the {detected.name} page size")
+            timer.phase("convert")
+            profile = detected
+            pdf, source_map, details = render(profile)
+            size = len(pdf)
+        # Stored once the page geometry is settled, while the push runs
+        saved = pool.submit(artifacts.put_bytes, pdf) if keep_local else None
+        if device is not None:
+            profiles.remember(detected)
+            try:
+                echo(f"[3/3] Pushing file...")
+                progress.phase("Pushing PDF")
+                timer.phase("push")
+                device.push(pdf, remote_path, on_chunk=progress.transfer("Pushing PDF"))
+            except Cancelled:
+                raise
+            except Exception as e:
+                if not queue_offline:
+                    raise
+                device = None
+                failure = e
+        local_pdf = saved.result() if saved else None
+    if local_pdf:
+        echo(f"  -> Local copy: {local_pdf}")
+    map_path = sourcemap.save(source_map, local_pdf or pdf_name) if source_map else None
+    details = dict(details, source_map=str(map_path) if map_path else None,
+                   profile=profile.name if profile else None)
+
+    result = {
+        "file": str(file_path),
+        "local_pdf": str(local_pdf) if local_pdf else None,
+        "remote_path": remote_path,
+        "size": size,
+        "device": None,
+        "queued": device is None,
+        "profile": profile.name if profile else None,
+    }
+    if device is None:
+        outbox.enqueue(pdf, file_path, remote_path, local_pdf, **details)
+        echo(f"  -> [WARN] Supernote unavailable ({failure}).", err=True)
+        echo(f"\nQueued in {outbox.OUTBOX_DIR}/; it will be pushed when the tablet reconnects.")
+        return dict(result, timings=timer.stop())
+
+    state.add_review(file_path, remote_path, local_pdf, **details)
+    if local_pdf:
+        artifacts.evict()
+    echo(f"  -> Upload complete")
+
+    if open_viewer:
+        echo("Launching viewer on device...")
+        progress.phase("Opening viewer on device")
+        timer.phase("open")
+        device.open_pdf(remote_path)
+    timings = timer.stop()
+    # Connecting overlapped conversion; device_wait is what it still cost
+    timings["connect"] = connect_seconds
+
+    echo("\nSuccess! Document is open for review." if open_viewer else "\nSuccess! Document is on the device.")
+    return dict(result, device=device.device.serial, timings=timings)
+
+
+def retrieve_reviews(file_pattern=None, echo=_noop, connect=None, progress=None, ocr=False, marks=False,
+                     paths=None):
+    """
+    Pull back every pending review matching `file_pattern` and write a
+    -review.md report for each. Returns one result dict per completed review.
+    `paths` limits retrieval to those exact state keys.
+    `ocr=True` adds the recognised handwriting of each region (sn.ocr).
+    `marks=True` reads reviews that have no export from their `.mark`
+    sidecar (sn.markfile), whose record layout is not yet verified.
+    """
+    progress = progress or Progress(DONE_STEPS)
+    timer = _Timer()
+    pending = state.get_pending_reviews()
+
+    if not pending:
+        echo("No pending reviews found.")
+        return []
+
+    # If pattern is provided, filter; otherwise take all of them
+    if file_pattern:
+        targets = [k for k in pending if file_pattern in k]
+    else:
+        targets = list(pending.keys())
+    if paths is not None:
+        targets = [k for k in targets if k in set(paths)]
+
+    if not targets:
+        echo(f"No pending review matching '{file_pattern}'")
+        return []
+
+    echo(f"Connecting to Supernote...")
+    progress.phase("Connecting to Supernote")
+    timer.phase("connect")
+    device = _connect(connect)
+
+    progress.phase("Listing exports")
+    timer.phase("list")
+    # One listing of EXPORT serves every pending review
+    try:
+        listing = device.list_dir(retrieval.EXPORT_DIR)
+    except Exception as e:
+        echo(f"  -> [WARN] Error listing exports: {e}", err=True)
+        listing = []
+
+    reviews = {k: pending[k] for k in targets}
+    plan = retrieval.plan_retrieval(reviews, listing)
+
+    # Reviews without an export may still have handwriting in a .mark sidecar
+    if marks and any(item.match == "original" for item in plan):
+        try:
+            sidecars = retrieval.find_marks(device, plan)
+        except Exception as e:
+            echo(f"  -> [WARN] Error listing annotation sidecars: {e}", err=True)
+            sidecars = set()
+        if sidecars:
+            plan = retrieval.plan_retrieval(reviews, listing, marks=sidecars)
+
+    jobs = []
+    for item in plan:
+        local_path = Path(item.local_path)
+        echo(f"\nProcessing review for: {local_path.name}")
+        echo(f"  -> Looking for exact export: {Path(item.device_path).name}")
+        if item.match == "exact":
+            echo(f"  -> Exact match found!")
+        elif item.match == "fuzzy":
+            echo(f"  -> Exact match not found. Found alternative: {Path(item.pull_path).name}")
+        elif item.match == "mark":
+            echo(f"  -> No export found. Reading handwriting from {Path(item.pull_path).name}")
+            jobs.append((item.pull_path, retrieval.MARK_CACHE_DIR / Path(item.pull_path).name))
+            continue
+        else:
+            echo(f"  -> [WARN] No exported annotations found. Pulling original file.", err=True)
+
+        # Pulled to scratch space, then filed in the artifact store by content
+        stem = _review_stem(local_path, reviews[item.local_path])
+        reviewed_pdf_name = f"{stem}_reviewed_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+        jobs.append((item.pull_path, artifacts.incoming_path(reviewed_pdf_name)))
+
+    if any(item.match == "mark" for item in plan):
+        retrieval.MARK_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+    echo(f"\nDownloading {len(jobs)} artifact(s)...")
+    progress.phase(f"Downloading {len(jobs)} artifact(s)")
+    timer.phase("download")
+    errors = retrieval.pull_all(device, jobs, on_chunk=progress.transfer("Downloading"))
+    # A cancelled pull surfaces as a per-job error; stop here instead
+    progress.check()
+
+    progress.phase("Writing review reports")
+    timer.phase("reports")
+
+    completed = []
+    details = {}
+    results = []
+    for item, (pull_path, reviewed_pdf), error in zip(plan, jobs, errors):
+        local_path = Path(item.local_path)
+        info = pending[item.local_path]
+        stem = _review_stem(local_path, info)
+        if error is not None:
+            echo(f"  -> [ERROR] {local_path.name}: download failed: {error}", err=True)
+            continue
+        echo(f"  -> {reviewed_pdf.name} downloaded.")
+        if item.match != "mark" and reviewed_pdf.exists():
+            reviewed_pdf = artifacts.adopt(reviewed_pdf)
+
+        started = time.perf_counter()
+        if item.match == "mark":
+            # The sidecar carries only the ink; the original PDF is the document
+            with span("read_mark", file=local_path.name):
+                annotated_pages = _read_mark(info, reviewed_pdf, echo)
+            if annotated_pages is None:
+                echo(f"  -> [WARN] Skipping {local_path.name}; the review stays pending.", err=True)
+                continue
+            if not annotated_pages:
+                # The stroke layout is not verified against every firmware;
+                # an empty read must not complete the review
+                echo(f"  -> [WARN] No handwriting read from {Path(pull_path).name}. Export the document "
+                     f"on the device and run done again; the review stays pending.", err=True)
+                continue
+            # Without a local copy (--no-local-copy) there is no PDF to link
+            local_pdf = info.get("local_pdf")
+            reviewed_pdf = Path(local_pdf) if local_pdf and Path(local_pdf).exists() else None
+            annotation_snippets = []
+        else:
+            with span("annotations", file=local_path.name):
+                annotated_pages = _detect_annotations(info, item, reviewed_pdf, echo)
+            with span("snippets", file=local_path.name):
+                annotation_snippets = _render_snippets(local_path, stem, reviewed_pdf, annotated_pages, echo)
+            if ocr and annotated_pages:
+                with span("ocr", file=local_path.name):
+                    _read_handwriting(info, reviewed_pdf, annotated_pages, echo)
+        analysed = time.perf_counter()
+
+        # Generate review markdown (No prompt, LLM-ready)
+        review_md = local_path.parent / f"{stem}-review.md"
+        report = _format_review(local_path, item, pull_path, reviewed_pdf, annotated_pages, annotation_snippets)
+        files = None
+        if info.get("bundle"):
+            files = _split_bundle(info["bundle"], item, pull_path, reviewed_pdf, annotated_pages,
+                                  annotation_snippets)
+            report += _format_bundle_index(files, local_path.parent)
+        with open(review_md, "w") as f:
+            f.write(report)
+
+        completed.append(item.local_path)
+        reviewed_path = str(reviewed_pdf) if reviewed_pdf is not None else None
+        details[item.local_path] = {"reviewed_path": reviewed_path, "pulled_from": pull_path}
+        if item.match != "mark":
+            # Read by the MCP server's resource listing instead of the PDF
+            details[item.local_path]["page_count"] = _page_count(reviewed_pdf)
+        if annotated_pages is not None:
+            details[item.local_path]["annotated_pages"] = [p.to_dict() for p in annotated_pages]
+            details[item.local_path]["snippets"] = [str(s.path) for s in annotation_snippets]
+        results.append({
+            "file": item.local_path,
+            "match": item.match,
+            "device_path": item.device_path,
+            "pulled_from": pull_path,
+            "reviewed_path": reviewed_path,
+            "review_md": str(review_md),
+            "annotated_pages": [p.to_dict() for p in annotated_pages] if annotated_pages is not None else None,
+            "snippets": [str(s.path) for s in annotation_snippets],
+            "report": report,
+            "files": files,
+            "timings": {
+                "annotations": round(analysed - started, 4),
+                "report": round(time.perf_counter() - analysed, 4),
+            },
+        })
+        echo(f"Created review report: {review_md.name}", err=True)
+
+    # Single state write for the whole batch
+    with span("state_write"):
+        state.mark_completed_many(completed, details)
+    if completed:
+        artifacts.evict()
+    batch = timer.stop()
+    for result in results:
+        # Batch phases are shared; annotations/report are per review
+        result["timings"] = {**batch, **result["timings"]}
+    return results
+
+
+def list_pending():
+    """Pending reviews as a list of dicts, oldest first."""
+    pending = state.get_pending_reviews()
+    return [
+        {"file": path, "name": Path(path).name, "device_path": info["device_path"], "timestamp": info["timestamp"]}
+        for path, info in sorted(pending.items(), key=lambda kv: kv[1]["timestamp"])
+    ]
+
+
+def _format_review(local_path, item, pull_path, reviewed_pdf, annotated_pages, annotation_snippets):
+    lines = [
+        f"# Review: {local_path.name}\n\n",
+        f"**Date:** {datetime.now().strftime('%Y-%m-%d %H:%M')}\n",
+    ]
+    if item.match == "mark":
+        if reviewed_pdf is not None:
+            lines.append(f"**Original PDF:** [{reviewed_pdf.name}]"
+                         f"({os.path.relpath(reviewed_pdf, local_path.parent)})\n")
+        lines.append(f"**Annotations:** read from device sidecar `{Path(pull_path).name}`\n\n")
+    else:
+        lines.append(f"**Annotated PDF:** [{Path(pull_path).name}]({os.path.relpath(reviewed_pdf, local_path.parent)})\n\n")
+    lines.append("## Status\n")
+    if item.match == "mark":
+        # The linked PDF is the clean original; the ink is only in the sidecar
+        lines.append("Review completed on device. The handwriting was not exported, so the linked PDF "
+                     "does not show it; the annotated regions are listed below.")
+    else:
+        lines.append("Review completed on device. See annotated PDF for details.")
+    lines.append("\n")
+    if annotated_pages is not None:
+        lines.append("\n")
+        lines.append(annotations.format_report(annotated_pages, annotation_snippets, local_path.parent))
+    return "".join(lines)
+
+
+def _split_bundle(sections, item, pull_path, reviewed_pdf, annotated_pages, annotation_snippets):
+    """
+    Writes a -review.md beside each file of a bundle with the annotations
+    on its pages (numbered as in the bundle PDF). Returns one dict per file.
+    """
+    files = []
+    for section in sections:
+        path = Path(section["file"])
+        first, last = section["first_page"], section["last_page"]
+        in_range = (lambda page: first is not None and first <= page <= last)
+        pages = [p for p in annotated_pages if in_range(p.page)] if annotated_pages is not None else None
+        shots = [s for s in annotation_snippets if in_range(s.page)]
+        review_md = path.parent / f"{path.stem}-review.md"
+        report = _format_review(path, item, pull_path, reviewed_pdf, pages, shots)
+        with open(review_md, "w") as f:
+            f.write(report)
+        files.append({
+            "file": str(path),
+            "first_page": first,
+            "last_page": last,
+            "review_md": str(review_md),
+            "annotated_pages": [p.to_dict() for p in pages] if pages is not None else None,
+        })
+    return files
+
+
+def _format_bundle_index(files, base_dir):
+    lines = ["\n## Files\n"]
+    for f in files:
+        pages = f"pages {f['first_page']}\u2013{f['last_page']}" if f["first_page"] else "no pages"
+        count = "" if f["annotated_pages"] is None else f", {len(f['annotated_pages'])} annotated"
+        link = os.path.relpath(f["review_md"], base_dir)
+        lines.append(f"- [{Path(f['file']).name}]({link}): {pages}{count}")
+    return "\n".join(lines) + "\n"
+
+
+def _detect_annotations(info, item, reviewed_pdf, echo):
+    """Diff the exported PDF against the local original; None when not possible."""
+    local_pdf = info.get("local_pdf")
+    if item.match == "original" or not local_pdf or not Path(local_pdf).exists():
+        return None
+    if not annotations.is_available():
+        echo("  -> [INFO] Install the 'annotations' extra to list annotated pages.", err=True)
+        return None
+    try:
+        pages = annotations.detect_annotations(local_pdf, reviewed_pdf)
+    except Exception as e:
+        echo(f"  -> [WARN] Annotation detection failed: {e}", err=True)
+        return None
+    echo(f"  -> Annotations found on {len(pages)} page(s)")
+    _attach_source_lines(info, pages)
+    return pages
+
+
+def _read_handwriting(info, reviewed_pdf, pages, echo):
+    """OCR the ink of each annotated region into `pages[i].text`."""
+    if not ocr_mod.is_available():
+        echo("  -> [INFO] Install the 'ocr' extra and tesseract to read handwriting.", err=True)
+        return
+    try:
+        hits = ocr_mod.read_regions(info.get("local_pdf"), reviewed_pdf, pages)
+    except Exception as e:
+        echo(f"  -> [WARN] Handwriting OCR failed: {e}", err=True)
+        return
+    regions = sum(len(p.bboxes) for p in pages)
+    echo(f"  -> Read handwriting in {regions} region(s) ({hits} cached)")
+
+
+def _read_mark(info, mark_file, echo):
+    """
+    Per-page annotation boxes, in PDF points, from a pulled .mark sidecar;
+    None when the sidecar or the local PDF cannot be read.
+    """
+    try:
+        mark = markfile.parse_file(mark_file)
+    except Exception as e:
+        echo(f"  -> [WARN] Could not parse {mark_file.name}: {e}", err=True)
+        return None
+    try:
+        page_sizes = _pdf_page_sizes(info.get("local_pdf"))
+        pages = []
+        for p in mark.annotated_pages():
+            size = page_sizes.get(p.page, markfile.A5_POINTS)
+            pages.append(annotations.PageAnnotations(
+                page=p.page,
+                bboxes=[markfile.to_pdf_points(b, mark.screen, size) for b in p.bboxes],
+            ))
+    except Exception as e:
+        echo(f"  -> [WARN] Could not place the handwriting of {mark_file.name}: {e}", err=True)
+        return None
+    echo(f"  -> Annotations found on {len(pages)} page(s)")
+    _attach_source_lines(info, pages)
+    return pages
+
+
+def _page_count(pdf_path):
+    """Number of pages in a PDF, or None if it cannot be read."""
+    if not annotations.is_available():
+        return None
+    try:
+        with annotations.fitz.open(pdf_path) as doc:
+            return doc.page_count
+    except Exception:
+        return None
+
+
+def _pdf_page_sizes(pdf_path):
+    """Page sizes in points keyed by 1-based page number, if readable."""
+    if not pdf_path or not Path(pdf_path).exists() or not annotations.is_available():
+        return {}
+    with annotations.fitz.open(pdf_path) as doc:
+        return {i: (page.rect.width, page.rect.height) for i, page in enumerate(doc, start=1)}
+
+
+def _attach_source_lines(info, pages):
+    """Resolve each annotated region to the markdown lines it covers."""
+    map_path = info.get("source_map")
+    if not map_path or not Path(map_path).exists():
+        return
+    entries = sourcemap.load(map_path)
+    source_name = Path(info["original_path"]).name
+    for p in pages:
+        p.source_lines = []
+        for _, y0, _, y1 in p.bboxes:
+            hit = sourcemap.lookup(entries, p.page, y0, y1)
+            p.source_lines.append((hit[0] or source_name, hit[1], hit[2]) if hit else None)
+
+
+def _render_snippets(local_path, stem, reviewed_pdf, pages, echo):
+    """Crop each annotated region into a small image beside the review report."""
+    if not pages:
+        return []
+    out_dir = local_path.parent / f"{stem}-review-snippets"
+    try:
+        rendered = snippets.render_snippets(reviewed_pdf, pages, out_dir, stem=stem)
+    except Exception as e:
+        echo(f"  -> [WARN] Snippet rendering failed: {e}", err=True)
+        return []
+    echo(f"  -> {len(rendered)} annotation snippet(s) written to {out_dir.name}/")
+    return rendered
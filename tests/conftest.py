@@ -18,6 +18,20 @@ def temp_state_file(tmp_path):
     # Teardown: Restore original
     state_module.STATE_FILE = original_state_file
 
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    """Keeps artifacts, every cache, the outbox, device locks and the remembered profile out of the cwd."""
+    from sn import artifacts, changes, ocr, outbox, profiles, retrieval, scheduler, snippets, sourcemap
+    monkeypatch.setattr(artifacts, "STORE_DIR", tmp_path / "artifacts")
+    monkeypatch.setattr(outbox, "OUTBOX_DIR", tmp_path / ".sn_outbox")
+    monkeypatch.setattr(scheduler, "LOCK_DIR", tmp_path / "locks")
+    monkeypatch.setattr(changes, "SNAPSHOT_DIR", tmp_path / "snapshots")
+    monkeypatch.setattr(profiles, "PROFILE_CACHE", tmp_path / "device_profile")
+    monkeypatch.setattr(snippets, "CACHE_DIR", tmp_path / "snippets")
+    monkeypatch.setattr(ocr, "CACHE_DIR", tmp_path / "ocr")
+    monkeypatch.setattr(sourcemap, "SOURCE_MAP_DIR", tmp_path / "sourcemaps")
+    monkeypatch.setattr(retrieval, "MARK_CACHE_DIR", tmp_path / "marks")
+
 @pytest.fixture
 def mock_adb_client(mocker):
     """Mocks the adbutils client."""
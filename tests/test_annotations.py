@@ -0,0 +1,65 @@
+import pytest
+
+fitz = pytest.importorskip("fitz")
+np = pytest.importorskip("numpy")
+
+from sn.annotations import detect_annotations, diff_regions, format_report, PageAnnotations
+
+
+def _make_pdfs(tmp_path, pages=3, ink=None):
+    """Writes an original PDF and a copy with rectangles drawn on `ink` pages."""
+    ink = ink or {}
+    original = tmp_path / "original.pdf"
+    annotated = tmp_path / "annotated.pdf"
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page(width=420, height=595)
+        page.insert_text((50, 80), f"Page {i + 1} body text")
+    doc.save(original)
+    for page_no, rects in ink.items():
+        for rect in rects:
+            doc[page_no - 1].draw_rect(fitz.Rect(*rect), color=(0, 0, 0), fill=(0, 0, 0))
+    doc.save(annotated)
+    return original, annotated
+
+
+def test_diff_regions_separates_distant_marks():
+    a = np.full((100, 100), 255, dtype=np.uint8)
+    b = a.copy()
+    b[10:20, 10:20] = 0
+    b[70:80, 60:90] = 0
+    boxes, changed = diff_regions(a, b)
+    assert sorted(boxes) == [(10, 10, 20, 20), (60, 70, 90, 80)]
+    assert changed == 100 + 300
+
+
+def test_diff_regions_ignores_identical_pages():
+    a = np.full((50, 50), 200, dtype=np.uint8)
+    assert diff_regions(a, a.copy()) == ([], 0)
+
+
+def test_detect_annotations_lists_only_marked_pages(tmp_path):
+    original, annotated = _make_pdfs(tmp_path, pages=3, ink={2: [(100, 200, 200, 260)]})
+
+    pages = detect_annotations(original, annotated)
+
+    assert [p.page for p in pages] == [2]
+    x0, y0, x1, y1 = pages[0].bboxes[0]
+    assert x0 == pytest.approx(100, abs=4) and x1 == pytest.approx(200, abs=4)
+    assert y0 == pytest.approx(200, abs=4) and y1 == pytest.approx(260, abs=4)
+
+
+def test_detect_annotations_process_pool(tmp_path):
+    ink = {3: [(50, 50, 80, 80)], 9: [(300, 500, 380, 560)]}
+    original, annotated = _make_pdfs(tmp_path, pages=12, ink=ink)
+
+    pages = detect_annotations(original, annotated, max_workers=3)
+
+    assert [p.page for p in pages] == [3, 9]
+
+
+def test_format_report():
+    report = format_report([PageAnnotations(page=4, bboxes=[(10, 20, 30, 40)], changed_pixels=50)])
+    assert "## Annotated Pages" in report
+    assert "- Page 4: 1 region(s) at (10, 20)-(30, 40) pt" in report
+    assert "No handwritten annotations detected." in format_report([])
@@ -0,0 +1,49 @@
+import pytest
+
+from sn import api
+
+
+def test_request_review_returns_structured_result(mocker):
+    mock_review = mocker.patch("sn.workflow.request_review", return_value={
+        "file": "spec.md", "local_pdf": "spec_1.pdf", "remote_path": "/ForReview/spec_1.pdf",
+        "size": 2048, "device": "192.168.1.5:5555",
+    })
+
+    result = api.request_review("spec.md")
+
+    assert isinstance(result, api.ReviewRequest)
+    assert result.size == 2048
+    # Runs on the shared, warm device session
+    assert mock_review.call_args.kwargs["connect"] == api._session.get
+
+
+def test_retrieve_review_results(mocker):
+    mocker.patch("sn.workflow.retrieve_reviews", return_value=[{
+        "file": "spec.md", "match": "exact", "device_path": "/ForReview/spec_1.pdf",
+        "pulled_from": "/EXPORT/spec_1.pdf", "reviewed_path": "spec_reviewed.pdf",
+        "review_md": "spec-review.md", "annotated_pages": None, "snippets": [], "report": "# Review",
+    }])
+
+    results = api.retrieve_review("spec")
+
+    assert [r.match for r in results] == ["exact"]
+    assert results[0].to_dict()["report"] == "# Review"
+
+
+def test_failure_resets_device_session(mocker):
+    mocker.patch("sn.workflow.request_review", side_effect=RuntimeError("device gone"))
+    invalidate = mocker.patch.object(api._session, "invalidate")
+
+    with pytest.raises(RuntimeError):
+        api.request_review("spec.md")
+
+    invalidate.assert_called_once()
+
+
+def test_list_pending(temp_state_file):
+    from sn import state
+    state.add_review("spec.md", "/ForReview/spec_1.pdf")
+
+    pending = api.list_pending()
+
+    assert [(p.name, p.device_path) for p in pending] == [("spec.md", "/ForReview/spec_1.pdf")]
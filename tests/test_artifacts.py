@@ -0,0 +1,78 @@
+import os
+
+from sn import artifacts, outbox, state
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    a = artifacts.put_bytes(b"%PDF one", directory=tmp_path)
+    b = artifacts.put_bytes(b"%PDF one", directory=tmp_path)
+    c = artifacts.put_bytes(b"%PDF two", directory=tmp_path)
+
+    assert a == b != c
+    assert a.parent.name == a.stem[:2]
+    assert a.read_bytes() == b"%PDF one"
+
+
+def test_adopt_moves_file_in_and_drops_duplicates(tmp_path):
+    stored = artifacts.put_bytes(b"%PDF export", directory=tmp_path)
+    pulled = artifacts.incoming_path("draft_reviewed_1.pdf", tmp_path)
+    pulled.write_bytes(b"%PDF export")
+
+    assert artifacts.adopt(pulled, tmp_path) == stored
+    assert not pulled.exists()
+
+
+def test_evict_drops_least_recently_used_but_keeps_pending(tmp_path, temp_state_file):
+    paths = [artifacts.put_bytes(bytes([i]) * 100, directory=tmp_path) for i in range(4)]
+    for age, path in enumerate(reversed(paths)):
+        os.utime(path, (1000 - age * 100, 1000 - age * 100))
+    # paths[0] is the oldest, but a pending review still diffs against it
+    state.add_review("a.md", "/ForReview/a_1.pdf", paths[0])
+
+    removed = artifacts.evict(max_bytes=250, directory=tmp_path)
+
+    assert removed == [paths[1], paths[2]]
+    assert paths[0].exists() and paths[3].exists()
+
+
+def test_trim_caps_a_flat_cache_but_keeps_pending_source_maps(tmp_path, temp_state_file):
+    cache = tmp_path / "sourcemaps"
+    cache.mkdir()
+    paths = []
+    for i in range(3):
+        path = cache / f"draft_{i}.map.json"
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (1000 + i, 1000 + i))
+        paths.append(path)
+    state.add_review("a.md", "/ForReview/a_1.pdf", source_map=str(paths[0]))
+
+    assert artifacts.trim(cache, max_bytes=200) == [paths[1]]
+    assert paths[0].exists() and paths[2].exists()
+
+
+def test_evict_keeps_completed_exports_and_queued_copies(tmp_path, temp_state_file):
+    store = tmp_path / "store"
+    paths = [artifacts.put_bytes(bytes([i]) * 100, directory=store) for i in range(4)]
+    for age, path in enumerate(reversed(paths)):
+        os.utime(path, (1000 - age * 100, 1000 - age * 100))
+    # The report of a completed review links to its export
+    state.add_review("a.md", "/ForReview/a_1.pdf")
+    state.mark_completed_many(["a.md"], {"a.md": {"reviewed_path": str(paths[0])}})
+    # A queued review will diff against its local copy
+    outbox.enqueue(b"%PDF", "b.md", "/ForReview/b_1.pdf", paths[1])
+
+    removed = artifacts.evict(max_bytes=300, directory=store)
+
+    assert removed == [paths[2]]
+    assert paths[0].exists() and paths[1].exists()
+
+
+def test_evict_deletes_stale_partial_pulls(tmp_path, temp_state_file):
+    stale = artifacts.incoming_path("old_reviewed_1.pdf", tmp_path)
+    stale.write_bytes(b"%PDF half")
+    os.utime(stale, (1000, 1000))
+    fresh = artifacts.incoming_path("new_reviewed_1.pdf", tmp_path)
+    fresh.write_bytes(b"%PDF in flight")
+
+    assert artifacts.evict(directory=tmp_path) == [stale]
+    assert fresh.exists()
@@ -0,0 +1,96 @@
+import os
+from sn import changes, state
+
+DOC = """# Spec
+
+Intro.
+
+## Install
+
+Step one.
+
+Step two.
+
+```
+pip install
+
+sn-review
+```
+
+## Usage
+
+Run it.
+
+Then done.
+"""
+
+
+def test_split_blocks_keeps_fenced_code_together():
+    blocks = changes.split_blocks(DOC)
+
+    code = [b for b in blocks if b.lines[0] == "```"]
+    assert len(code) == 1 and code[0].lines == ["```", "pip install", "", "sn-review", "```"]
+    assert [b.start for b in blocks if b.is_heading] == [1, 5, 17]
+
+
+def test_build_collapses_unchanged_and_keeps_section_heading():
+    new = DOC.replace("Then done.", "Then check the output.")
+
+    diff = changes.build(DOC, new, "spec.md")
+
+    assert (diff.added, diff.removed) == (1, 1)
+    assert "## Usage" in diff.markdown
+    assert "Run it." in diff.markdown  # one block of context
+    assert "pip install" not in diff.markdown
+    assert diff.collapsed > 0 and "unchanged blocks" in diff.markdown
+    # Added lines map back to the new file; removed ones map nowhere
+    lines = diff.markdown.splitlines()
+    assert diff.line_map[lines.index("Then check the output.")] == 21
+    assert diff.line_map[lines.index("Then done.")] is None
+
+
+def test_remap_points_entries_at_original_lines():
+    line_map = [None, None, 7, 8, None]
+    entries = [{"page": 1, "y0": 0, "y1": 10, "source": "", "start": 1, "end": 1},
+               {"page": 1, "y0": 10, "y1": 30, "source": "", "start": 2, "end": 5}]
+
+    assert changes.remap(entries, line_map, "spec.md") == [
+        {"page": 1, "y0": 10, "y1": 30, "source": "spec.md", "start": 7, "end": 8}]
+
+
+def test_baseline_follows_last_completed_review(temp_state_file):
+    state.add_review("spec.md", "/ForReview/spec_1.pdf", content_hash="v1")
+    assert changes.baseline("spec.md") == (None, None)
+
+    state.mark_completed("spec.md")
+    digest, at = changes.baseline("spec.md")
+    assert digest == "v1" and at
+
+    # A pending re-push carries the baseline until it completes too
+    state.add_review("spec.md", "/ForReview/spec_2.pdf", content_hash="v2", baseline_hash="v1", baseline_at=at)
+    assert changes.baseline("spec.md") == ("v1", at)
+
+
+def test_snapshots_are_content_addressed(tmp_path):
+    path = changes.save_snapshot(b"# One", "abc", tmp_path)
+    changes.save_snapshot(b"# Other", "abc", tmp_path)
+
+    assert path.read_bytes() == b"# One"
+    assert changes.load_snapshot("abc", tmp_path) == "# One"
+    assert changes.load_snapshot("missing", tmp_path) is None
+
+
+def test_snapshots_are_capped_but_baselines_kept(tmp_path, temp_state_file, monkeypatch):
+    state.add_review("spec.md", "/ForReview/spec_1.pdf", content_hash="base")
+    state.mark_completed("spec.md")
+    state.add_review("spec.md", "/ForReview/spec_2.pdf", content_hash="next", baseline_hash="base")
+    directory = tmp_path / "snapshots"
+    for i, digest in enumerate(["base", "next", "old1", "old2"]):
+        changes.save_snapshot(b"x" * 100, digest, directory)
+        os.utime(directory / f"{digest}.md", (i, i))
+
+    monkeypatch.setattr(changes, "MAX_SNAPSHOT_BYTES", 300)
+    changes.save_snapshot(b"x" * 100, "new", directory)
+
+    # The oldest go first, but never a baseline or a pending push
+    assert sorted(p.stem for p in directory.glob("*.md")) == ["base", "new", "next"]
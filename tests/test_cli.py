@@ -1,3 +1,4 @@
+import os
 import pytest
 from click.testing import CliRunner
 from sn.main import cli
@@ -20,10 +21,8 @@ def test_list_command_empty(runner, temp_state_file):
 
 def test_review_flow(runner, temp_state_file, mocker):
     # Mock dependencies
-    def mock_convert(src, dst):
-        with open(dst, "w") as f: f.write("dummy pdf content")
-    mocker.patch("sn.main.convert_to_pdf", side_effect=mock_convert)
-    mock_dev_cls = mocker.patch("sn.main.SupernoteDevice")
+    mocker.patch("sn.workflow.render_pdf", return_value=(b"dummy pdf content", None))
+    mock_dev_cls = mocker.patch("sn.workflow.SupernoteDevice")
     mock_dev = mock_dev_cls.return_value
     
     # Create dummy file
@@ -36,11 +35,38 @@ def test_review_flow(runner, temp_state_file, mocker):
         assert result.exit_code == 0
         assert "Document is open for review." in result.output
         
-        # Verify push called
-        assert mock_dev.push.called
+        # Pushed straight from memory; the local copy is still written
+        assert mock_dev.push.call_args.args[0] == b"dummy pdf content"
         # Verify state updated
         from sn import state
-        assert "draft.md" in str(list(state.get_pending_reviews().keys())[0])
+        entry = list(state.get_pending_reviews().items())[0]
+        assert "draft.md" in entry[0]
+        assert open(entry[1]["local_pdf"], "rb").read() == b"dummy pdf content"
+
+def test_review_pipelines_connect_with_conversion(runner, temp_state_file, mocker):
+    import threading
+    connected = threading.Event()
+
+    def render(*args, **kwargs):
+        # Conversion only finishes once the device is ready: they overlap
+        assert connected.wait(2)
+        return b"%PDF", None
+
+    mocker.patch("sn.workflow.render_pdf", side_effect=render)
+    mock_dev = mocker.patch("sn.workflow.SupernoteDevice").return_value
+    mock_dev.ensure_dir.side_effect = lambda d: connected.set()
+
+    with runner.isolated_filesystem():
+        with open("draft.md", "w") as f:
+            f.write("content")
+        result = runner.invoke(cli, ['review', 'draft.md', '--no-local-copy'])
+
+        assert result.exit_code == 0, result.output
+        mock_dev.ensure_dir.assert_called_once_with("/storage/emulated/0/Document/PDFs/ForReview")
+        from sn import state
+        entry = list(state.get_pending_reviews().values())[0]
+        assert "local_pdf" not in entry
+        assert not any(name.endswith(".pdf") for name in os.listdir("."))
 
 def test_done_flow_exact_match(runner, temp_state_file, mocker):
     # 1. Setup State
@@ -48,9 +74,9 @@ def test_done_flow_exact_match(runner, temp_state_file, mocker):
     state.add_review("draft.md", "/storage/emulated/0/Document/PDFs/ForReview/draft_123.pdf")
     
     # 2. Mock Device
-    mock_dev_cls = mocker.patch("sn.main.SupernoteDevice")
+    mock_dev_cls = mocker.patch("sn.workflow.SupernoteDevice")
     mock_dev = mock_dev_cls.return_value
-    mock_dev.exists.return_value = True # Pretend export exists
+    mock_dev.list_dir.return_value = ["draft_123.pdf"] # Pretend export exists
     
     with runner.isolated_filesystem():
         # Create the 'draft.md' so Path(local_path).parent works
@@ -75,10 +101,9 @@ def test_done_flow_fuzzy_match(runner, temp_state_file, mocker):
     state.add_review("draft.md", "/storage/emulated/0/Document/PDFs/ForReview/draft_123.pdf")
     
     # 2. Mock Device
-    mock_dev_cls = mocker.patch("sn.main.SupernoteDevice")
+    mock_dev_cls = mocker.patch("sn.workflow.SupernoteDevice")
     mock_dev = mock_dev_cls.return_value
-    mock_dev.exists.return_value = False # Exact export missing
-    mock_dev.list_dir.return_value = ["draft_456.pdf", "other.pdf"]
+    mock_dev.list_dir.return_value = ["draft_456.pdf", "other.pdf"] # Exact export missing
     
     with runner.isolated_filesystem():
         with open("draft.md", "w") as f: f.write("src")
@@ -92,4 +117,462 @@ def test_done_flow_fuzzy_match(runner, temp_state_file, mocker):
         # The code sorts candidates and picks the last one
         mock_dev.pull.assert_called()
         args, _ = mock_dev.pull.call_args
-        assert "draft_456.pdf" in args[0]
\ No newline at end of file
+        assert "draft_456.pdf" in args[0]
+
+def test_done_batch_single_listing(runner, temp_state_file, mocker):
+    from sn import state
+    state.add_review("a.md", "/storage/emulated/0/Document/PDFs/ForReview/a_20260101_100000.pdf")
+    state.add_review("b.md", "/storage/emulated/0/Document/PDFs/ForReview/b_20260101_100000.pdf")
+
+    mock_dev_cls = mocker.patch("sn.workflow.SupernoteDevice")
+    mock_dev = mock_dev_cls.return_value
+    mock_dev.list_dir.return_value = ["a_20260101_100000.pdf", "b_20251231_090000.pdf", "b_20260102_090000.pdf"]
+    save_spy = mocker.spy(state, "save_state")
+
+    with runner.isolated_filesystem():
+        result = runner.invoke(cli, ['done'])
+
+        assert result.exit_code == 0
+        # One connection, one listing, no per-file exists checks
+        assert mock_dev_cls.call_count == 1
+        assert mock_dev.list_dir.call_count == 1
+        assert not mock_dev.exists.called
+        pulled = sorted(c.args[0] for c in mock_dev.pull.call_args_list)
+        assert pulled == [
+            "/storage/emulated/0/EXPORT/a_20260101_100000.pdf",
+            "/storage/emulated/0/EXPORT/b_20260102_090000.pdf",
+        ]
+        # All completions committed in one write
+        assert save_spy.call_count == 1
+        assert state.get_pending_reviews() == {}
+
+def test_done_lists_annotated_pages(runner, temp_state_file, mocker):
+    from sn import state
+    from sn.annotations import PageAnnotations
+
+    mock_dev_cls = mocker.patch("sn.workflow.SupernoteDevice")
+    mock_dev_cls.return_value.list_dir.return_value = ["draft_123.pdf"]
+    mocker.patch("sn.workflow.annotations.is_available", return_value=True)
+    mocker.patch("sn.workflow.annotations.detect_annotations",
+                 return_value=[PageAnnotations(page=3, bboxes=[(10, 20, 110, 60)], changed_pixels=40)])
+    mocker.patch("sn.workflow._page_count", return_value=5)
+
+    with runner.isolated_filesystem():
+        with open("draft_123.pdf", "w") as f: f.write("pdf")
+        state.add_review("draft.md", "/storage/emulated/0/Document/PDFs/ForReview/draft_123.pdf", "draft_123.pdf")
+
+        result = runner.invoke(cli, ['done', 'draft'])
+
+        assert result.exit_code == 0
+        assert "## Annotated Pages" in result.output
+        assert "- Page 3: 1 region(s)" in result.output
+        assert state.load_state()["reviews"]["draft.md"]["annotated_pages"][0]["page"] == 3
+        assert state.load_state()["reviews"]["draft.md"]["page_count"] == 5
+
+def test_done_reports_source_lines(runner, temp_state_file, mocker):
+    from sn import state, sourcemap
+    from sn.annotations import PageAnnotations
+
+    mock_dev_cls = mocker.patch("sn.workflow.SupernoteDevice")
+    mock_dev_cls.return_value.list_dir.return_value = ["draft_123.pdf"]
+    mocker.patch("sn.workflow.annotations.is_available", return_value=True)
+    mocker.patch("sn.workflow.annotations.detect_annotations",
+                 return_value=[PageAnnotations(page=4, bboxes=[(10, 100, 110, 140)], changed_pixels=40)])
+
+    with runner.isolated_filesystem():
+        with open("draft_123.pdf", "w") as f: f.write("pdf")
+        map_path = sourcemap.save(
+            [{"page": 4, "y0": 90, "y1": 150, "source": "draft.md", "start": 120, "end": 134}],
+            "draft_123.pdf", "maps")
+        state.add_review("draft.md", "/storage/emulated/0/Document/PDFs/ForReview/draft_123.pdf",
+                         "draft_123.pdf", source_map=str(map_path))
+
+        result = runner.invoke(cli, ['done', 'draft'])
+
+        assert result.exit_code == 0
+        assert "Region 1 on page 4 covers lines 120–134 of draft.md" in result.output
+
+def test_done_reads_mark_sidecar_without_export(runner, temp_state_file, mocker):
+    from sn import state
+    from sn.markfile import MarkFile, MarkPage
+
+    remote = "/storage/emulated/0/Document/PDFs/ForReview/draft_123.pdf"
+    state.add_review("draft.md", remote)
+
+    mock_dev_cls = mocker.patch("sn.workflow.SupernoteDevice")
+    mock_dev = mock_dev_cls.return_value
+    mock_dev.list_dir.side_effect = lambda d: [] if "EXPORT" in d else ["draft_123.pdf", "draft_123.pdf.mark"]
+    mocker.patch("sn.workflow.markfile.parse_file", return_value=MarkFile(
+        version="SN_FILE_VER_20230015", equipment="N6", screen=(1404, 1872),
+        pages=[MarkPage(page=2, bboxes=[(0, 0, 1404, 100)])]))
+
+    with runner.isolated_filesystem():
+        # Sidecars are only read on request
+        result = runner.invoke(cli, ['done', 'draft'])
+        assert mock_dev.pull.call_args.args[0] == remote
+        assert all("ForReview" not in c.args[0] for c in mock_dev.list_dir.call_args_list)
+        mock_dev.pull.reset_mock()
+        state.add_review("draft.md", remote)
+
+        result = runner.invoke(cli, ['done', '--marks', 'draft'])
+
+        assert result.exit_code == 0
+        # Only the small sidecar is pulled, not the PDF
+        mock_dev.pull.assert_called_once()
+        assert mock_dev.pull.call_args.args[0] == remote + ".mark"
+        assert "read from device sidecar `draft_123.pdf.mark`" in result.output
+        assert "the linked PDF does not show it" in result.output
+        assert "See annotated PDF" not in result.output
+        assert "- Page 2: 1 region(s)" in result.output
+        # Pushed without a local copy: nothing to link, and never the sidecar
+        assert "Original PDF" not in result.output
+
+def test_done_marks_reports_unreadable_pdf_per_review(runner, temp_state_file, mocker):
+    from sn import state
+    from sn.markfile import MarkFile, MarkPage
+
+    folder = "/storage/emulated/0/Document/PDFs/ForReview"
+    mock_dev = mocker.patch("sn.workflow.SupernoteDevice").return_value
+    mock_dev.list_dir.side_effect = lambda d: [] if "EXPORT" in d else [
+        "a_123.pdf", "a_123.pdf.mark", "b_123.pdf", "b_123.pdf.mark"]
+    mocker.patch("sn.workflow.markfile.parse_file", return_value=MarkFile(
+        version="SN_FILE_VER_20230015", equipment="N6", screen=(1404, 1872),
+        pages=[MarkPage(page=1, bboxes=[(0, 0, 1404, 100)])]))
+
+    def page_sizes(path):
+        if path.endswith("a.pdf"):
+            raise RuntimeError("cannot open broken document")
+        return {}
+    mocker.patch("sn.workflow._pdf_page_sizes", side_effect=page_sizes)
+
+    with runner.isolated_filesystem():
+        for name in ("a", "b"):
+            with open(f"{name}.pdf", "wb") as f:
+                f.write(b"%PDF")
+            state.add_review(f"{name}.md", f"{folder}/{name}_123.pdf", local_pdf=f"{name}.pdf")
+
+        result = runner.invoke(cli, ['done', '--marks'])
+
+        assert result.exit_code == 0
+        assert "cannot open broken document" in result.output
+        assert list(state.get_pending_reviews()) == ["a.md"]
+        with open("b-review.md") as f:
+            assert "**Original PDF:** [b.pdf](b.pdf)" in f.read()
+
+def test_done_keeps_review_pending_when_mark_has_no_ink(runner, temp_state_file, mocker):
+    from sn import state
+    from sn.markfile import MarkFile, MarkPage, MarkFormatError
+
+    remote = "/storage/emulated/0/Document/PDFs/ForReview/draft_123.pdf"
+    state.add_review("draft.md", remote)
+    mock_dev = mocker.patch("sn.workflow.SupernoteDevice").return_value
+    mock_dev.list_dir.side_effect = lambda d: [] if "EXPORT" in d else ["draft_123.pdf", "draft_123.pdf.mark"]
+    parse = mocker.patch("sn.workflow.markfile.parse_file")
+
+    with runner.isolated_filesystem():
+        for outcome in (MarkFormatError("Stroke record too short"),
+                        MarkFile(version="SN_FILE_VER_20230015", equipment="N6", screen=(1404, 1872),
+                                 pages=[MarkPage(page=1)])):
+            parse.side_effect = outcome if isinstance(outcome, Exception) else None
+            parse.return_value = outcome
+            result = runner.invoke(cli, ['done', '--marks', 'draft'])
+
+            assert result.exit_code == 0
+            assert "the review stays pending" in result.output
+            assert not os.path.exists("draft-review.md")
+            assert "draft.md" in state.get_pending_reviews()
+
+def test_review_json_output(runner, temp_state_file, mocker):
+    import json
+    mocker.patch("sn.workflow.render_pdf", return_value=(b"dummy pdf content", None))
+    mocker.patch("sn.workflow.SupernoteDevice").return_value.device.serial = "192.168.1.5:5555"
+
+    with runner.isolated_filesystem():
+        with open("draft.md", "w") as f:
+            f.write("content")
+
+        result = runner.invoke(cli, ['review', 'draft.md', '--json'])
+
+    assert result.exit_code == 0
+    # Progress goes to stderr; stdout is only the JSON document
+    data = json.loads(result.stdout)
+    assert data["size"] == len("dummy pdf content")
+    assert data["remote_path"].endswith(".pdf")
+    assert set(data["timings"]) == {"convert", "connect", "device_wait", "push", "open"}
+    assert "Converting Markdown" in result.stderr
+
+def test_review_source_map_is_opt_in(runner, temp_state_file, mocker):
+    render = mocker.patch("sn.workflow.render_pdf", return_value=(b"pdf", None))
+    mocker.patch("sn.workflow.SupernoteDevice").return_value.device.serial = "192.168.1.5:5555"
+
+    with runner.isolated_filesystem():
+        with open("draft.md", "w") as f:
+            f.write("content")
+        runner.invoke(cli, ['review', 'draft.md'])
+        runner.invoke(cli, ['review', '--source-map', 'draft.md'])
+
+    assert [c.kwargs["source_map"] for c in render.call_args_list] == [False, True]
+
+def test_done_json_output(runner, temp_state_file, mocker):
+    import json
+    from sn import state
+    state.add_review("draft.md", "/storage/emulated/0/Document/PDFs/ForReview/draft_123.pdf")
+    mock_dev = mocker.patch("sn.workflow.SupernoteDevice").return_value
+    mock_dev.list_dir.return_value = ["draft_123.pdf"]
+    # The report comes from memory, never re-read from disk
+    read_text = mocker.spy(__import__("pathlib").Path, "read_text")
+
+    with runner.isolated_filesystem():
+        with open("draft.md", "w") as f: f.write("src")
+        result = runner.invoke(cli, ['done', 'draft', '--json'])
+
+    assert result.exit_code == 0
+    review = json.loads(result.stdout)["reviews"][0]
+    assert review["match"] == "exact"
+    assert review["pulled_from"].endswith("EXPORT/draft_123.pdf")
+    assert review["report"].startswith("# Review: draft.md")
+    assert {"connect", "list", "download", "reports", "annotations", "report"} <= set(review["timings"])
+    read_text.assert_not_called()
+
+def test_list_json_output(runner, temp_state_file):
+    import json
+    from sn import state
+    state.add_review("draft.md", "/ForReview/draft_123.pdf")
+
+    result = runner.invoke(cli, ['list', '--json'])
+
+    pending = json.loads(result.stdout)["pending"]
+    assert [p["device_path"] for p in pending] == ["/ForReview/draft_123.pdf"]
+
+def test_json_error_exit_code(runner, temp_state_file, mocker):
+    import json
+    mocker.patch("sn.workflow.retrieve_reviews", side_effect=RuntimeError("No ADB devices found."))
+
+    result = runner.invoke(cli, ['done', '--json'])
+
+    assert result.exit_code == 1
+    assert json.loads(result.stdout) == {"error": "No ADB devices found."}
+
+def test_review_several_files_needs_bundle(runner, temp_state_file):
+    with runner.isolated_filesystem():
+        for name in ("a.md", "b.md"):
+            open(name, "w").write("x")
+        result = runner.invoke(cli, ['review', 'a.md', 'b.md'])
+        assert result.exit_code == 2
+        assert "--bundle" in result.output
+
+def test_review_bundle_pushes_one_pdf(runner, temp_state_file, mocker):
+    ranges = [{"file": "a.md", "title": "a.md", "first_page": 2, "last_page": 3},
+              {"file": "b.md", "title": "b.md", "first_page": 4, "last_page": 4}]
+    render = mocker.patch("sn.workflow.render_bundle", return_value=(b"%PDF", None, ranges))
+    mock_dev = mocker.patch("sn.workflow.SupernoteDevice").return_value
+
+    with runner.isolated_filesystem():
+        for name in ("a.md", "b.md"):
+            open(name, "w").write("x")
+        result = runner.invoke(cli, ['review', '--bundle', '--name', 'chapters', 'a.md', 'b.md'])
+
+        assert result.exit_code == 0, result.output
+        assert [str(p) for p in render.call_args.args[0]] == ["a.md", "b.md"]
+        mock_dev.push.assert_called_once()
+        mock_dev.open_pdf.assert_called_once()
+        from sn import state
+        [(key, entry)] = state.get_pending_reviews().items()
+        assert key == "chapters"
+        assert entry["bundle"] == ranges
+
+def test_review_bundle_names_do_not_collide(runner, temp_state_file, mocker):
+    from sn import state
+    mocker.patch("sn.workflow.render_bundle",
+                 side_effect=lambda paths, **kw: (b"%PDF", None, [{"file": str(p)} for p in paths]))
+    mocker.patch("sn.workflow.SupernoteDevice")
+
+    with runner.isolated_filesystem():
+        for name in ("a.md", "b.md", "c.md"):
+            open(name, "w").write("x")
+        runner.invoke(cli, ['review', '--bundle', 'a.md', 'b.md'])
+        runner.invoke(cli, ['review', '--bundle', 'a.md', 'c.md'])
+
+        keys = sorted(state.get_pending_reviews())
+        assert len(keys) == 2 and all(k.startswith("a-bundle-") for k in keys)
+
+        # An explicit name already pending for other files is refused
+        runner.invoke(cli, ['review', '--bundle', '--name', 'chapters', 'a.md', 'b.md'])
+        result = runner.invoke(cli, ['review', '--bundle', '--name', 'chapters', 'b.md', 'c.md'])
+        assert "already named 'chapters'" in result.output
+        assert [s["file"] for s in state.get_pending_reviews()["chapters"]["bundle"]] == ["a.md", "b.md"]
+
+def test_review_bundle_uses_explicit_name_verbatim(runner, temp_state_file, mocker):
+    from sn import state
+    ranges = [{"file": "a.md", "title": "a.md", "first_page": 2, "last_page": 2},
+              {"file": "b.md", "title": "b.md", "first_page": 3, "last_page": 3}]
+    mocker.patch("sn.workflow.render_bundle", return_value=(b"%PDF", None, ranges))
+    mock_dev_cls = mocker.patch("sn.workflow.SupernoteDevice")
+    mocker.patch("sn.workflow.annotations.is_available", return_value=False)
+
+    with runner.isolated_filesystem():
+        for name in ("a.md", "b.md"):
+            open(name, "w").write("x")
+        result = runner.invoke(cli, ['review', '--bundle', '--name', 'v1.2 notes/', 'a.md', 'b.md'])
+
+        assert result.exit_code == 0, result.output
+        [(key, entry)] = state.get_pending_reviews().items()
+        assert key == "v1.2-notes"
+        pushed = entry["device_path"].rsplit("/", 1)[1]
+        assert pushed.startswith("v1.2-notes_") and pushed.endswith(".pdf")
+
+        # The export keeps the pushed name; done finds it and reports under the full name
+        exported = pushed.replace(".pdf", "_1.pdf")
+        mock_dev_cls.return_value.list_dir.return_value = [exported]
+        mock_dev_cls.return_value.pull.side_effect = lambda remote, local, **kw: open(local, "w").write("pdf")
+        result = runner.invoke(cli, ['done', 'v1.2-notes'])
+
+        assert result.exit_code == 0, result.output
+        assert f"Found alternative: {exported}" in result.output
+        assert os.path.exists("v1.2-notes-review.md")
+
+def test_done_splits_bundle_per_file(runner, temp_state_file, mocker):
+    from sn import state
+    from sn.annotations import PageAnnotations
+
+    mock_dev_cls = mocker.patch("sn.workflow.SupernoteDevice")
+    mock_dev_cls.return_value.list_dir.return_value = ["bundle_123.pdf"]
+    mocker.patch("sn.workflow.annotations.is_available", return_value=True)
+    mocker.patch("sn.workflow.annotations.detect_annotations", return_value=[
+        PageAnnotations(page=3, bboxes=[(10, 20, 110, 60)]),
+        PageAnnotations(page=5, bboxes=[(10, 20, 110, 60), (10, 80, 110, 90)]),
+    ])
+    mocker.patch("sn.workflow.snippets.render_snippets", return_value=[])
+
+    with runner.isolated_filesystem():
+        with open("bundle_123.pdf", "w") as f: f.write("pdf")
+        ranges = [{"file": "a.md", "title": "a.md", "first_page": 2, "last_page": 3},
+                  {"file": "b.md", "title": "b.md", "first_page": 4, "last_page": 6}]
+        state.add_review("bundle", "/storage/emulated/0/Document/PDFs/ForReview/bundle_123.pdf",
+                         "bundle_123.pdf", bundle=ranges)
+
+        result = runner.invoke(cli, ['done', 'bundle', '--json'])
+
+        assert result.exit_code == 0, result.output
+        import json
+        [review] = json.loads(result.stdout)["reviews"]
+        assert [(f["file"], [p["page"] for p in f["annotated_pages"]]) for f in review["files"]] == [
+            ("a.md", [3]), ("b.md", [5])]
+        assert "- Page 5: 2 region(s)" in open("b-review.md").read()
+        assert "Page 3" not in open("b-review.md").read()
+        assert "[b.md](b-review.md): pages 4–6, 1 annotated" in review["report"]
+
+def test_review_since_last_sends_only_changes(runner, temp_state_file, mocker):
+    from sn import state
+    mocker.patch("sn.workflow.render_pdf", return_value=(b"%PDF full", None))
+    render_changes = mocker.patch("sn.workflow.render_changes", return_value=(b"%PDF changes", []))
+    mock_dev = mocker.patch("sn.workflow.SupernoteDevice").return_value
+
+    with runner.isolated_filesystem():
+        text = "# Spec\n\n" + "\n\n".join(f"Paragraph {i}." for i in range(50)) + "\n"
+        open("spec.md", "w").write(text)
+        assert runner.invoke(cli, ['review', 'spec.md']).exit_code == 0
+        state.mark_completed("spec.md")
+
+        open("spec.md", "w").write(text.replace("Paragraph 30.", "Paragraph thirty."))
+        result = runner.invoke(cli, ['review', '--since-last', 'spec.md'])
+
+        assert result.exit_code == 0, result.output
+        markdown = render_changes.call_args.args[0]
+        assert "Paragraph thirty." in markdown and "Paragraph 10." not in markdown
+        assert mock_dev.push.call_args.args[0] == b"%PDF changes"
+        entry = state.get_pending_reviews()["spec.md"]
+        assert entry["changes"] is True
+        assert entry["baseline_hash"] != entry["content_hash"]
+
+        # Nothing new since the completed review: nothing to send
+        state.mark_completed("spec.md")
+        result = runner.invoke(cli, ['review', '--since-last', 'spec.md'])
+        assert "has not changed since its last completed review" in result.output
+
+def test_review_rerenders_for_a_different_device(runner, temp_state_file, mocker):
+    from sn import artifacts, state
+    render = mocker.patch("sn.workflow.render_pdf",
+                          side_effect=lambda path, profile=None, **kw: (f"%PDF {profile}".encode(), None))
+    mock_dev = mocker.patch("sn.workflow.SupernoteDevice").return_value
+    mock_dev.model.return_value = "A6X2"
+
+    with runner.isolated_filesystem():
+        open("draft.md", "w").write("content")
+        result = runner.invoke(cli, ['review', 'draft.md'])
+
+        assert result.exit_code == 0, result.output
+        # First render guessed (nothing remembered), then the Nomad layout
+        assert [c.kwargs["profile"] and c.kwargs["profile"].name for c in render.call_args_list] == [None, "nomad"]
+        entry = state.get_pending_reviews()["draft.md"]
+        assert entry["profile"] == "nomad"
+        # Only the PDF that was pushed is stored
+        stored = list(artifacts.STORE_DIR.rglob("*.pdf"))
+        assert [os.path.abspath(p) for p in stored] == [os.path.abspath(entry["local_pdf"])]
+        assert stored[0].read_bytes() == mock_dev.push.call_args.args[0]
+
+        # The tablet is remembered: the next review renders once
+        render.reset_mock()
+        assert runner.invoke(cli, ['review', 'draft.md']).exit_code == 0
+        assert render.call_count == 1
+
+def test_render_command_writes_pdf_per_profile(runner, mocker):
+    mocker.patch("sn.main.render_profiles", return_value={"a6x": (b"a", None), "manta": (b"m", None)})
+
+    with runner.isolated_filesystem():
+        open("doc.md", "w").write("# Doc")
+        result = runner.invoke(cli, ['render', 'doc.md', '--device-profile', 'a6x', '--device-profile', 'manta'])
+
+        assert result.exit_code == 0, result.output
+        assert open("doc.a6x.pdf", "rb").read() == b"a"
+        assert open("doc.manta.pdf", "rb").read() == b"m"
+
+def test_review_and_done_keep_artifacts_out_of_the_source_dir(runner, temp_state_file, mocker):
+    from sn import artifacts, state
+    mocker.patch("sn.workflow.render_pdf", return_value=(b"%PDF render", None))
+    mock_dev = mocker.patch("sn.workflow.SupernoteDevice").return_value
+    mock_dev.pull.side_effect = lambda remote, local, **kw: open(local, "wb").write(b"%PDF export")
+
+    with runner.isolated_filesystem():
+        open("draft.md", "w").write("content")
+        assert runner.invoke(cli, ['review', 'draft.md']).exit_code == 0
+        entry = state.get_pending_reviews()["draft.md"]
+        mock_dev.list_dir.return_value = [entry["device_path"].rsplit("/", 1)[1]]
+
+        result = runner.invoke(cli, ['done', 'draft', '--json'])
+
+        assert result.exit_code == 0, result.output
+        assert sorted(os.listdir(".")) == ["draft-review.md", "draft.md"]
+        import json
+        [review] = json.loads(result.stdout)["reviews"]
+        store = str(artifacts.STORE_DIR)
+        assert review["reviewed_path"].startswith(store)
+        assert open(review["reviewed_path"], "rb").read() == b"%PDF export"
+        assert os.path.relpath(review["reviewed_path"]) in review["report"]
+
+def test_done_ocr_writes_recognised_text(runner, temp_state_file, mocker):
+    from sn import state
+    from sn.annotations import PageAnnotations
+
+    mocker.patch("sn.workflow.SupernoteDevice").return_value.list_dir.return_value = ["draft_123.pdf"]
+    mocker.patch("sn.workflow.annotations.is_available", return_value=True)
+    mocker.patch("sn.workflow.annotations.detect_annotations",
+                 return_value=[PageAnnotations(page=1, bboxes=[(10, 20, 110, 60)])])
+    mocker.patch("sn.workflow.snippets.render_snippets", return_value=[])
+    mocker.patch("sn.workflow.ocr_mod.is_available", return_value=True)
+
+    def read(original, annotated, pages):
+        pages[0].text = ["tighten this"]
+        return 0
+    read_regions = mocker.patch("sn.workflow.ocr_mod.read_regions", side_effect=read)
+
+    with runner.isolated_filesystem():
+        with open("draft_123.pdf", "w") as f: f.write("pdf")
+        state.add_review("draft.md", "/storage/emulated/0/Document/PDFs/ForReview/draft_123.pdf", "draft_123.pdf")
+
+        result = runner.invoke(cli, ['done', 'draft', '--ocr'])
+
+        assert result.exit_code == 0, result.output
+        assert '- Region 1 on page 1 reads: "tighten this"' in result.output
+        assert read_regions.call_args.args[0].endswith("draft_123.pdf")
+        assert state.load_state()["reviews"]["draft.md"]["annotated_pages"][0]["text"] == ["tighten this"]
@@ -1,4 +1,5 @@
 import os
+import pytest
 from pathlib import Path
 from sn.converter import convert_to_pdf, get_pdf_name
 
@@ -29,3 +30,57 @@ def test_convert_to_pdf_creation(tmp_path):
              pytest.skip(f"Skipping PDF generation test due to config issues: {e}")
         else:
             raise e
+
+def test_stylesheet_parsed_once():
+    from sn.converter import get_stylesheet
+    assert get_stylesheet() is get_stylesheet()
+
+def test_render_bundle_sections_and_page_ranges(tmp_path, mocker):
+    from types import SimpleNamespace
+    from sn import converter
+
+    paths = []
+    for name in ("a.md", "b.md", "c.md"):
+        (tmp_path / name).write_text(f"# {name}")
+        paths.append(tmp_path / name)
+    convert = mocker.patch("sn.converter.pypandoc.convert_file",
+                           side_effect=lambda path, *a, **kw: f"<p>{Path(path).name}</p>")
+    # Contents on page 1; a.md on 2-3, b.md on 4, c.md on 5-6
+    anchors = [{}, {"sn-doc-1": (0, 0)}, {}, {"sn-doc-2": (0, 0)}, {"sn-doc-3": (0, 0)}, {}]
+    document = SimpleNamespace(pages=[SimpleNamespace(anchors=a) for a in anchors],
+                               write_pdf=lambda: b"%PDF")
+    html = mocker.patch("sn.converter.HTML")
+    html.return_value.render.return_value = document
+    mocker.patch("sn.converter.sourcemap.build", return_value=[])
+
+    pdf, entries, ranges = converter.render_bundle(paths)
+
+    assert pdf == b"%PDF"
+    markup = html.call_args.kwargs["string"]
+    assert markup.index('href="#sn-doc-1"') < markup.index('id="sn-doc-1"') < markup.index('id="sn-doc-2"')
+    assert {c.kwargs["extra_args"][0] for c in convert.call_args_list} == {
+        "--id-prefix=d1-", "--id-prefix=d2-", "--id-prefix=d3-"}
+    assert [(r["title"], r["first_page"], r["last_page"]) for r in ranges] == [
+        ("a.md", 2, 3), ("b.md", 4, 4), ("c.md", 5, 6)]
+
+def test_render_profiles_parses_once_and_lays_out_per_profile(tmp_path, mocker):
+    from types import SimpleNamespace
+    from sn import converter, profiles
+
+    source = tmp_path / "doc.md"
+    source.write_text("# Doc")
+    pandoc = mocker.patch("sn.converter.pypandoc.convert_file", return_value="<h1>Doc</h1>")
+    html = mocker.patch("sn.converter.HTML")
+
+    def render(stylesheets):
+        return SimpleNamespace(pages=[1], write_pdf=lambda: f"pdf:{len(stylesheets)}".encode())
+    html.return_value.render.side_effect = render
+
+    targets = [profiles.get("a5x"), profiles.get("nomad")]
+    results = converter.render_profiles(source, targets)
+
+    assert set(results) == {"a5x", "nomad"}
+    pandoc.assert_called_once()
+    html.assert_called_once()
+    assert html.return_value.render.call_count == 2
+    assert results["nomad"] == (b"pdf:2", None)
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from sn import api, daemon
+
+
+@pytest.fixture
+def server(tmp_path):
+    srv = daemon.DaemonServer(tmp_path / "sn.sock")
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_call_returns_result_and_replays_output(server, mocker):
+    def fake_review(file_path, echo, **kwargs):
+        echo("Pushing file...")
+        echo("slow link", err=True)
+        return api.ReviewRequest(file_path, "a.pdf", "/ForReview/a.pdf", 10, "dev")
+
+    mocker.patch("sn.api.request_review", side_effect=fake_review)
+    lines = []
+
+    result = daemon.DaemonClient(server.path).call(
+        "request_review", echo=lambda m="", err=False: lines.append((m, err)), file_path="a.md")
+
+    assert result["remote_path"] == "/ForReview/a.pdf"
+    assert lines == [("Pushing file...", False), ("slow link", True)]
+
+
+def test_errors_raise_daemon_error(server, mocker):
+    mocker.patch("sn.api.retrieve_review", side_effect=RuntimeError("No ADB devices found."))
+    client = daemon.DaemonClient(server.path)
+
+    with pytest.raises(daemon.DaemonError, match="No ADB devices"):
+        client.call("retrieve_review")
+    with pytest.raises(daemon.DaemonError) as e:
+        client.call("request_review", bogus=1)
+    assert e.value.code == daemon.INVALID_PARAMS
+    with pytest.raises(daemon.DaemonError) as e:
+        client.call("format_disk")
+    assert e.value.code == daemon.METHOD_NOT_FOUND
+
+
+def test_stale_socket_is_replaced(tmp_path):
+    path = tmp_path / "sn.sock"
+    path.write_text("")
+    assert not daemon.is_running(path)
+
+    srv = daemon.DaemonServer(path)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    try:
+        assert daemon.is_running(path)
+        with pytest.raises(RuntimeError):
+            daemon.DaemonServer(path)
+    finally:
+        srv.shutdown()
+        srv.server_close()
+    assert not path.exists()
+
+
+def test_cli_forwards_to_daemon(server, mocker, monkeypatch):
+    from click.testing import CliRunner
+    from sn.main import cli
+    monkeypatch.setattr(daemon, "SOCKET_PATH", server.path)
+    mocker.patch("sn.api.list_pending", return_value=[
+        api.PendingReview("spec.md", "spec.md", "/ForReview/spec_1.pdf", "2026-01-01T10:00:00")])
+    local = mocker.patch("sn.workflow.list_pending")
+
+    result = CliRunner().invoke(cli, ["list"])
+
+    assert "- spec.md (Out since: 2026-01-01T10:00:00)" in result.output
+    local.assert_not_called()
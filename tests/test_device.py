@@ -1,5 +1,5 @@
 import pytest
-from sn.device import SupernoteDevice
+from sn.device import SupernoteDevice, DeviceSession
 
 def test_device_init(mock_adb_client):
     dev = SupernoteDevice()
@@ -53,4 +53,107 @@ def test_wireless_preference(mocker):
     
     dev = SupernoteDevice()
     # Should pick the wifi one
-    assert dev.device.serial == "192.168.1.10:5555"
\ No newline at end of file
+    assert dev.device.serial == "192.168.1.10:5555"
+def test_session_reuses_healthy_connection(mocker):
+    device = mocker.Mock()
+    device.is_alive.return_value = True
+    factory = mocker.Mock(return_value=device)
+    session = DeviceSession(check_interval=0, factory=factory)
+
+    assert session.get() is device
+    assert session.get() is device
+    assert factory.call_count == 1
+    assert device.is_alive.call_count == 1
+
+def test_session_reconnects_after_failed_health_check(mocker):
+    stale, fresh = mocker.Mock(), mocker.Mock()
+    stale.is_alive.return_value = False
+    factory = mocker.Mock(side_effect=[stale, fresh])
+    session = DeviceSession(check_interval=0, factory=factory)
+
+    assert session.get() is stale
+    assert session.get() is fresh
+
+def test_session_skips_checks_within_interval(mocker):
+    device = mocker.Mock()
+    session = DeviceSession(check_interval=60, factory=mocker.Mock(return_value=device))
+
+    session.get()
+    session.get()
+
+    assert not device.is_alive.called
+
+def test_is_alive(mock_adb_client, mock_device_instance):
+    dev = SupernoteDevice()
+    mock_device_instance.shell.return_value = "ok\n"
+    assert dev.is_alive()
+    mock_device_instance.shell.side_effect = RuntimeError("closed")
+    assert not dev.is_alive()
+
+def test_pull_streams_with_progress(mock_adb_client, mock_device_instance, tmp_path):
+    dev = SupernoteDevice()
+    mock_device_instance.sync.stat.return_value.size = 6
+    mock_device_instance.sync.iter_content.return_value = iter([b"abc", b"def"])
+    seen = []
+
+    dev.pull("/remote.pdf", str(tmp_path / "out.pdf"), on_chunk=lambda d, t: seen.append((d, t)))
+
+    assert (tmp_path / "out.pdf").read_bytes() == b"abcdef"
+    assert seen == [(3, 6), (6, 6)]
+
+def test_cancelled_pull_removes_partial_file(mock_adb_client, mock_device_instance, tmp_path):
+    dev = SupernoteDevice()
+    mock_device_instance.sync.stat.return_value.size = 6
+    mock_device_instance.sync.iter_content.return_value = iter([b"abc", b"def"])
+
+    def abort(done, total):
+        raise RuntimeError("cancelled")
+
+    with pytest.raises(RuntimeError):
+        dev.pull("/remote.pdf", str(tmp_path / "out.pdf"), on_chunk=abort)
+    assert not (tmp_path / "out.pdf").exists()
+
+def test_cancelled_push_removes_remote_file(mock_adb_client, mock_device_instance, tmp_path):
+    dev = SupernoteDevice()
+    local = tmp_path / "in.pdf"
+    local.write_bytes(b"x" * 10)
+
+    def fake_push(src, dst):
+        src.read(4096)
+
+    mock_device_instance.sync.push.side_effect = fake_push
+
+    def abort(done, total):
+        raise RuntimeError("cancelled")
+
+    with pytest.raises(RuntimeError):
+        dev.push(str(local), "/storage/emulated/0/my notes; x.pdf", on_chunk=abort)
+    mock_device_instance.shell.assert_called_with("rm -f '/storage/emulated/0/my notes; x.pdf'")
+
+def test_push_bytes_with_progress(mock_adb_client, mock_device_instance):
+    dev = SupernoteDevice()
+    seen = []
+    sent = []
+    mock_device_instance.sync.push.side_effect = lambda src, remote: sent.append(src.read(4096))
+
+    dev.push(b"%PDF-1.7 data", "/storage/emulated/0/Document/a.pdf", on_chunk=lambda d, t: seen.append((d, t)))
+
+    assert sent == [b"%PDF-1.7 data"]
+    assert seen == [(13, 13)]
+
+def test_ensure_dir_runs_once_per_connection(mock_adb_client, mock_device_instance):
+    dev = SupernoteDevice()
+
+    dev.ensure_dir("/storage/emulated/0/Document")
+    dev.push("a.pdf", "/storage/emulated/0/Document/a.pdf")
+
+    mkdirs = [c for c in mock_device_instance.shell.call_args_list if c.args[0].startswith("mkdir")]
+    assert len(mkdirs) == 1
+
+def test_model_read_once_per_connection(mock_adb_client, mock_device_instance):
+    mock_device_instance.getprop.return_value = "A5X2\n"
+    dev = SupernoteDevice()
+
+    assert dev.model() == "A5X2"
+    assert dev.model() == "A5X2"
+    mock_device_instance.getprop.assert_called_once_with("ro.product.model")
@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta
+
+from sn import gc, state
+from sn.device import rm_commands
+
+FOR_REVIEW = "/storage/emulated/0/Document/PDFs/ForReview"
+EXPORT = "/storage/emulated/0/EXPORT/"
+NOW = datetime(2026, 3, 1, 12, 0, 0)
+
+
+def _reviews():
+    return {
+        "spec.md": {"device_path": f"{FOR_REVIEW}/spec_20260201_100000.pdf", "status": "completed",
+                    "pulled_from": f"{EXPORT}spec_20260201_100000.pdf"},
+        "draft.md": {"device_path": f"{FOR_REVIEW}/draft_20260228_100000.pdf", "status": "pending"},
+    }
+
+
+def _files():
+    return gc.classify(
+        FOR_REVIEW,
+        ["spec_20260101_090000.pdf", "spec_20260201_100000.pdf", "spec_20260201_100000.pdf.mark",
+         "draft_20260210_100000.pdf", "draft_20260228_100000.pdf", "manual.pdf"],
+        EXPORT,
+        ["spec_20260201_100000.pdf", "draft_20260227_090000.pdf", "draft_20260228_110000.pdf", "notes.pdf"],
+        _reviews(),
+    )
+
+
+def test_classify_ties_files_to_reviews():
+    status = {f.path.rsplit("/", 1)[1] + ("@x" if f.folder == "export" else ""): f.status for f in _files()}
+    assert status == {
+        "spec_20260101_090000.pdf": "superseded",
+        "spec_20260201_100000.pdf": "completed",
+        "spec_20260201_100000.pdf.mark": "completed",
+        "draft_20260210_100000.pdf": "superseded",
+        "draft_20260228_100000.pdf": "pending",
+        "manual.pdf": "untracked",
+        "spec_20260201_100000.pdf@x": "completed",
+        "draft_20260227_090000.pdf@x": "superseded",
+        # May be the answer to the pending review: never deleted
+        "draft_20260228_110000.pdf@x": "pending",
+        "notes.pdf@x": "untracked",
+    }
+
+
+def test_plan_never_touches_pending_or_untracked():
+    doomed = {f.path for f in gc.plan(_files(), now=NOW)}
+    assert f"{FOR_REVIEW}/draft_20260228_100000.pdf" not in doomed
+    assert f"{EXPORT}draft_20260228_110000.pdf" not in doomed
+    assert f"{FOR_REVIEW}/manual.pdf" not in doomed
+    assert f"{EXPORT}notes.pdf" not in doomed
+    assert f"{FOR_REVIEW}/spec_20260201_100000.pdf.mark" in doomed
+
+
+def test_plan_keeps_unretrieved_files_by_default():
+    doomed = {f.path for f in gc.plan(_files(), now=NOW)}
+    # Earlier pushes may carry handwriting nobody pulled back
+    assert f"{FOR_REVIEW}/spec_20260101_090000.pdf" not in doomed
+    assert f"{FOR_REVIEW}/draft_20260210_100000.pdf" not in doomed
+    assert f"{EXPORT}draft_20260227_090000.pdf" not in doomed
+    assert all(f.status == "completed" for f in gc.plan(_files(), now=NOW))
+
+    doomed = {f.path for f in gc.plan(_files(), include_unretrieved=True, now=NOW)}
+    assert f"{FOR_REVIEW}/spec_20260101_090000.pdf" in doomed
+    assert f"{EXPORT}draft_20260227_090000.pdf" in doomed
+
+
+def test_plan_keep_last_and_age():
+    keep_one = {f.path for f in gc.plan(_files(), keep_last=1, include_unretrieved=True, now=NOW)}
+    # The newest spec push (and its sidecar) survives; the older one goes
+    assert keep_one >= {f"{FOR_REVIEW}/spec_20260101_090000.pdf", f"{FOR_REVIEW}/draft_20260210_100000.pdf"}
+    assert f"{FOR_REVIEW}/spec_20260201_100000.pdf" not in keep_one
+    assert f"{FOR_REVIEW}/spec_20260201_100000.pdf.mark" not in keep_one
+
+    old = {f.path for f in gc.plan(_files(), older_than=timedelta(days=40), include_unretrieved=True, now=NOW)}
+    assert old == {f"{FOR_REVIEW}/spec_20260101_090000.pdf"}
+
+
+def test_collect_deletes_in_one_batch_and_updates_state(temp_state_file, mocker):
+    state.save_state({"reviews": _reviews()})
+    device = mocker.Mock()
+    device.list_dir.side_effect = lambda d: (
+        ["spec_20260201_100000.pdf", "draft_20260228_100000.pdf"] if d == FOR_REVIEW
+        else ["spec_20260201_100000.pdf"]
+    )
+
+    doomed = gc.collect(device, FOR_REVIEW, EXPORT, now=NOW)
+
+    device.remove.assert_called_once_with([f.path for f in doomed])
+    assert len(doomed) == 2
+    entry = state.load_state()["reviews"]["spec.md"]
+    assert "device_removed_at" in entry and "export_removed_at" in entry
+    assert "device_removed_at" not in state.load_state()["reviews"]["draft.md"]
+
+
+def test_dry_run_changes_nothing(temp_state_file, mocker):
+    state.save_state({"reviews": _reviews()})
+    device = mocker.Mock()
+    device.list_dir.return_value = ["spec_20260201_100000.pdf"]
+
+    assert gc.collect(device, FOR_REVIEW, EXPORT, dry_run=True, now=NOW)
+    device.remove.assert_not_called()
+    assert "device_removed_at" not in state.load_state()["reviews"]["spec.md"]
+
+
+def test_rm_commands_quote_and_split():
+    assert rm_commands(["/a b.pdf", "/c.pdf"]) == ["rm -f '/a b.pdf' /c.pdf"]
+    assert rm_commands([f"/{i:03}.pdf" for i in range(10)], max_bytes=41) == [
+        "rm -f /000.pdf /001.pdf /002.pdf /003.pdf",
+        "rm -f /004.pdf /005.pdf /006.pdf /007.pdf",
+        "rm -f /008.pdf /009.pdf",
+    ]
+
+
+def test_retrieved_earlier_pushes_are_collected_by_default(temp_state_file, mocker):
+    pushes = [f"spec_202602{day}_100000.pdf" for day in ("01", "10", "20")]
+    state.add_review("spec.md", f"{FOR_REVIEW}/{pushes[0]}")
+    state.add_review("spec.md", f"{FOR_REVIEW}/{pushes[1]}")  # replaced before it was retrieved
+    state.add_review("spec.md", f"{FOR_REVIEW}/{pushes[2]}")
+    # Retrieve the latest, then push and retrieve once more
+    state.mark_completed_many(["spec.md"], {"spec.md": {"pulled_from": f"{EXPORT}{pushes[2]}"}})
+    state.add_review("spec.md", f"{FOR_REVIEW}/spec_20260225_100000.pdf")
+    state.mark_completed_many(["spec.md"], {"spec.md": {"pulled_from": f"{EXPORT}spec_20260225_100000.pdf"}})
+    pushes.append("spec_20260225_100000.pdf")
+    history = state.load_state()["reviews"]["spec.md"]["history"]
+    assert [h["status"] for h in history] == ["pending", "pending", "completed"]
+
+    device = mocker.Mock()
+    device.list_dir.side_effect = lambda d: pushes if d == FOR_REVIEW else pushes[2:]
+    doomed = gc.collect(device, FOR_REVIEW, EXPORT, keep_last=1, now=NOW)
+
+    # The retrieved third push and its export go; the unretrieved ones wait for --include-unretrieved
+    assert {f.path for f in doomed} == {f"{FOR_REVIEW}/{pushes[2]}", f"{EXPORT}{pushes[2]}"}
+    history = state.load_state()["reviews"]["spec.md"]["history"]
+    assert [h["device_path"] for h in history] == [f"{FOR_REVIEW}/{p}" for p in pushes[:2]]
+
+    device.list_dir.side_effect = lambda d: pushes[:2] + pushes[3:] if d == FOR_REVIEW else pushes[3:]
+    doomed = gc.collect(device, FOR_REVIEW, EXPORT, keep_last=1, include_unretrieved=True, now=NOW)
+    assert {f.path for f in doomed} == {f"{FOR_REVIEW}/{p}" for p in pushes[:2]}
+    assert state.load_state()["reviews"]["spec.md"]["history"] == []
@@ -0,0 +1,125 @@
+import json
+import struct
+from pathlib import Path
+import pytest
+from sn import markfile
+from sn.markfile import parse, decode_rle_runs, bitmap_bboxes, to_pdf_points, MarkFormatError
+
+
+class MarkBuilder:
+    """Assembles a .mark file from metadata and binary blocks."""
+
+    def __init__(self, equipment="N6"):
+        self.buf = bytearray(b"markSN_FILE_VER_20230015")
+        self.header = self.block(self.meta({"FILE_TYPE": "MARK", "APPLY_EQUIPMENT": equipment}))
+
+    def block(self, payload):
+        addr = len(self.buf)
+        self.buf += struct.pack("<I", len(payload)) + payload
+        return addr
+
+    @staticmethod
+    def meta(items):
+        return "".join(f"<{k}:{v}>" for k, v in items.items()).encode()
+
+    @staticmethod
+    def totalpath(strokes):
+        out = struct.pack("<I", len(strokes))
+        for points in strokes:
+            record = struct.pack("<4I", 1, 0, 400, len(points))
+            record += b"".join(struct.pack("<2I", x, y) for x, y in points)
+            record += b"\x00" * 12  # trailing fields the parser skips
+            out += struct.pack("<I", len(record)) + record
+        return out
+
+    def build(self, pages):
+        footer = {"FILE_FEATURE": self.header}
+        for n, page_meta in pages.items():
+            footer[f"PAGE{n}"] = self.block(self.meta(page_meta))
+        footer_addr = self.block(self.meta(footer))
+        return bytes(self.buf + struct.pack("<I", footer_addr))
+
+
+def test_parse_vector_strokes():
+    b = MarkBuilder()
+    paths = b.block(MarkBuilder.totalpath([[(100, 200), (180, 240)], [(150, 230), (300, 260)], [(50, 1500), (60, 1510)]]))
+    data = b.build({1: {"TOTALPATH": 0}, 2: {"TOTALPATH": paths}})
+
+    mark = parse(data)
+
+    assert mark.version == "SN_FILE_VER_20230015"
+    assert mark.screen == (1404, 1872)
+    assert [p.page for p in mark.annotated_pages()] == [2]
+    page = mark.pages[1]
+    assert page.strokes[0].points == [(100, 200), (180, 240)]
+    # Nearby strokes merge; the distant one stays separate
+    assert page.bboxes == [(100, 200, 301, 261), (50, 1500, 61, 1511)]
+
+
+def test_parse_bitmap_fallback():
+    width = 1920
+    # 10 blank rows, then ink at x=5..9 on two consecutive rows, then blank
+    runs = [(0x62, 10 * width + 5), (0x61, 5), (0x62, width - 5), (0x61, 5), (0x62, 1000)]
+    b = MarkBuilder(equipment="N5")
+    bitmap = b.block(_encode_rle(runs))
+    layer = b.block(MarkBuilder.meta({"LAYERPROTOCOL": "RATTA_RLE", "LAYERBITMAP": bitmap}))
+    data = b.build({1: {"MAINLAYER": layer, "TOTALPATH": 0}})
+
+    mark = parse(data)
+
+    assert mark.screen == (1920, 2560)
+    assert mark.pages[0].bboxes == [(5, 10, 10, 12)]
+
+
+def _encode_rle(runs):
+    """Encodes runs as short (<=128 pixel) pairs, which the decoder must accept."""
+    out = bytearray()
+    for color, length in runs:
+        while length > 0:
+            chunk = min(length, 128)
+            out += bytes([color, chunk - 1])
+            length -= chunk
+    return bytes(out)
+
+
+def test_decode_rle_long_runs():
+    assert decode_rle_runs(bytes([0x62, 0x83, 0x62, 0x05])) == [(0x62, 1 + 5 + 512)]
+    assert decode_rle_runs(bytes([0x62, 0x81, 0x61, 0x00])) == [(0x62, 256), (0x61, 1)]
+    assert decode_rle_runs(bytes([0x62, 0xFF])) == [(0x62, 0x4000)]
+
+
+def test_bitmap_bboxes_spanning_rows():
+    # One run covering the end of row 0 and start of row 1
+    assert bitmap_bboxes([(0x62, 8), (0x61, 4)], width=10) == [(0, 0, 10, 2)]
+
+
+def test_rejects_non_mark_data():
+    with pytest.raises(MarkFormatError):
+        parse(b"%PDF-1.7 not a mark file")
+
+
+def test_to_pdf_points():
+    # Same aspect ratio as the panel: the page fills it
+    assert to_pdf_points((0, 0, 1404, 936), (1404, 1872), (702, 936)) == (0.0, 0.0, 702.0, 468.0)
+    # A5 is taller than the panel: fitted to height and centred with side margins
+    scale = 1872 / markfile.A5_POINTS[1]
+    margin = (1404 - markfile.A5_POINTS[0] * scale) / 2
+    assert to_pdf_points((margin, 0, margin + 100 * scale, 936), (1404, 1872), markfile.A5_POINTS) == (
+        0.0, 0.0, 100.0, round(936 / scale, 1))
+    # Ink in the side margin is clamped to the page
+    assert to_pdf_points((0, 0, 1404, 10), (1404, 1872), markfile.A5_POINTS)[::2] == (0.0, 419.5)
+
+
+SAMPLES = Path(__file__).parent / "fixtures" / "marks"
+
+
+@pytest.mark.parametrize("sample", sorted(SAMPLES.glob("*.mark")) or [
+    pytest.param(None, marks=pytest.mark.skip(reason="no device samples in tests/fixtures/marks"))
+])
+def test_device_samples(sample):
+    expected = json.loads(sample.with_name(sample.name[:-len(".mark")] + ".json").read_text())
+
+    mark = markfile.parse_file(sample)
+
+    assert mark.equipment == expected["equipment"]
+    assert {str(p.page): len(p.strokes) for p in mark.pages if p.strokes} == expected["strokes"]
@@ -1,20 +1,22 @@
+import asyncio
+import threading
+import time
 import pytest
-import subprocess
-from unittest.mock import MagicMock
 from mcp.types import TextContent
 from sn.mcp_server import list_tools, sn_review, sn_done, sn_list
 
 
 @pytest.mark.anyio
 async def test_list_tools():
-    """Verify list_tools returns 3 tools with correct names."""
+    """Verify list_tools returns the Supernote tools with correct names."""
     tools = await list_tools()
 
-    assert len(tools) == 3
+    assert len(tools) == 4
     tool_names = [tool.name for tool in tools]
     assert "sn_review" in tool_names
     assert "sn_done" in tool_names
     assert "sn_list" in tool_names
+    assert "sn_wait_for_review" in tool_names
 
     # Verify sn_review tool schema
     sn_review_tool = next(t for t in tools if t.name == "sn_review")
@@ -30,350 +32,411 @@ async def test_list_tools():
     assert sn_list_tool.inputSchema["properties"] == {}
 
 
+@pytest.fixture
+def md_file(tmp_path):
+    path = tmp_path / "test.md"
+    path.write_text("# Test")
+    return str(path)
+
+
 @pytest.mark.anyio
-async def test_sn_review_success(mocker):
-    """Mock subprocess.run to return success, verify correct args passed."""
-    mock_result = MagicMock()
-    mock_result.returncode = 0
-    mock_result.stdout = "Review sent successfully."
-    mock_result.stderr = ""
-
-    mock_run = mocker.patch("subprocess.run", return_value=mock_result)
-
-    result = await sn_review("/path/to/test.md")
-
-    # Verify subprocess.run was called with correct arguments
-    mock_run.assert_called_once_with(
-        ["sn-review", "review", "/path/to/test.md"],
-        capture_output=True,
-        text=True,
-        timeout=60,
-    )
-
-    # Verify return value
+async def test_sn_review_success(mocker, md_file):
+    """Runs the review workflow in-process and returns its progress output."""
+    def fake_review(file_path, echo, **kwargs):
+        echo("Success! Document is open for review.")
+        return {}
+
+    mock_review = mocker.patch("sn.workflow.request_review", side_effect=fake_review)
+
+    result = await sn_review(md_file)
+
+    assert mock_review.call_args.args[0] == md_file
     assert len(result) == 1
     assert isinstance(result[0], TextContent)
     assert result[0].type == "text"
-    assert "Review sent successfully." in result[0].text
+    assert "Document is open for review." in result[0].text
 
 
 @pytest.mark.anyio
-async def test_sn_review_success_with_stderr(mocker):
-    """Test that stderr info is appended when present along with success."""
-    mock_result = MagicMock()
-    mock_result.returncode = 0
-    mock_result.stdout = "Review sent successfully."
-    mock_result.stderr = "Warning: Some deprecation notice"
+async def test_sn_review_success_with_stderr(mocker, md_file):
+    """Messages echoed to stderr are appended as additional info."""
+    def fake_review(file_path, echo, **kwargs):
+        echo("Review sent successfully.")
+        echo("Warning: Some deprecation notice", err=True)
 
-    mocker.patch("subprocess.run", return_value=mock_result)
+    mocker.patch("sn.workflow.request_review", side_effect=fake_review)
 
-    result = await sn_review("/path/to/test.md")
+    result = await sn_review(md_file)
 
-    assert len(result) == 1
     assert "Review sent successfully." in result[0].text
     assert "Additional info:" in result[0].text
     assert "Warning: Some deprecation notice" in result[0].text
 
 
 @pytest.mark.anyio
-async def test_sn_review_empty_stdout(mocker):
-    """Test default message when stdout is empty."""
-    mock_result = MagicMock()
-    mock_result.returncode = 0
-    mock_result.stdout = ""
-    mock_result.stderr = ""
-
-    mocker.patch("subprocess.run", return_value=mock_result)
+async def test_sn_review_empty_output(mocker, md_file):
+    """Test default message when the workflow reports nothing."""
+    mocker.patch("sn.workflow.request_review", return_value={})
 
-    result = await sn_review("/path/to/test.md")
+    result = await sn_review(md_file)
 
-    assert len(result) == 1
     assert "Review successfully sent to device." in result[0].text
 
 
 @pytest.mark.anyio
-async def test_sn_done_with_pattern(mocker):
-    """Mock subprocess, call with file_pattern, verify pattern is passed to command."""
-    mock_result = MagicMock()
-    mock_result.returncode = 0
-    mock_result.stdout = "Review retrieved."
-    mock_result.stderr = ""
+async def test_sn_review_missing_file(mocker):
+    mock_review = mocker.patch("sn.workflow.request_review")
 
-    mock_run = mocker.patch("subprocess.run", return_value=mock_result)
+    result = await sn_review("/path/to/missing.md")
 
-    result = await sn_done("draft")
+    assert not mock_review.called
+    assert "file not found" in result[0].text
 
-    # Verify subprocess.run was called with pattern argument
-    mock_run.assert_called_once_with(
-        ["sn-review", "done", "draft"],
-        capture_output=True,
-        text=True,
-        timeout=60,
-    )
 
-    # Verify return value
-    assert len(result) == 1
-    assert isinstance(result[0], TextContent)
-    assert "Review retrieved." in result[0].text
+@pytest.mark.anyio
+async def test_sn_review_error(mocker, md_file):
+    """Workflow exceptions become an error message including progress so far."""
+    def failing_review(file_path, echo, **kwargs):
+        echo("[2/3] Connecting to Supernote...")
+        raise Exception("No ADB devices found.")
 
+    mocker.patch("sn.workflow.request_review", side_effect=failing_review)
 
-@pytest.mark.anyio
-async def test_sn_done_without_pattern(mocker):
-    """Mock subprocess, call without pattern, verify command has no extra arg."""
-    mock_result = MagicMock()
-    mock_result.returncode = 0
-    mock_result.stdout = "All reviews retrieved."
-    mock_result.stderr = ""
+    result = await sn_review(md_file)
 
-    mock_run = mocker.patch("subprocess.run", return_value=mock_result)
+    assert "Error sending review: No ADB devices found." in result[0].text
+    assert "Connecting to Supernote" in result[0].text
 
-    # Call with empty string (default)
-    result = await sn_done("")
 
-    # Verify subprocess.run was called without pattern argument
-    mock_run.assert_called_once_with(
-        ["sn-review", "done"],
-        capture_output=True,
-        text=True,
-        timeout=60,
-    )
+@pytest.mark.anyio
+async def test_sn_done_with_pattern(mocker):
+    """Pattern is passed through and reports are included in the output."""
+    mock_done = mocker.patch("sn.workflow.retrieve_reviews",
+                             return_value=[{"report": "# Review: draft.md"}])
 
-    # Verify return value
-    assert len(result) == 1
-    assert "All reviews retrieved." in result[0].text
+    result = await sn_done("draft")
 
+    assert mock_done.call_args.args[0] == "draft"
+    assert "# Review: draft.md" in result[0].text
 
-@pytest.mark.anyio
-async def test_sn_done_default_message(mocker):
-    """Test default message when stdout is empty."""
-    mock_result = MagicMock()
-    mock_result.returncode = 0
-    mock_result.stdout = ""
-    mock_result.stderr = ""
 
-    mocker.patch("subprocess.run", return_value=mock_result)
+@pytest.mark.anyio
+async def test_sn_done_without_pattern(mocker):
+    """An empty pattern retrieves all pending reviews."""
+    mock_done = mocker.patch("sn.workflow.retrieve_reviews", return_value=[])
 
-    result = await sn_done()
+    result = await sn_done("")
 
-    assert len(result) == 1
+    assert mock_done.call_args.args[0] is None
     assert "Review retrieved successfully." in result[0].text
 
 
 @pytest.mark.anyio
-async def test_sn_list_success(mocker):
-    """Mock subprocess, verify correct command called."""
-    mock_result = MagicMock()
-    mock_result.returncode = 0
-    mock_result.stdout = "Pending reviews:\n- test.md\n- draft.md"
-    mock_result.stderr = ""
+async def test_sn_done_error(mocker):
+    mocker.patch("sn.workflow.retrieve_reviews", side_effect=RuntimeError("Something went wrong"))
+
+    result = await sn_done()
 
-    mock_run = mocker.patch("subprocess.run", return_value=mock_result)
+    assert "Error retrieving review: Something went wrong" in result[0].text
 
-    result = await sn_list()
 
-    # Verify subprocess.run was called with correct arguments
-    mock_run.assert_called_once_with(
-        ["sn-review", "list"],
-        capture_output=True,
-        text=True,
-        timeout=30,
-    )
+@pytest.mark.anyio
+async def test_sn_list_success(temp_state_file):
+    """Lists pending reviews straight from the state file."""
+    from sn import state
+    state.add_review("test.md", "/storage/test.pdf")
+    state.add_review("draft.md", "/storage/draft.pdf")
 
-    # Verify return value
-    assert len(result) == 1
-    assert isinstance(result[0], TextContent)
+    result = await sn_list()
+
+    assert "Pending Reviews:" in result[0].text
     assert "test.md" in result[0].text
     assert "draft.md" in result[0].text
 
 
 @pytest.mark.anyio
-async def test_sn_list_default_message(mocker):
-    """Test default message when no pending reviews."""
-    mock_result = MagicMock()
-    mock_result.returncode = 0
-    mock_result.stdout = ""
-    mock_result.stderr = ""
-
-    mocker.patch("subprocess.run", return_value=mock_result)
-
+async def test_sn_list_default_message(temp_state_file):
     result = await sn_list()
 
-    assert len(result) == 1
     assert "No pending reviews." in result[0].text
 
 
 @pytest.mark.anyio
-async def test_error_timeout(mocker):
-    """Mock subprocess.TimeoutExpired, verify graceful error message."""
-    mocker.patch(
-        "subprocess.run",
-        side_effect=subprocess.TimeoutExpired(cmd="sn-review", timeout=60)
-    )
+async def test_sn_list_error(mocker):
+    mocker.patch("sn.workflow.list_pending", side_effect=ValueError("Invalid value"))
 
-    result = await sn_review("/path/to/test.md")
+    result = await sn_list()
 
-    assert len(result) == 1
-    assert "Error: Command timed out after 60 seconds" in result[0].text
-    assert "Check device connection" in result[0].text
+    assert "Error listing reviews: Invalid value" in result[0].text
 
 
 @pytest.mark.anyio
-async def test_error_timeout_sn_done(mocker):
-    """Test timeout error for sn_done."""
-    mocker.patch(
-        "subprocess.run",
-        side_effect=subprocess.TimeoutExpired(cmd="sn-review", timeout=60)
-    )
+async def test_event_loop_stays_responsive_during_push(mocker, md_file, temp_state_file):
+    """A blocking push must not stall list_tools or other tool calls."""
+    release = threading.Event()
 
-    result = await sn_done("pattern")
+    def slow_review(file_path, echo, **kwargs):
+        release.wait(5)
 
-    assert len(result) == 1
-    assert "Error: Command timed out after 60 seconds" in result[0].text
+    mocker.patch("sn.workflow.request_review", side_effect=slow_review)
 
+    review_task = asyncio.create_task(sn_review(md_file))
+    await asyncio.sleep(0.05)
 
-@pytest.mark.anyio
-async def test_error_timeout_sn_list(mocker):
-    """Test timeout error for sn_list has different timeout."""
-    mocker.patch(
-        "subprocess.run",
-        side_effect=subprocess.TimeoutExpired(cmd="sn-review", timeout=30)
-    )
+    start = time.monotonic()
+    tools = await list_tools()
+    listing = await sn_list()
+    elapsed = time.monotonic() - start
 
-    result = await sn_list()
+    assert not review_task.done()
+    assert len(tools) == 4
+    assert "No pending reviews." in listing[0].text
+    assert elapsed < 1
 
-    assert len(result) == 1
-    assert "Error: Command timed out after 30 seconds" in result[0].text
+    release.set()
+    await review_task
 
 
 @pytest.mark.anyio
-async def test_error_command_not_found(mocker):
-    """Mock FileNotFoundError, verify graceful error message."""
-    mocker.patch("subprocess.run", side_effect=FileNotFoundError())
+async def test_device_session_shared_and_reset_on_error(mocker, md_file):
+    """Tool calls connect through the warm session and drop it after a failure."""
+    from sn import mcp_server
+    invalidate = mocker.spy(mcp_server._session, "invalidate")
+    seen = []
 
-    result = await sn_review("/path/to/test.md")
+    def fake_review(file_path, echo, connect=None, **kwargs):
+        seen.append(connect)
+        raise RuntimeError("device gone")
 
-    assert len(result) == 1
-    assert "Error: sn-review command not found" in result[0].text
-    assert "Make sure SupernoteReview is installed" in result[0].text
+    mocker.patch("sn.workflow.request_review", side_effect=fake_review)
 
+    await sn_review(md_file)
 
-@pytest.mark.anyio
-async def test_error_command_not_found_sn_done(mocker):
-    """Test FileNotFoundError for sn_done."""
-    mocker.patch("subprocess.run", side_effect=FileNotFoundError())
+    assert seen == [mcp_server._session.get]
+    assert invalidate.call_count == 1
 
-    result = await sn_done()
 
-    assert len(result) == 1
-    assert "Error: sn-review command not found" in result[0].text
+@pytest.fixture
+def request_context(mocker):
+    """Pretends a tool call is in flight with a client progress token."""
+    from types import SimpleNamespace
+    from sn import mcp_server
+
+    session = mocker.Mock()
+    sent = []
+
+    async def send_progress_notification(token, progress, total=None, message=None, related_request_id=None):
+        sent.append((token, progress, total, message))
+
+    session.send_progress_notification = send_progress_notification
+    ctx = SimpleNamespace(meta=SimpleNamespace(progressToken="tok-1"), session=session, request_id=7)
+    mocker.patch.object(type(mcp_server.app), "request_context",
+                        new_callable=mocker.PropertyMock, return_value=ctx)
+    return sent
 
 
 @pytest.mark.anyio
-async def test_error_command_not_found_sn_list(mocker):
-    """Test FileNotFoundError for sn_list."""
-    mocker.patch("subprocess.run", side_effect=FileNotFoundError())
+async def test_progress_notifications(mocker, md_file, request_context):
+    def fake_review(file_path, echo, connect=None, progress=None, **kwargs):
+        progress.phase("Converting Markdown to HTML")
+        progress.phase("Pushing PDF")
+        on_chunk = progress.transfer("Pushing PDF")
+        for done in (0, 512, 1024):
+            on_chunk(done, 1024)
 
-    result = await sn_list()
+    mocker.patch("sn.workflow.request_review", side_effect=fake_review)
 
-    assert len(result) == 1
-    assert "Error: sn-review command not found" in result[0].text
+    await sn_review(md_file)
+    await asyncio.sleep(0.05)
+
+    values = [p for _, p, _, _ in request_context]
+    assert all(t == "tok-1" for t, _, _, _ in request_context)
+    assert values == sorted(set(values))
+    assert request_context[0][3] == "Converting Markdown to HTML"
+    assert request_context[-1][3] == "Pushing PDF: 0.0 / 0.0 MB"
+    assert request_context[-1][2] == 6
 
 
 @pytest.mark.anyio
-async def test_error_nonzero_exit(mocker):
-    """Mock subprocess returning non-zero exit code, verify error handling."""
-    mock_result = MagicMock()
-    mock_result.returncode = 1
-    mock_result.stdout = ""
-    mock_result.stderr = "Error: Device not found"
+async def test_cancellation_aborts_transfer(mocker, md_file):
+    """Cancelling the tool call stops the worker thread mid-transfer."""
+    from sn.progress import Cancelled
+    started = threading.Event()
+    outcome = {}
+
+    def fake_review(file_path, echo, connect=None, progress=None, **kwargs):
+        on_chunk = progress.transfer("Pushing PDF")
+        started.set()
+        try:
+            for done in range(1, 1000):
+                on_chunk(done, 1000)
+                time.sleep(0.01)
+        except Cancelled:
+            outcome["aborted_at"] = done
+            raise
+
+    mocker.patch("sn.workflow.request_review", side_effect=fake_review)
+
+    task = asyncio.create_task(sn_review(md_file))
+    await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    for _ in range(100):
+        if outcome:
+            break
+        await asyncio.sleep(0.01)
+    assert outcome["aborted_at"] < 999
 
-    mocker.patch("subprocess.run", return_value=mock_result)
 
-    result = await sn_review("/path/to/test.md")
+@pytest.mark.anyio
+async def test_wait_for_review_retrieves_once_exported(mocker, temp_state_file):
+    from sn import state, mcp_server
+    state.add_review("draft.md", "/storage/emulated/0/Document/PDFs/ForReview/draft_20260101_100000.pdf")
+    listings = [[], ["draft_20260101_100000.pdf"]]
 
-    assert len(result) == 1
-    assert "Error sending review (exit code 1)" in result[0].text
-    assert "Error: Device not found" in result[0].text
+    async def list_exports():
+        return listings.pop(0) if len(listings) > 1 else listings[0]
+
+    mocker.patch.object(mcp_server._poller, "list_exports", new=list_exports)
+    mocker.patch.object(mcp_server._poller, "interval", 0.01)
+    mock_done = mocker.patch("sn.mcp_server.sn_done", return_value=[TextContent(type="text", text="# Review: draft.md")])
+
+    result = await mcp_server.sn_wait_for_review("draft", timeout_seconds=5)
+
+    assert "Export found: draft_20260101_100000.pdf" in result[0].text
+    assert "# Review: draft.md" in result[0].text
+    mock_done.assert_called_once_with("draft", paths=["draft.md"])
 
 
 @pytest.mark.anyio
-async def test_error_nonzero_exit_sn_done(mocker):
-    """Test non-zero exit code for sn_done."""
-    mock_result = MagicMock()
-    mock_result.returncode = 2
-    mock_result.stdout = ""
-    mock_result.stderr = "No reviews found"
+async def test_wait_for_review_times_out(mocker, temp_state_file):
+    from sn import state, mcp_server
+    state.add_review("draft.md", "/storage/emulated/0/Document/PDFs/ForReview/draft_20260101_100000.pdf")
+    # An export from an earlier review must not satisfy the wait
+    async def list_exports():
+        return ["draft_20251201_090000.pdf"]
 
-    mocker.patch("subprocess.run", return_value=mock_result)
+    mocker.patch.object(mcp_server._poller, "list_exports", new=list_exports)
+    mocker.patch.object(mcp_server._poller, "interval", 0.01)
 
-    result = await sn_done("pattern")
+    result = await mcp_server.sn_wait_for_review("draft", timeout_seconds=0.1)
 
-    assert len(result) == 1
-    assert "Error retrieving review (exit code 2)" in result[0].text
-    assert "No reviews found" in result[0].text
+    assert "Timed out after 0.1 seconds" in result[0].text
 
 
 @pytest.mark.anyio
-async def test_error_nonzero_exit_sn_list(mocker):
-    """Test non-zero exit code for sn_list."""
-    mock_result = MagicMock()
-    mock_result.returncode = 3
-    mock_result.stdout = "Some output"
-    mock_result.stderr = ""
+async def test_wait_for_review_timeout_cancels_every_waiter(mocker, temp_state_file):
+    import asyncio
+    from sn import state, mcp_server
+    state.add_review("a.md", "/storage/emulated/0/Document/PDFs/ForReview/a_20260101_100000.pdf")
+    state.add_review("b.md", "/storage/emulated/0/Document/PDFs/ForReview/b_20260101_100000.pdf")
 
-    mocker.patch("subprocess.run", return_value=mock_result)
+    async def list_exports():
+        return []
 
-    result = await sn_list()
+    mocker.patch.object(mcp_server._poller, "list_exports", new=list_exports)
+    mocker.patch.object(mcp_server._poller, "interval", 0.01)
+    wait_for = mcp_server._poller.wait_for
 
-    assert len(result) == 1
-    assert "Error listing reviews (exit code 3)" in result[0].text
-    assert "Some output" in result[0].text
+    async def first_gives_up(local_path, device_path, timeout):
+        if local_path == "a.md":
+            raise asyncio.TimeoutError
+        return await wait_for(local_path, device_path, timeout)
 
+    mocker.patch.object(mcp_server._poller, "wait_for", side_effect=first_gives_up)
 
-@pytest.mark.anyio
-async def test_error_nonzero_exit_stdout_fallback(mocker):
-    """Test that stdout is used when stderr is empty."""
-    mock_result = MagicMock()
-    mock_result.returncode = 1
-    mock_result.stdout = "Error from stdout"
-    mock_result.stderr = ""
+    result = await mcp_server.sn_wait_for_review(".md", timeout_seconds=5)
+    await asyncio.sleep(0.05)
 
-    mocker.patch("subprocess.run", return_value=mock_result)
+    assert "Timed out" in result[0].text
+    # No waiter is left polling the device in the background
+    assert mcp_server._poller.waiting == 0
+    polls = mcp_server._poller.polls
+    await asyncio.sleep(0.05)
+    assert mcp_server._poller.polls == polls
 
-    result = await sn_review("/path/to/test.md")
 
-    assert len(result) == 1
-    assert "Error from stdout" in result[0].text
+@pytest.mark.anyio
+async def test_review_pages_published_as_resources(mocker, tmp_path, temp_state_file):
+    fitz = pytest.importorskip("fitz")
+    from sn import state, mcp_server
+    pdf = tmp_path / "draft_reviewed.pdf"
+    doc = fitz.open()
+    for _ in range(2):
+        doc.new_page(width=420, height=595)
+    doc.save(pdf)
+    state.add_review("draft.md", "/storage/emulated/0/Document/PDFs/ForReview/draft_20260101_100000.pdf")
+    state.mark_completed_many(["draft.md"], {"draft.md": {
+        "reviewed_path": str(pdf), "annotated_pages": [{"page": 2, "bboxes": []}],
+    }})
+    mocker.patch.object(mcp_server, "_page_cache", mcp_server.pages.PageCache())
+
+    resources = await mcp_server.list_resources()
+
+    assert [str(r.uri) for r in resources] == [
+        "supernote://review/draft_20260101_100000/page/1",
+        "supernote://review/draft_20260101_100000/page/2",
+    ]
+    assert "(annotated)" in resources[1].description
+
+    first = await mcp_server.read_resource(resources[1].uri)
+    again = await mcp_server.read_resource(resources[1].uri)
+    assert first[0].mime_type == "image/png"
+    assert first[0].content.startswith(b"\x89PNG")
+    assert again[0].content == first[0].content
+    assert (mcp_server._page_cache.misses, mcp_server._page_cache.hits) == (1, 1)
+
+    with pytest.raises(ValueError):
+        await mcp_server.read_resource("supernote://review/unknown/page/1")
+
+    # Pages of a review read from a .mark sidecar show no ink
+    state.add_review("notes.md", "/storage/emulated/0/Document/PDFs/ForReview/notes_20260101_100000.pdf")
+    state.mark_completed_many(["notes.md"], {"notes.md": {
+        "reviewed_path": str(pdf), "annotated_pages": [{"page": 1, "bboxes": []}],
+        "pulled_from": "/storage/emulated/0/Document/PDFs/ForReview/notes_20260101_100000.pdf.mark",
+    }})
+    assert len(await mcp_server.list_resources()) == 2
 
 
 @pytest.mark.anyio
-async def test_unexpected_exception(mocker):
-    """Test handling of unexpected exceptions."""
-    mocker.patch("subprocess.run", side_effect=RuntimeError("Unexpected error"))
+async def test_resource_listing_reads_page_count_from_state(mocker, tmp_path, temp_state_file):
+    from sn import state, mcp_server
+    pdf = tmp_path / "draft_reviewed.pdf"
+    pdf.write_bytes(b"%PDF")
+    state.add_review("draft.md", "/storage/emulated/0/Document/PDFs/ForReview/draft_20260101_100000.pdf")
+    state.mark_completed_many(["draft.md"], {"draft.md": {"reviewed_path": str(pdf), "page_count": 3}})
+    page_count = mocker.patch.object(mcp_server.pages, "page_count")
 
-    result = await sn_review("/path/to/test.md")
+    resources = await mcp_server.list_resources()
 
-    assert len(result) == 1
-    assert "Unexpected error: Unexpected error" in result[0].text
+    assert len(resources) == 3
+    page_count.assert_not_called()
 
 
 @pytest.mark.anyio
-async def test_unexpected_exception_sn_done(mocker):
-    """Test handling of unexpected exceptions for sn_done."""
-    mocker.patch("subprocess.run", side_effect=RuntimeError("Something went wrong"))
+async def test_sn_done_links_annotated_page_resources(mocker):
+    mocker.patch("sn.workflow.retrieve_reviews", return_value=[{
+        "file": "draft.md", "report": "# Review: draft.md",
+        "device_path": "/storage/emulated/0/Document/PDFs/ForReview/draft_20260101_100000.pdf",
+        "annotated_pages": [{"page": 3}],
+    }])
 
-    result = await sn_done()
+    result = await sn_done("draft")
 
-    assert len(result) == 1
-    assert "Unexpected error: Something went wrong" in result[0].text
+    assert "supernote://review/draft_20260101_100000/page/3" in result[0].text
 
 
 @pytest.mark.anyio
-async def test_unexpected_exception_sn_list(mocker):
-    """Test handling of unexpected exceptions for sn_list."""
-    mocker.patch("subprocess.run", side_effect=ValueError("Invalid value"))
+async def test_sn_done_links_no_pages_of_mark_sourced_reviews(mocker):
+    mocker.patch("sn.workflow.retrieve_reviews", return_value=[{
+        "file": "draft.md", "report": "# Review: draft.md",
+        "device_path": "/storage/emulated/0/Document/PDFs/ForReview/draft_20260101_100000.pdf",
+        "pulled_from": "/storage/emulated/0/Document/PDFs/ForReview/draft_20260101_100000.pdf.mark",
+        "annotated_pages": [{"page": 3}],
+    }])
 
-    result = await sn_list()
+    result = await sn_done("draft")
 
-    assert len(result) == 1
-    assert "Unexpected error: Invalid value" in result[0].text
+    assert "supernote://" not in result[0].text
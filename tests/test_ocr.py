@@ -0,0 +1,76 @@
+import pytest
+
+from sn import ocr
+from sn.annotations import PageAnnotations, format_report
+
+np = pytest.importorskip("numpy")
+
+
+def test_recognise_caches_by_ink_hash(tmp_path):
+    crops = {(1, 1): np.full((4, 4), 255, np.uint8), (1, 2): np.zeros((4, 4), np.uint8)}
+    calls = []
+
+    def fake(crop, lang):
+        calls.append(crop.sum())
+        return "dark" if crop.sum() == 0 else "blank"
+
+    texts, hits = ocr.recognise(crops, cache_dir=tmp_path, recognise_one=fake)
+    assert texts == {(1, 1): "blank", (1, 2): "dark"} and hits == 0
+
+    # Same ink on another page: served from the cache
+    texts, hits = ocr.recognise({(3, 1): np.zeros((4, 4), np.uint8)}, cache_dir=tmp_path, recognise_one=fake)
+    assert texts == {(3, 1): "dark"} and hits == 1
+    assert len(calls) == 2
+
+
+def test_recognise_cache_is_capped(tmp_path, mocker):
+    mocker.patch.object(ocr, "MAX_CACHE_BYTES", 10)
+    crops = {(1, i): np.full((4, 4), i, np.uint8) for i in range(3)}
+
+    ocr.recognise(crops, cache_dir=tmp_path, recognise_one=lambda crop, lang: "12345")
+
+    assert sum(p.stat().st_size for p in tmp_path.iterdir()) <= 10
+
+
+def test_tesseract_thread_limit_stays_in_the_subprocess(mocker, monkeypatch):
+    image = pytest.importorskip("PIL.Image")
+    monkeypatch.delenv("OMP_THREAD_LIMIT", raising=False)
+    mocker.patch.object(ocr, "pytesseract")
+    mocker.patch.object(ocr, "Image", image)
+    run = mocker.patch("sn.ocr.subprocess.run")
+    run.return_value.returncode = 0
+    run.return_value.stdout = b"fix  this\n"
+
+    assert ocr._recognise(np.zeros((4, 4), np.uint8), "eng") == "fix this"
+    assert run.call_args.kwargs["env"]["OMP_THREAD_LIMIT"] == "1"
+    assert "OMP_THREAD_LIMIT" not in ocr.os.environ
+
+
+def test_ink_crops_whiten_printed_text(tmp_path):
+    fitz = pytest.importorskip("fitz")
+    original, annotated = tmp_path / "orig.pdf", tmp_path / "ann.pdf"
+    for path, ink in ((original, False), (annotated, True)):
+        doc = fitz.open()
+        page = doc.new_page(width=200, height=200)
+        page.insert_text((20, 60), "printed", fontsize=20)
+        if ink:
+            page.draw_line((20, 100), (180, 100), width=4)
+        doc.save(path)
+        doc.close()
+
+    crops = ocr.ink_crops(original, annotated, [PageAnnotations(page=1, bboxes=[(10, 40, 190, 110)])], dpi=72)
+
+    ink = crops[(1, 1)]
+    printed_rows = ink[10:25]
+    assert printed_rows.min() == 255  # the text under the ink is gone
+    assert ink.min() < 100  # the stroke stays
+
+
+def test_report_includes_recognised_text():
+    page = PageAnnotations(page=2, bboxes=[(0, 0, 10, 10), (0, 20, 10, 30)], text=["fix this", None])
+
+    report = format_report([page])
+
+    assert '- Region 1 on page 2 reads: "fix this"' in report
+    assert "Region 2 on page 2 reads" not in report
+    assert page.to_dict()["text"] == ["fix this", None]
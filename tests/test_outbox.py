@@ -0,0 +1,124 @@
+import threading
+
+import pytest
+
+from sn import outbox, state, workflow
+
+
+@pytest.fixture
+def outbox_dir(tmp_path, monkeypatch):
+    path = tmp_path / ".sn_outbox"
+    monkeypatch.setattr(outbox, "OUTBOX_DIR", path)
+    return path
+
+
+def test_offline_review_is_queued(tmp_path, temp_state_file, outbox_dir, mocker):
+    md = tmp_path / "draft.md"
+    md.write_text("# Draft")
+    mocker.patch("sn.workflow.render_pdf", return_value=(b"%PDF-1.7", None))
+    mocker.patch("sn.workflow.SupernoteDevice", side_effect=Exception("No ADB devices found."))
+
+    result = workflow.request_review(md)
+
+    assert result["queued"] is True and result["device"] is None
+    [entry] = outbox.pending()
+    assert entry["file"] == str(md)
+    assert open(entry["pdf"], "rb").read() == b"%PDF-1.7"
+    assert entry["details"]["content_hash"]
+    # Nothing is pending on the device yet
+    assert state.get_pending_reviews() == {}
+
+
+def test_queue_offline_false_raises(tmp_path, temp_state_file, outbox_dir, mocker):
+    md = tmp_path / "draft.md"
+    md.write_text("# Draft")
+    mocker.patch("sn.workflow.render_pdf", return_value=(b"%PDF", None))
+    mocker.patch("sn.workflow.SupernoteDevice", side_effect=Exception("No ADB devices found."))
+
+    with pytest.raises(Exception, match="No ADB devices"):
+        workflow.request_review(md, queue_offline=False)
+    assert outbox.pending() == []
+
+
+def test_flush_pushes_all_and_records_state(temp_state_file, outbox_dir, mocker):
+    outbox.enqueue(b"A", "a.md", "/ForReview/a_1.pdf", content_hash="ha")
+    outbox.enqueue(b"B", "b.md", "/ForReview/b_1.pdf")
+    device = mocker.Mock()
+    device.push.side_effect = lambda data, remote: None if data == b"A" else (_ for _ in ()).throw(OSError("link"))
+
+    pushed = outbox.flush(device)
+
+    assert pushed == ["a.md"]
+    assert state.get_pending_reviews()["a.md"]["content_hash"] == "ha"
+    device.open_pdf.assert_called_once_with("/ForReview/a_1.pdf")
+    # The failed push stays queued for the next reconnect
+    assert [e["file"] for e in outbox.pending()] == ["b.md"]
+
+
+def test_claimed_entries_are_not_flushed_twice(temp_state_file, outbox_dir, mocker):
+    outbox.enqueue(b"A", "a.md", "/ForReview/a_1.pdf")
+    sidecar = outbox_dir / "a_1.pdf.json"
+    sidecar.rename(sidecar.with_name(sidecar.name + ".claimed"))
+
+    assert outbox.flush(mocker.Mock()) == []
+
+
+def test_reclaimed_entry_pushed_before_a_crash_is_not_pushed_again(temp_state_file, outbox_dir, mocker):
+    import json
+    import os
+    outbox.enqueue(b"A", "a.md", "/ForReview/a_1.pdf", content_hash="ha")
+    device = mocker.Mock()
+
+    def crash(data, remote):
+        # The push went through, but the flusher dies before recording it
+        raise KeyboardInterrupt
+
+    device.push.side_effect = crash
+    with pytest.raises(KeyboardInterrupt):
+        outbox.flush(device)
+    claimed = outbox_dir / "a_1.pdf.json.claimed"
+    assert json.loads(claimed.read_text())["pushed_at"]
+    os.utime(claimed, (0, 0))
+
+    device.push.reset_mock(side_effect=True)
+    assert outbox.flush(device) == ["a.md"]
+
+    device.push.assert_not_called()
+    assert state.get_pending_reviews()["a.md"]["content_hash"] == "ha"
+    assert outbox.pending() == []
+
+
+def test_failed_push_is_requeued_without_the_pushed_mark(temp_state_file, outbox_dir, mocker):
+    outbox.enqueue(b"A", "a.md", "/ForReview/a_1.pdf")
+    device = mocker.Mock()
+    device.push.side_effect = OSError("link")
+
+    outbox.flush(device)
+
+    [entry] = outbox.pending()
+    assert "pushed_at" not in entry
+    device.push.side_effect = None
+    assert outbox.flush(device) == ["a.md"]
+    assert device.push.call_count == 2
+
+
+def test_flusher_flushes_when_device_comes_online(temp_state_file, outbox_dir, mocker):
+    from adbutils._proto import DeviceEvent
+    outbox.enqueue(b"A", "a.md", "/ForReview/a_1.pdf")
+    release = threading.Event()
+
+    def track_devices():
+        yield DeviceEvent(True, "192.168.1.5:5555", "offline")
+        yield DeviceEvent(True, "192.168.1.5:5555", "device")
+        release.wait(5)
+
+    client = mocker.Mock()
+    client.track_devices.side_effect = track_devices
+    device = mocker.Mock()
+
+    done = outbox.wait_and_flush(lambda: device, timeout=5, client_factory=lambda: client)
+    release.set()
+
+    assert done
+    device.push.assert_called_once_with(b"A", "/ForReview/a_1.pdf")
+    assert "a.md" in state.get_pending_reviews()
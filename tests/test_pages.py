@@ -0,0 +1,66 @@
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from sn import pages, state
+
+
+def _pdf(tmp_path, count=3):
+    path = tmp_path / "reviewed.pdf"
+    doc = fitz.open()
+    for i in range(count):
+        page = doc.new_page(width=420, height=595)
+        page.insert_text((50, 80), f"Page {i + 1}")
+    doc.save(path)
+    return path
+
+
+def test_uri_round_trip():
+    uri = pages.page_uri("spec_20260101_100000", 3)
+    assert uri == "supernote://review/spec_20260101_100000/page/3"
+    assert pages.parse_uri(uri) == ("spec_20260101_100000", 3)
+    with pytest.raises(ValueError):
+        pages.parse_uri("supernote://review/spec/page/x")
+
+
+def test_render_page(tmp_path):
+    pdf = _pdf(tmp_path)
+    assert pages.render_page(pdf, 2).startswith(b"\x89PNG")
+    with pytest.raises(ValueError):
+        pages.render_page(pdf, 4)
+
+
+def test_cache_renders_once_and_evicts_lru(tmp_path):
+    pdf = _pdf(tmp_path)
+    rendered = []
+
+    def render(path, page, dpi):
+        rendered.append(page)
+        return b"x" * 10
+
+    cache = pages.PageCache(max_bytes=20, render=render)
+    cache.get(pdf, 1)
+    cache.get(pdf, 2)
+    cache.get(pdf, 1)  # hit; page 2 becomes least recently used
+    cache.get(pdf, 3)  # over budget: evicts page 2
+
+    assert rendered == [1, 2, 3]
+    assert (cache.hits, cache.misses, len(cache), cache.size) == (1, 3, 2, 20)
+    cache.get(pdf, 1)
+    cache.get(pdf, 2)
+    assert rendered == [1, 2, 3, 2]
+
+
+def test_completed_reviews_keyed_by_device_stem(tmp_path, temp_state_file):
+    pdf = _pdf(tmp_path)
+    state.add_review("spec.md", "/Document/ForReview/spec_20260101_100000.pdf")
+    state.add_review("gone.md", "/Document/ForReview/gone_20260101_100000.pdf")
+    state.mark_completed_many(["spec.md", "gone.md"], {
+        "spec.md": {"reviewed_path": str(pdf)},
+        "gone.md": {"reviewed_path": str(tmp_path / "missing.pdf")},
+    })
+
+    reviews = pages.completed_reviews()
+
+    assert list(reviews) == ["spec_20260101_100000"]
+    assert reviews["spec_20260101_100000"]["local_path"] == "spec.md"
@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+from sn.poller import ExportPoller
+
+FOR_REVIEW = "/storage/emulated/0/Document/PDFs/ForReview"
+
+
+class FakeExports:
+    def __init__(self):
+        self.names = []
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return list(self.names)
+
+
+@pytest.mark.anyio
+async def test_many_waiters_share_one_listing_per_interval():
+    exports = FakeExports()
+    poller = ExportPoller(exports, interval=0.05)
+
+    waits = [
+        asyncio.create_task(poller.wait_for(f"doc{i}.md", f"{FOR_REVIEW}/doc{i}_20260101_100000.pdf", 5))
+        for i in range(20)
+    ]
+    await asyncio.sleep(0.12)
+    exports.names = [f"doc{i}_20260101_100000.pdf" for i in range(20)]
+    results = await asyncio.gather(*waits)
+
+    assert results == [f"doc{i}_20260101_100000.pdf" for i in range(20)]
+    # A handful of polls in total, not one per waiter per interval
+    assert exports.calls <= 5
+    assert poller.waiting == 0
+
+
+@pytest.mark.anyio
+async def test_timeout_removes_waiter_and_stops_polling():
+    exports = FakeExports()
+    poller = ExportPoller(exports, interval=0.01)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await poller.wait_for("doc.md", f"{FOR_REVIEW}/doc_20260101_100000.pdf", 0.05)
+
+    assert poller.waiting == 0
+    await asyncio.sleep(0.05)
+    calls = exports.calls
+    await asyncio.sleep(0.05)
+    assert exports.calls == calls
+
+
+@pytest.mark.anyio
+async def test_listing_errors_keep_polling():
+    state = {"n": 0}
+
+    async def flaky():
+        state["n"] += 1
+        if state["n"] == 1:
+            raise RuntimeError("device asleep")
+        return ["doc_20260102_000000.pdf"]
+
+    poller = ExportPoller(flaky, interval=0.01)
+    name = await poller.wait_for("doc.md", f"{FOR_REVIEW}/doc_20260101_100000.pdf", 1)
+    assert name == "doc_20260102_000000.pdf"
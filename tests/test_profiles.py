@@ -0,0 +1,42 @@
+from unittest.mock import MagicMock
+
+from sn import profiles
+
+
+def test_for_model_matches_supernote_models():
+    assert profiles.for_model("A5X").name == "a5x"
+    assert profiles.for_model("A5X2").name == "manta"
+    assert profiles.for_model("Supernote A6 X2").name == "nomad"
+    assert profiles.for_model("a6x").name == "a6x"
+    assert profiles.for_model("Pixel 8") is None
+    assert profiles.for_model(None) is None
+
+
+def test_page_matches_panel_size():
+    nomad = profiles.get("Nomad")
+    assert nomad.page_mm == (118.9, 158.5)
+    css = nomad.css()
+    assert "size: 118.9mm 158.5mm" in css
+    assert "body { font-size: 9.9pt; }" in css
+
+
+def test_unknown_profile_name():
+    import pytest
+    with pytest.raises(ValueError, match="Choose from"):
+        profiles.get("kindle")
+
+
+def test_for_device_tolerates_failures():
+    device = MagicMock()
+    device.model.side_effect = RuntimeError("closed")
+    assert profiles.for_device(device) is None
+
+
+def test_remember_last_profile(tmp_path):
+    path = tmp_path / "profile"
+    assert profiles.remembered(path) is None
+
+    profiles.remember(profiles.get("manta"), path)
+    profiles.remember(None, path)
+
+    assert profiles.remembered(path).name == "manta"
@@ -0,0 +1,32 @@
+import pytest
+from sn.progress import Progress, Cancelled
+
+
+def test_phases_and_transfers_increase_monotonically():
+    sent = []
+    p = Progress(3, callback=lambda v, t, m: sent.append((v, t, m)))
+
+    p.phase("convert")
+    p.phase("push")
+    on_chunk = p.transfer("Pushing")
+    for done in range(0, 2 * 1024 * 1024 + 1, 4096):
+        on_chunk(done, 2 * 1024 * 1024)
+    p.phase("open")
+
+    values = [v for v, _, _ in sent]
+    assert values == sorted(set(values))
+    assert values[0] == 0 and values[-1] == 2
+    # Transfers are throttled to roughly one update per percent
+    assert len(sent) < 110
+    assert ("Pushing: 2.0 / 2.0 MB") in [m for _, _, m in sent]
+
+
+def test_cancel_raises_in_worker():
+    p = Progress(2)
+    on_chunk = p.transfer("Pulling")
+    on_chunk(1, 10)
+    p.cancel()
+    with pytest.raises(Cancelled):
+        on_chunk(2, 10)
+    with pytest.raises(Cancelled):
+        p.phase("next")
@@ -0,0 +1,57 @@
+from datetime import datetime
+from sn.retrieval import parse_export_name, find_export, find_marks, plan_retrieval, pull_all
+
+FOR_REVIEW = "/storage/emulated/0/Document/PDFs/ForReview"
+
+def test_parse_export_name():
+    assert parse_export_name("spec_20260105_121226.pdf") == ("spec", datetime(2026, 1, 5, 12, 12, 26))
+    assert parse_export_name("my_spec_v2_20260105_121226.pdf")[0] == "my_spec_v2"
+    assert parse_export_name("spec_456.pdf") == ("spec_456", None)
+    # Invalid dates are not treated as timestamps
+    assert parse_export_name("spec_20261399_999999.pdf")[1] is None
+
+def test_find_export_exact():
+    listing = {"spec_20260105_121226.pdf", "spec_20270101_000000.pdf"}
+    assert find_export("spec.md", f"{FOR_REVIEW}/spec_20260105_121226.pdf", listing) == ("spec_20260105_121226.pdf", "exact")
+
+def test_find_export_picks_newest_by_parsed_timestamp():
+    listing = ["spec_20260105_121226.pdf", "spec_20251231_235959.pdf", "spec_20260105_090000.pdf"]
+    name, kind = find_export("spec.md", f"{FOR_REVIEW}/spec_20240101_000000.pdf", listing)
+    assert (name, kind) == ("spec_20260105_121226.pdf", "fuzzy")
+
+def test_find_export_ignores_other_stems():
+    listing = ["spec_v2_20270101_000000.pdf", "spec_20260105_121226.pdf"]
+    name, _ = find_export("spec.md", f"{FOR_REVIEW}/spec_20240101_000000.pdf", listing)
+    assert name == "spec_20260105_121226.pdf"
+
+def test_plan_retrieval_falls_back_to_original():
+    reviews = {"spec.md": {"device_path": f"{FOR_REVIEW}/spec_20240101_000000.pdf"}}
+    plan = plan_retrieval(reviews, [])
+    assert plan[0].match == "original"
+    assert plan[0].pull_path == f"{FOR_REVIEW}/spec_20240101_000000.pdf"
+
+def test_pull_all_collects_errors(mocker):
+    device = mocker.Mock()
+    device.pull.side_effect = lambda remote, local: (_ for _ in ()).throw(IOError("boom")) if remote == "bad" else None
+    errors = pull_all(device, [("good", "a.pdf"), ("bad", "b.pdf")])
+    assert errors[0] is None
+    assert isinstance(errors[1], IOError)
+
+def test_plan_retrieval_prefers_mark_over_original(mocker):
+    device_path = f"{FOR_REVIEW}/spec_20240101_000000.pdf"
+    reviews = {"spec.md": {"device_path": device_path}}
+    device = mocker.Mock()
+    device.list_dir.return_value = ["spec_20240101_000000.pdf", "spec_20240101_000000.pdf.mark"]
+
+    marks = find_marks(device, plan_retrieval(reviews, []))
+    plan = plan_retrieval(reviews, [], marks=marks)
+
+    device.list_dir.assert_called_once_with(FOR_REVIEW)
+    assert plan[0].match == "mark"
+    assert plan[0].pull_path == device_path + ".mark"
+
+def test_find_export_newer_only_ignores_earlier_reviews():
+    device_path = f"{FOR_REVIEW}/spec_20260105_121226.pdf"
+    listing = ["spec_20251231_000000.pdf", "spec_456.pdf"]
+    assert find_export("spec.md", device_path, listing, newer_only=True) == (None, None)
+    assert find_export("spec.md", device_path, listing + ["spec_20260106_000000.pdf"], newer_only=True)[0] == "spec_20260106_000000.pdf"
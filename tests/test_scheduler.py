@@ -0,0 +1,153 @@
+import threading
+import time
+from sn.scheduler import DeviceScheduler, Priority, ScheduledDevice
+
+
+def test_priority_order():
+    sched = DeviceScheduler("dev", max_concurrent=1)
+    gate = threading.Event()
+    order = []
+
+    blocker = sched.submit(gate.wait)
+    time.sleep(0.05)
+    futures = [
+        sched.submit(lambda: order.append("bulk"), Priority.BULK),
+        sched.submit(lambda: order.append("normal"), Priority.NORMAL),
+        sched.submit(lambda: order.append("open"), Priority.INTERACTIVE),
+    ]
+    gate.set()
+    blocker.result(1)
+    for f in futures:
+        f.result(1)
+
+    assert order == ["open", "normal", "bulk"]
+
+
+def test_coalesces_identical_requests():
+    sched = DeviceScheduler("dev", max_concurrent=1)
+    gate = threading.Event()
+    calls = []
+
+    def listing():
+        gate.wait(1)
+        calls.append(1)
+        return ["a.pdf"]
+
+    f1 = sched.submit(listing, key=("list_dir", "/EXPORT"))
+    f2 = sched.submit(listing, key=("list_dir", "/EXPORT"))
+    gate.set()
+
+    assert f1 is f2
+    assert f1.result(1) == ["a.pdf"]
+    assert len(calls) == 1
+    assert sched.stats()["coalesced"] == 1
+
+    # Once finished, the next request runs again
+    assert sched.run(listing, key=("list_dir", "/EXPORT")) == ["a.pdf"]
+    assert len(calls) == 2
+
+
+def test_bulk_keeps_a_slot_free():
+    sched = DeviceScheduler("dev", max_concurrent=2)
+    gate = threading.Event()
+    for _ in range(3):
+        sched.submit(gate.wait, Priority.BULK)
+    time.sleep(0.05)
+
+    start = time.monotonic()
+    sched.run(lambda: None, Priority.INTERACTIVE)
+    assert time.monotonic() - start < 0.5
+    assert sched.stats()["in_flight"] == 1
+    gate.set()
+
+
+def test_bulk_pulls_are_capped_and_leave_a_slot_for_opens():
+    sched = DeviceScheduler("dev")
+    lock = threading.Lock()
+    running, peak = [0], [0]
+    barrier = threading.Barrier(2, timeout=2)
+
+    def pull():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        try:
+            barrier.wait()  # two pulls do run together
+            time.sleep(0.02)
+        finally:
+            with lock:
+                running[0] -= 1
+
+    futures = [sched.submit(pull, Priority.BULK) for _ in range(6)]
+    for f in futures:
+        f.result(3)
+    assert peak[0] == 2
+
+    # Pulls and a push fill every slot but one; an open still runs
+    gate = threading.Event()
+    for _ in range(4):
+        sched.submit(gate.wait, Priority.BULK)
+    sched.submit(gate.wait, Priority.NORMAL)
+    time.sleep(0.05)
+    assert sched.stats()["in_flight"] == 3
+    start = time.monotonic()
+    sched.run(lambda: None, Priority.INTERACTIVE)
+    assert time.monotonic() - start < 0.5
+    gate.set()
+
+
+def test_stream_slots_are_shared_by_every_holder(tmp_path):
+    from sn.scheduler import stream_slot
+    held = threading.Event()
+    release = threading.Event()
+
+    def other_process():
+        # A separate open file, as another process would have
+        with stream_slot("192.168.1.5:5555", slots=1, lock_dir=tmp_path):
+            held.set()
+            release.wait(2)
+
+    t = threading.Thread(target=other_process)
+    t.start()
+    assert held.wait(2)
+    timer = threading.Timer(0.2, release.set)
+    timer.start()
+    start = time.monotonic()
+    with stream_slot("192.168.1.5:5555", slots=1, lock_dir=tmp_path):
+        waited = time.monotonic() - start
+    t.join()
+    assert waited >= 0.15
+
+
+def test_stats_report_depth_and_waits():
+    sched = DeviceScheduler("dev", max_concurrent=1)
+    gate = threading.Event()
+    sched.submit(gate.wait)
+    time.sleep(0.02)
+    pending = sched.submit(lambda: None, Priority.BULK)
+
+    stats = sched.stats()
+    assert stats["queued"]["bulk"] == 1
+    assert stats["in_flight"] == 1
+
+    time.sleep(0.05)  # the bulk op waits at least this long
+    gate.set()
+    pending.result(1)
+    stats = sched.stats()
+    assert stats["wait_seconds"]["bulk"]["count"] == 1
+    assert stats["wait_seconds"]["bulk"]["max"] >= 0.04
+
+
+def test_errors_propagate(mocker):
+    device = mocker.Mock()
+    device.pull.side_effect = IOError("link dropped")
+    scheduled = ScheduledDevice(device, DeviceScheduler("dev"))
+
+    try:
+        scheduled.pull("/remote", "local")
+    except IOError as e:
+        assert "link dropped" in str(e)
+    else:
+        raise AssertionError("expected IOError")
+    # Non-operation attributes pass through
+    assert scheduled.device is device.device
@@ -0,0 +1,66 @@
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from sn.annotations import PageAnnotations, format_report
+from sn.snippets import render_snippets
+
+
+def _annotated_pdf(tmp_path, pages=4):
+    path = tmp_path / "export.pdf"
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page(width=420, height=595)
+        page.insert_text((50, 80), f"Page {i + 1}")
+        page.draw_rect(fitz.Rect(100, 200, 160, 240), color=(0, 0, 0), fill=(0, 0, 0))
+    doc.save(path)
+    return path
+
+
+def test_render_snippets_crops_with_context(tmp_path):
+    pdf = _annotated_pdf(tmp_path, pages=1)
+    pages = [PageAnnotations(page=1, bboxes=[(100, 200, 160, 240)])]
+
+    snippets = render_snippets(pdf, pages, tmp_path / "out", stem="spec", cache_dir=tmp_path / "cache")
+
+    assert len(snippets) == 1
+    s = snippets[0]
+    assert s.path.name == "spec_p1_r1.png"
+    assert s.path.read_bytes().startswith(b"\x89PNG")
+    assert s.bbox == (64.0, 164.0, 196.0, 276.0)
+    with fitz.open(s.path) as img:
+        # Grayscale crop, far smaller than a full page render
+        assert img[0].rect.width < 300
+
+
+def test_render_snippets_uses_page_cache(tmp_path, mocker):
+    pdf = _annotated_pdf(tmp_path, pages=1)
+    pages = [PageAnnotations(page=1, bboxes=[(100, 200, 160, 240)])]
+    cache = tmp_path / "cache"
+
+    render_snippets(pdf, pages, tmp_path / "a", cache_dir=cache)
+    spy = mocker.spy(fitz.Page, "get_pixmap")
+    render_snippets(pdf, pages, tmp_path / "b", cache_dir=cache)
+
+    assert spy.call_count == 0
+    assert len(list(cache.iterdir())) == 1
+
+
+def test_render_snippets_process_pool(tmp_path):
+    pdf = _annotated_pdf(tmp_path, pages=4)
+    pages = [PageAnnotations(page=n, bboxes=[(100, 200, 160, 240)]) for n in (1, 3, 4)]
+
+    snippets = render_snippets(pdf, pages, tmp_path / "out", cache_dir=tmp_path / "cache", max_workers=3)
+
+    assert [s.page for s in snippets] == [1, 3, 4]
+    assert all(s.path.exists() for s in snippets)
+
+
+def test_report_embeds_snippet_links(tmp_path):
+    pdf = _annotated_pdf(tmp_path, pages=1)
+    pages = [PageAnnotations(page=1, bboxes=[(100, 200, 160, 240)])]
+    snippets = render_snippets(pdf, pages, tmp_path / "spec-review-snippets", stem="spec", cache_dir=tmp_path / "cache")
+
+    report = format_report(pages, snippets, tmp_path)
+
+    assert "![Page 1, region 1](spec-review-snippets/spec_p1_r1.png)" in report
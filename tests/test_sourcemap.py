@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+from sn import sourcemap
+from sn.sourcemap import parse_pos, build, lookup
+
+
+def _box(element, y, height):
+    return SimpleNamespace(element=element, position_y=y, margin_height=lambda: height)
+
+
+def _page(*boxes):
+    return SimpleNamespace(_page_box=SimpleNamespace(descendants=lambda: iter(boxes)))
+
+
+def test_parse_pos():
+    assert parse_pos("/tmp/SPEC.md@3:1-5:1") == ("/tmp/SPEC.md", 3, 4)
+    assert parse_pos("3:7-3:10") == (None, 3, 3)
+    assert parse_pos("garbage") is None
+    assert parse_pos(None) is None
+
+
+def test_build_merges_boxes_and_skips_wrappers():
+    heading = {"data-pos": "SPEC.md@1:1-2:1"}
+    para = {"data-pos": "SPEC.md@3:1-6:1"}
+    wrapper = {"data-pos": "SPEC.md@3:1-3:6", "data-wrapper": "1"}
+    doc = SimpleNamespace(pages=[
+        _page(_box(heading, 0, 40), _box(para, 40, 20), _box(para, 60, 20), _box(wrapper, 40, 10)),
+        _page(_box(para, 0, 20)),
+    ])
+
+    entries = build(doc)
+
+    assert entries == [
+        {"page": 1, "y0": 0.0, "y1": 30.0, "source": "SPEC.md", "start": 1, "end": 1},
+        {"page": 1, "y0": 30.0, "y1": 60.0, "source": "SPEC.md", "start": 3, "end": 5},
+        {"page": 2, "y0": 0.0, "y1": 15.0, "source": "SPEC.md", "start": 3, "end": 5},
+    ]
+
+
+def test_lookup_prefers_innermost_blocks():
+    entries = [
+        {"page": 4, "y0": 0, "y1": 200, "source": "SPEC.md", "start": 100, "end": 160},
+        {"page": 4, "y0": 50, "y1": 90, "source": "SPEC.md", "start": 120, "end": 127},
+        {"page": 4, "y0": 90, "y1": 120, "source": "SPEC.md", "start": 128, "end": 134},
+    ]
+    assert lookup(entries, 4, 60, 110) == ("SPEC.md", 120, 134)
+    assert lookup(entries, 5, 0, 10) is None
+
+
+def test_lookup_margin_note_uses_block_above():
+    entries = [
+        {"page": 1, "y0": 10, "y1": 40, "source": "SPEC.md", "start": 1, "end": 2},
+        {"page": 1, "y0": 40, "y1": 80, "source": "SPEC.md", "start": 4, "end": 9},
+    ]
+    assert lookup(entries, 1, 300, 350) == ("SPEC.md", 4, 9)
+
+
+def test_save_and_load(tmp_path):
+    entries = [{"page": 1, "y0": 0, "y1": 10, "source": "a.md", "start": 1, "end": 1}]
+    path = sourcemap.save(entries, "a_20260101_000000.pdf", tmp_path)
+    assert path.name == "a_20260101_000000.map.json"
+    assert sourcemap.load(path) == entries
+
+
+class _Element(dict):
+    """Stand-in for an lxml element: attributes, first occurrence wins as in html5lib."""
+
+
+def _elements(markup):
+    from html.parser import HTMLParser
+
+    found = []
+
+    class Collect(HTMLParser):
+        def handle_starttag(self, tag, attrs):
+            element = _Element()
+            for key, value in attrs:
+                element.setdefault(key, value)
+            if "data-pos" in element:
+                found.append(element)
+
+    Collect().feed(markup)
+    return found
+
+
+def test_build_from_real_pandoc_output(tmp_path):
+    from sn import converter
+    source = tmp_path / "SPEC.md"
+    source.write_text("# Title\n\nFirst paragraph\nspans two lines.\n\n```\ncode\nmore\n```\n")
+
+    markup = converter._pandoc(source, source_map=True)
+    elements = _elements(markup)
+    # Inline spans are tagged too, but as wrappers the map ignores
+    assert any(e.get("data-wrapper") for e in elements)
+    doc = SimpleNamespace(pages=[_page(*(_box(e, 20 * i, 20) for i, e in enumerate(elements)))])
+
+    assert [(e["source"], e["start"], e["end"]) for e in build(doc)] == [
+        ("SPEC.md", 1, 1), ("SPEC.md", 3, 4), ("SPEC.md", 6, 9)]
+
+
+def test_default_reader_has_no_positions(tmp_path):
+    from sn import converter
+    source = tmp_path / "SPEC.md"
+    source.write_text("# Title\n\nText with a footnote.[^1]\n\n[^1]: Pandoc markdown only.\n")
+
+    markup = converter._pandoc(source, source_map=False)
+
+    assert "data-pos" not in markup
+    assert 'class="footnote' in markup
+
+
+def test_build_without_box_tree_is_empty():
+    doc = SimpleNamespace(pages=[SimpleNamespace()])
+    assert build(doc) == []
@@ -28,3 +28,45 @@ def test_mark_completed(temp_state_file):
 
 def test_empty_state(temp_state_file):
     assert state.get_pending_reviews() == {}
+
+def test_mark_completed_many_single_write(temp_state_file, mocker):
+    state.add_review("/tmp/a.md", "/storage/a.pdf")
+    state.add_review("/tmp/b.md", "/storage/b.pdf")
+    save_spy = mocker.spy(state, "save_state")
+
+    state.mark_completed_many(["/tmp/a.md", "/tmp/b.md"], {"/tmp/a.md": {"reviewed_path": "a_reviewed.pdf"}})
+
+    assert save_spy.call_count == 1
+    data = state.load_state()
+    assert data['reviews']['/tmp/a.md']['reviewed_path'] == "a_reviewed.pdf"
+    assert data['reviews']['/tmp/b.md']['status'] == 'completed'
+
+def test_load_state_served_from_cache(temp_state_file, mocker):
+    state.add_review("/tmp/a.md", "/storage/a.pdf")
+    json_load = mocker.spy(state.json, "load")
+
+    state.load_state()
+    state.get_pending_reviews()
+
+    assert json_load.call_count == 0
+
+def test_load_state_returns_copies(temp_state_file):
+    state.add_review("/tmp/a.md", "/storage/a.pdf")
+    state.load_state()["reviews"].clear()
+    assert "/tmp/a.md" in state.get_pending_reviews()
+
+def test_load_state_sees_external_writes(temp_state_file):
+    import json
+    state.add_review("/tmp/a.md", "/storage/a.pdf")
+    temp_state_file.write_text(json.dumps({"reviews": {}, "extra": "written by another process"}))
+    assert state.load_state().get("extra") == "written by another process"
+
+def test_add_review_keeps_earlier_pushes(temp_state_file):
+    state.add_review("/tmp/a.md", "/storage/a_1.pdf")
+    state.mark_completed("/tmp/a.md")
+    state.add_review("/tmp/a.md", "/storage/a_2.pdf", local_pdf="/tmp/a_2.pdf")
+
+    entry = state.load_state()["reviews"]["/tmp/a.md"]
+    assert entry["status"] == "pending"
+    assert [(h["device_path"], h["status"]) for h in entry["history"]] == [("/storage/a_1.pdf", "completed")]
+    assert "local_pdf" not in entry["history"][0]
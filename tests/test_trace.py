@@ -0,0 +1,80 @@
+import json
+import threading
+
+import pytest
+
+from sn import trace
+
+
+def test_spans_are_noops_without_recorder():
+    assert not trace.active()
+    with trace.span("pandoc") as s:
+        assert s is None
+
+
+def test_recorder_collects_complete_events_per_thread():
+    recorder = trace.start()
+    try:
+        with trace.span("layout", pages=3):
+            pass
+        t = threading.Thread(target=lambda: trace.traced("pull")(lambda: None)(), name="sn-pull")
+        t.start()
+        t.join()
+        try:
+            with trace.span("push"):
+                raise OSError("link down")
+        except OSError:
+            pass
+    finally:
+        assert trace.stop() is recorder
+
+    events = {e["name"]: e for e in recorder.to_json()["traceEvents"] if e["ph"] == "X"}
+    assert set(events) == {"layout", "pull", "push"}
+    assert events["layout"]["args"] == {"pages": 3}
+    assert events["push"]["args"] == {"error": "OSError"}
+    assert events["pull"]["tid"] != events["layout"]["tid"]
+    thread_names = [e["args"]["name"] for e in recorder.to_json()["traceEvents"] if e["ph"] == "M"]
+    assert "sn-pull" in thread_names
+    assert set(recorder.summary()) == {"layout", "pull", "push"}
+
+
+def test_cli_trace_and_profile(tmp_path, temp_state_file, mocker):
+    from click.testing import CliRunner
+    from sn.main import cli
+    mocker.patch("sn.workflow.render_pdf", return_value=(b"%PDF", None))
+    mocker.patch("sn.workflow.SupernoteDevice")
+    md = tmp_path / "draft.md"
+    md.write_text("# Draft")
+    trace_file, profile_file = tmp_path / "trace.json", tmp_path / "review.prof"
+
+    result = CliRunner().invoke(cli, ["--trace", str(trace_file), "--profile", str(profile_file),
+                                      "review", str(md), "--no-local-copy"])
+
+    assert result.exit_code == 0, result.output
+    events = json.loads(trace_file.read_text())["traceEvents"]
+    assert "sn-review review" in [e["name"] for e in events]
+    assert profile_file.stat().st_size > 0
+    assert not trace.active()
+
+
+def test_loop_monitor_counts_only_lag_above_threshold():
+    monitor = trace.LoopMonitor(threshold=0.005)
+    monitor.record(0.001)
+    monitor.record(0.2)
+    monitor.record(0.05)
+
+    assert monitor.stats() == {"samples": 3, "stalls": 2, "stall_seconds": 0.25, "max_stall_seconds": 0.2}
+
+
+@pytest.mark.anyio
+async def test_loop_monitor_sees_blocking_call():
+    import asyncio
+    import time
+
+    monitor = trace.LoopMonitor(interval=0.005).start()
+    await asyncio.sleep(0.02)
+    time.sleep(0.1)  # holds the loop
+    await asyncio.sleep(0.02)
+    monitor.stop()
+
+    assert monitor.stats()["max_stall_seconds"] >= 0.05
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from sn import state, watch
+
+
+@pytest.fixture(params=["inotify", "polling"])
+def watcher(request, tmp_path):
+    if request.param == "inotify":
+        try:
+            w = watch.InotifyWatcher(tmp_path)
+        except (OSError, AttributeError):
+            pytest.skip("inotify not available")
+    else:
+        w = watch.PollingWatcher(tmp_path, interval=0.01)
+    yield w
+    w.close()
+
+
+def test_watcher_reports_markdown_writes_only(watcher, tmp_path):
+    (tmp_path / "draft.md").write_text("# Draft")
+    (tmp_path / "draft-review.md").write_text("# Review")
+    (tmp_path / "notes.txt").write_text("x")
+
+    changed = watcher.wait(1.0)
+
+    assert changed == {tmp_path / "draft.md"}
+
+
+def test_batches_debounce_bursts(tmp_path):
+    watcher = watch.PollingWatcher(tmp_path, interval=0.01)
+
+    def writer():
+        for i in range(5):
+            (tmp_path / "a.md").write_text(f"v{i}")
+            (tmp_path / "b.md").write_text(f"v{i}")
+            time.sleep(0.02)
+
+    threading.Thread(target=writer).start()
+    result = list(watch.batches(watcher, debounce=0.2, idle_timeout=0.5))
+
+    # Five rounds of saves collapse into one batch per quiet period
+    assert result == [[tmp_path / "a.md", tmp_path / "b.md"]]
+
+
+def test_review_batch_skips_unchanged_and_opens_last(tmp_path, temp_state_file, mocker):
+    a, b, c = (tmp_path / n for n in ("a.md", "b.md", "c.md"))
+    for p in (a, b, c):
+        p.write_text(f"# {p.stem}")
+    state.add_review(str(a), "/ForReview/a_1.pdf", content_hash=watch.content_hash(a))
+    review = mocker.patch("sn.workflow.request_review", return_value={})
+    connect = mocker.Mock()
+
+    results, skipped = watch.review_batch([a, b, c], connect=connect)
+
+    assert skipped == [a]
+    assert [call.args[0] for call in review.call_args_list] == [b, c]
+    assert [call.kwargs["open_viewer"] for call in review.call_args_list] == [False, True]
+    assert all(call.kwargs["connect"] is connect for call in review.call_args_list)
+
+
+def test_review_batch_uses_scheduled_device(tmp_path, temp_state_file, mocker):
+    from sn.scheduler import ScheduledDevice
+    md = tmp_path / "a.md"
+    md.write_text("# A")
+    mocker.patch("sn.workflow.SupernoteDevice")
+    review = mocker.patch("sn.workflow.request_review", return_value={})
+
+    watch.review_batch([md])
+
+    assert isinstance(review.call_args.kwargs["connect"](), ScheduledDevice)
+
+
+def test_request_review_records_content_hash(tmp_path, temp_state_file, mocker):
+    from sn import workflow
+    md = tmp_path / "a.md"
+    md.write_text("# A")
+    mocker.patch("sn.workflow.render_pdf", return_value=(b"%PDF", None))
+    device = mocker.patch("sn.workflow.SupernoteDevice").return_value
+
+    workflow.request_review(md, keep_local=False, open_viewer=False)
+
+    assert watch.unchanged_since_push(md)
+    device.open_pdf.assert_not_called()
+    md.write_text("# A, edited")
+    assert not watch.unchanged_since_push(md)
+
+
+def test_queued_version_counts_as_pushed(tmp_path, temp_state_file, mocker):
+    from sn import workflow
+    md = tmp_path / "a.md"
+    md.write_text("# A")
+    mocker.patch("sn.workflow.render_pdf", return_value=(b"%PDF", None))
+    mocker.patch("sn.workflow.SupernoteDevice", side_effect=Exception("No ADB devices found."))
+
+    workflow.request_review(md, keep_local=False)
+
+    # Saving the same content again while offline queues nothing new
+    assert watch.unchanged_since_push(md)
+    md.write_text("# A, edited")
+    assert not watch.unchanged_since_push(md)